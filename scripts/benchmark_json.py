@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""Compare the JSON serializers on a large generated report response.
+
+Usage: python scripts/benchmark_json.py [rows] [time_series_periods]
+
+The defaults (2000 rows, 12 monthly periods of 4 computation fields + 2 columns) make a ~100k cells report.
+"""
+import datetime
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+import django
+from django.conf import settings
+
+
+def setup_django():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    settings.configure(USE_I18N=True, SLICK_REPORTING_SETTINGS={})
+    django.setup()
+
+
+def make_report(rows, periods):
+    from django.utils.translation import gettext_lazy as _
+
+    start = datetime.datetime(2023, 1, 1)
+    columns = [{"name": "slug", "verbose_name": _("Slug")}, {"name": "name", "verbose_name": _("Name")}]
+    data = []
+    for i in range(rows):
+        row = {"slug": f"client-{i}", "name": f"Client {i}"}
+        for p in range(periods):
+            for field in ("__debit__", "__credit__", "__total__", "__balance__"):
+                row[f"{field}TS{p}"] = Decimal(f"{i * 100 + p}.{p:02d}")
+        data.append(row)
+    for p in range(periods):
+        columns.append(
+            {
+                "name": f"__total__TS{p}",
+                "verbose_name": _("Total"),
+                "start_date": start.replace(month=p % 12 + 1),
+                "end_date": start.replace(month=p % 12 + 1, day=28),
+            }
+        )
+    return {
+        "report_slug": "benchmark",
+        "data": data,
+        "columns": columns,
+        "metadata": {"time_series_pattern": "monthly", "start_date": start, "end_date": start.replace(year=2024)},
+    }
+
+
+def main(rows=2000, periods=12):
+    from slick_reporting.serializers import orjson, orjson_dumps, simplejson_dumps
+
+    report = make_report(rows, periods)
+    serializers = [("simplejson", simplejson_dumps)]
+    if hasattr(orjson, "Fragment"):
+        serializers.append(("orjson", orjson_dumps))
+    else:
+        print("orjson >= 3.9 is not installed, only simplejson is benchmarked")
+
+    cells = rows * (2 + periods * 4)
+    print(f"{rows} rows, {cells} cells")
+    for name, dumps in serializers:
+        size = len(dumps(report))
+        seconds = min(timeit.repeat(lambda dumps=dumps: dumps(report), number=1, repeat=5))
+        print(f"{name:<12} {seconds * 1000:8.1f} ms  {size / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -86,9 +86,28 @@ SLICK_REPORTING_SETTINGS_DEFAULT = {
     "MESSAGES": {
         "total": _("Total"),
         "export_to_csv": _("Export to CSV"),
+        "export_to_json": _("Export to JSON"),
+        "export_to_xlsx": _("Export to Excel"),
+        "export_to_arrow": _("Export to Arrow"),
+        "export_to_parquet": _("Export to Parquet"),
         "print_report": _("Print"),
     },
     "REPORT_VIEW_ACCESS_FUNCTION": "slick_reporting.helpers.user_test_function",
+    "JSON_SERIALIZER": "slick_reporting.serializers.simplejson_dumps",
+    "EXECUTOR": {
+        "workers": 0,
+    },
+    "AUTOCOMPLETE": {
+        "MEDIA": {
+            "js": (
+                "https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/js/select2.min.js",
+                "slick_reporting/slick_reporting.autocomplete.js",
+            ),
+            "css": {
+                "all": ("https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/css/select2.min.css",),
+            },
+        },
+    },
 }
 
 
@@ -134,3 +153,7 @@ def get_media():
 
 def get_access_function():
     return get_callable(SLICK_REPORTING_SETTINGS["REPORT_VIEW_ACCESS_FUNCTION"])
+
+
+def get_json_serializer():
+    return get_callable(SLICK_REPORTING_SETTINGS["JSON_SERIALIZER"])
@@ -0,0 +1,397 @@
+"""
+Caching of the report results.
+
+Each cached result key embeds a version of the report model, the version is renewed on every `post_save` and
+`post_delete` of that model, which makes all its cached results unreachable; the timeout is the fallback for the
+changes not sent through the model signals (ie: `update()`, raw SQL, other processes not connected).
+
+The computation fields results over closed periods (see `ClosedPeriodsMemo`) are kept indefinitely instead, until
+explicitly invalidated with `invalidate_closed_periods`.
+"""
+
+import datetime
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db.models import Model, Q, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from django.utils.http import quote_etag
+
+from .execution import _local_naive
+
+
+class ReportCacheStats:
+    """
+    Counters of the report results cache, per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+
+report_cache_stats = ReportCacheStats()
+
+
+def freeze(value):
+    """
+    A hashable version of a value to be part of a cache key
+    :param value: dicts, lists and tuples of hashable values
+    :return: a hashable object
+    :raises TypeError: for the values which can't be part of a key, like querysets (hashed on their identity)
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, QuerySet):
+        raise TypeError("querysets can't be part of a cache key")
+    hash(value)
+    return value
+
+
+class LocalCache:
+    """
+    A bounded, per process, cache; the least recently used entries are dropped above `max_size`, and the entries
+    expire after `timeout` seconds (never if None).
+    """
+
+    def __init__(self, max_size=128, timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_or_set(self, key, compute):
+        """
+        Get the value of the key, or compute and store it
+        :param key: a hashable key
+        :param compute: a callable returning the value
+        :return: the value
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                return entry[0]
+        value = compute()
+        expires = None if self.timeout is None else now + self.timeout
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_connected_models = {}
+_connect_lock = threading.Lock()
+
+
+def get_report_cache_stats():
+    """
+    :return: a dict with the `hits`, `misses` and `evictions` counters of the report results cache
+    """
+    return report_cache_stats.as_dict()
+
+
+def _version_key(model):
+    return f"slick_reporting:version:{model._meta.label_lower}"
+
+
+def get_model_version(model, cache_alias="default"):
+    """
+    The current version of the model cached results
+    """
+    return caches[cache_alias].get_or_set(_version_key(model), uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_model(model):
+    """
+    Make all the cached results of the model reports unreachable, by dropping the model version: the next cached
+    report gets a new one. An eviction is counted only if there was a version, ie: results cached since the last one.
+    :param model: the report model
+    """
+    for cache_alias in _connected_models.get(model._meta.label_lower, set()):
+        if caches[cache_alias].delete(_version_key(model)):
+            report_cache_stats.increment("evictions")
+
+
+def _invalidate_on_change(sender, **kwargs):
+    invalidate_model(sender)
+
+
+def connect_model(model, cache_alias="default"):
+    """
+    Connect the model `post_save` & `post_delete` signals to invalidate its cached results
+    :param model: the report model
+    :param cache_alias: the cache the results are stored in
+    """
+    label = model._meta.label_lower
+    with _connect_lock:
+        if label not in _connected_models:
+            dispatch_uid = f"slick_reporting_cache_{label}"
+            post_save.connect(_invalidate_on_change, sender=model, dispatch_uid=dispatch_uid)
+            post_delete.connect(_invalidate_on_change, sender=model, dispatch_uid=dispatch_uid)
+        _connected_models.setdefault(label, set()).add(cache_alias)
+
+
+def _normalize(value):
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, QuerySet):
+        return sorted(str(x) for x in value.values_list("pk", flat=True))
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(str(x) for x in value)
+    if isinstance(value, Promise):
+        return force_str(value)
+    return str(value)
+
+
+def make_cache_key(model, key_parts, cache_alias="default"):
+    """
+    Build the cache key of a report results
+    :param model: the report model
+    :param key_parts: a dict of everything the results depend on (slug, filters, dates, ...)
+    :param cache_alias: the cache the results are stored in
+    :return: a string
+    """
+    digest = hashlib.sha256(json.dumps(key_parts, sort_keys=True, default=_normalize).encode()).hexdigest()
+    return f"slick_reporting:results:{get_model_version(model, cache_alias)}:{digest}"
+
+
+def get_etag(model, key_parts, cache_alias="default"):
+    """
+    Build a strong ETag of a report response, changing with the report model version and the key parts
+    :param model: the report model
+    :param key_parts: a dict of everything the response depends on
+    :param cache_alias: the cache the model version is stored in
+    :return: a quoted ETag string
+    """
+    connect_model(model, cache_alias)
+    key = make_cache_key(model, key_parts, cache_alias)
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+
+def get_or_compute(model, key_parts, compute, cache_alias="default", timeout=None):
+    """
+    Get the report results from the cache, or compute and cache them
+    :param model: the report model
+    :param key_parts: a dict of everything the results depend on
+    :param compute: a callable returning the results
+    :param cache_alias: the cache the results are stored in
+    :param timeout: the cache timeout in seconds
+    :return: the report results
+    """
+    connect_model(model, cache_alias)
+    cache = caches[cache_alias]
+    key = make_cache_key(model, key_parts, cache_alias)
+    results = cache.get(key)
+    if results is not None:
+        report_cache_stats.increment("hits")
+        return results
+    report_cache_stats.increment("misses")
+    results = compute()
+    cache.set(key, results, timeout=timeout)
+    return results
+
+
+async def aget_or_compute(model, key_parts, acompute, cache_alias="default", timeout=None):
+    """
+    The async counterpart of `get_or_compute`
+    :param model: the report model
+    :param key_parts: a dict of everything the results depend on
+    :param acompute: a coroutine function returning the results
+    :param cache_alias: the cache the results are stored in
+    :param timeout: the cache timeout in seconds
+    :return: the report results
+    """
+    connect_model(model, cache_alias)
+    cache = caches[cache_alias]
+    # the key parts can hold querysets to be evaluated
+    key = await sync_to_async(make_cache_key)(model, key_parts, cache_alias)
+    results = await cache.aget(key)
+    if results is not None:
+        report_cache_stats.increment("hits")
+        return results
+    report_cache_stats.increment("misses")
+    results = await acompute()
+    await cache.aset(key, results, timeout=timeout)
+    return results
+
+
+CLOSED_PERIODS_MAX_INVALIDATIONS = 50
+"""Above this number of partial invalidations, all the memoized closed periods of a model are dropped at once"""
+
+
+def _closed_periods_state_key(model):
+    return f"slick_reporting:closed_periods:{model._meta.label_lower}"
+
+
+def _get_closed_periods_state(model, cache_alias="default"):
+    """
+    :return: the closed periods memo `version` of the model, and its partial `invalidations` [(since, at), ...]
+    """
+    return caches[cache_alias].get_or_set(
+        _closed_periods_state_key(model), {"version": uuid.uuid4().hex, "invalidations": []}, timeout=None
+    )
+
+
+def invalidate_closed_periods(model, since=None, cache_alias="default"):
+    """
+    Invalidate the memoized closed periods results of the model reports, ie: after a back-dated posting
+    :param model: the report model
+    :param since: the date of the earliest changed row, the results over the periods ending after it are recomputed.
+    None to invalidate all the periods.
+    :param cache_alias: the cache the results are memoized in
+    """
+    state = _get_closed_periods_state(model, cache_alias)
+    if since is None or len(state["invalidations"]) >= CLOSED_PERIODS_MAX_INVALIDATIONS:
+        state = {"version": uuid.uuid4().hex, "invalidations": []}
+    else:
+        state["invalidations"].append((_local_naive(since), time.time()))
+    caches[cache_alias].set(_closed_periods_state_key(model), state, timeout=None)
+
+
+def _stable(value):
+    """
+    A json serializable version of a filter value, the same across processes: querysets are represented by their SQL
+    """
+    if isinstance(value, QuerySet):
+        sql, params = value.query.sql_with_params()
+        return ["queryset", sql, [_stable(x) for x in params]]
+    if isinstance(value, Q):
+        return ["Q", value.connector, value.negated, [_stable(x) for x in value.children]]
+    if isinstance(value, dict):
+        return sorted([str(k), _stable(v)] for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_stable(x) for x in value]
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    return _normalize(value)
+
+
+class ClosedPeriodsMemo:
+    """
+    Memoizes the prepared results of the computation fields queries over closed periods, ie: the past months of a
+    time series, which don't change anymore; only the queries over the open (current) period are then run again.
+
+    A query is memoized when it's prepared by the default `prepare` (see `PreparationJob.get_signature`) and its date
+    range ends before now. Its key is made of its calculation, base queryset, filters and grouping, and its results
+    are kept in the cache without timeout.
+    """
+
+    def __init__(self, model, start_date_field, end_date_field, cache_alias="default"):
+        """
+        :param model: the report model, see `invalidate_closed_periods`
+        :param start_date_field: the field the period start is filtered on
+        :param end_date_field: the field the period end is filtered on
+        :param cache_alias: the cache the results are memoized in
+        """
+        self.model = model
+        self.start_date_field = start_date_field
+        self.end_date_field = end_date_field
+        self.cache_alias = cache_alias
+        self.hits = 0
+        self._misses = []
+        self._started_at = None
+        self._version = None
+
+    def get_period_end(self, job):
+        """
+        :return: the end of the job date range if it's closed, None otherwise
+        """
+        if job.get_signature() is None:
+            return None
+        end = job.get_filters()[1].get(f"{self.end_date_field}__lt")
+        if end is None or _local_naive(end) > _local_naive(timezone.now()):
+            return None
+        return _local_naive(end)
+
+    def get_key(self, job):
+        field = job.instance
+        q_filters, kwargs_filters = job.get_filters()
+        key_parts = [
+            field.calculation_field,
+            _stable(field.calculation_method),
+            _stable(field.get_queryset()),
+            [_stable(queryset) for queryset in field.group_by_custom_querysets or []],
+            job.get_group_by(),
+            _stable(q_filters),
+            _stable(kwargs_filters),
+            _stable(field.plus_side_q or []),
+            _stable(field.minus_side_q or []),
+            bool(field._debit_and_credit),
+        ]
+        digest = hashlib.sha256(json.dumps(key_parts, default=_normalize).encode()).hexdigest()
+        return f"slick_reporting:closed_periods:{self._version}:{digest}"
+
+    def load(self, jobs):
+        """
+        Hand the memoized results to the jobs over closed periods
+        :param jobs: list of PreparationJob
+        :return: the jobs to execute, the closed ones are memoized once `store` is called
+        """
+        self._started_at = time.time()
+        closed = [(job, self.get_period_end(job)) for job in jobs]
+        closed = [(job, end) for job, end in closed if end is not None]
+        if not closed:
+            return jobs
+
+        state = _get_closed_periods_state(self.model, self.cache_alias)
+        self._version = state["version"]
+        keys = {id(job): self.get_key(job) for job, end in closed}
+        entries = caches[self.cache_alias].get_many(list(keys.values()))
+
+        memoized = set()
+        for job, end in closed:
+            entry = entries.get(keys[id(job)])
+            if entry is not None and not any(since < end and at >= entry[1] for since, at in state["invalidations"]):
+                job.instance._cache = entry[0]
+                memoized.add(id(job))
+            else:
+                self._misses.append((keys[id(job)], job))
+        self.hits += len(memoized)
+        return [job for job in jobs if id(job) not in memoized]
+
+    def store(self):
+        """
+        Memoize the results of the executed jobs over closed periods
+        """
+        misses, self._misses = self._misses, []
+        if misses:
+            caches[self.cache_alias].set_many(
+                {key: (job.instance._cache, self._started_at) for key, job in misses}, timeout=None
+            )
@@ -0,0 +1,840 @@
+"""
+Planning and execution of the computation fields preparations.
+
+The `ReportGenerator` collects, for every computation field on the report (and their requirements), a
+`PreparationJob` describing the query needed to prepare it. The `QueryPlanner` then makes sure each distinct query
+is executed once, and the jobs are executed, either one by one or fused together in a single query when possible.
+"""
+
+import asyncio
+import datetime
+import logging
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Count, Q, QuerySet, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FUSED_WHERE_MAX_TERMS = 100
+"""Above this number of distinct filters, a fused query does not restrict its WHERE clause to their union"""
+
+ADDITIVE_AGGREGATES = (Sum, Count)
+"""Aggregates whose remainder can be derived by subtraction"""
+
+TRUNC_KINDS = {
+    "daily": "day",
+    "weekly": "week",
+    "monthly": "month",
+    "quarterly": "quarter",
+    "annually": "year",
+}
+"""The database `Trunc` kind of each time series pattern it can bucket"""
+
+
+def make_hashable(value):
+    """
+    Return a hashable version of a filter value, without evaluating querysets
+    :param value: any filter value
+    :return: a hashable object
+    """
+    if isinstance(value, QuerySet):
+        return "queryset", id(value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, make_hashable(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(make_hashable(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return "object", id(value)
+    return value
+
+
+def queryset_signature(queryset):
+    """
+    A hashable signature of a queryset, equal for querysets producing the same SQL
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except Exception:  # EmptyResultSet / FullResultSet or any non compilable query
+        return "queryset", id(queryset)
+    return queryset.model, sql, make_hashable(params)
+
+
+class PreparationJob:
+    """
+    The preparation of a single computation field instance with the filters it should be computed with.
+    """
+
+    def __init__(self, instance, q_filters=None, kwargs_filters=None, opaque=False):
+        """
+        :param instance: the ComputationField instance
+        :param q_filters: Q filters passed by the generator
+        :param kwargs_filters: kwargs filters passed by the generator
+        :param opaque: if True, the field customizes its `init_preparation`, and it's called as is.
+        """
+        self.instance = instance
+        self.q_filters = q_filters
+        self.kwargs_filters = kwargs_filters or {}
+        self.opaque = opaque
+        self.crosstab = None
+        """(crosstab_id, is_remainder) when the job computes a crosstab column, set by the generator"""
+        self._filters = None
+
+    def run(self):
+        if self.opaque:
+            self.instance.init_preparation(self.q_filters, self.kwargs_filters)
+        else:
+            self.instance.prepare_own_results(self.q_filters, self.kwargs_filters)
+
+    def get_filters(self):
+        """
+        :return: the effective (q_filters list, kwargs_filters dict) of the field query
+        """
+        if self._filters is None:
+            self._filters = self.instance.get_prepare_filters(self.q_filters, dict(self.kwargs_filters))
+        return self._filters
+
+    def get_group_by(self):
+        field = self.instance
+        return "" if field.prevent_group_by else (field.group_by or "")
+
+    def get_fuse_key(self):
+        """
+        Jobs sharing a fuse key share the same base queryset and grouping, and can be computed in one query.
+        :return: a hashable key, or None if the job can not be fused
+        """
+        field = self.instance
+        if self.opaque or not field.is_fusable():
+            return None
+        return (
+            queryset_signature(field.get_queryset()),
+            self.get_group_by(),
+        )
+
+    def get_signature(self):
+        """
+        A canonical signature of the query(ies) run by this job, jobs with the same signature get the same results.
+        Fields relying on the default `prepare` only differ by their calculation, so the field class is not part of it,
+        ie: `__debit__`, `__credit__` and `__total__` on the same period share one query.
+        :return: a hashable signature, or None if the job results should not be shared (custom preparation)
+        """
+        field = self.instance
+        if self.opaque or not field.uses_default_prepare():
+            return None
+        q_filters, kwargs_filters = self.get_filters()
+        return (
+            field.calculation_field,
+            field.calculation_method,
+            queryset_signature(field.get_queryset()),
+            tuple(queryset_signature(qs) for qs in field.group_by_custom_querysets or []),
+            self.get_group_by(),
+            make_hashable(q_filters),
+            make_hashable(kwargs_filters),
+            make_hashable(field.plus_side_q or []),
+            make_hashable(field.minus_side_q or []),
+            bool(field._debit_and_credit),
+        )
+
+    def get_query_count(self):
+        """
+        :return: the number of queries this job runs when executed on its own
+        """
+        field = self.instance
+        count = 2 if field._debit_and_credit else 1
+        if field.group_by_custom_querysets:
+            count *= len(field.group_by_custom_querysets)
+        return count
+
+    @property
+    def annotation_name(self):
+        field = self.instance
+        return f"{field.calculation_field.lower()}__{field.calculation_method.name.lower()}"
+
+
+class QueryPlanner:
+    """
+    Makes sure each distinct query needed by the report is executed once.
+    Jobs sharing a signature (see `PreparationJob.get_signature`) are only executed for the first of them, the
+    others get a shared reference to its prepared results.
+    """
+
+    def __init__(self):
+        self.planned_jobs = 0
+        self.executed_jobs = 0
+        self.saved_queries = 0
+        self._shared = []
+
+    def plan(self, jobs):
+        """
+        :param jobs: list of PreparationJob
+        :return: the list of jobs that needs to be executed
+        """
+        leaders = OrderedDict()
+        unique_jobs = []
+        for job in jobs:
+            signature = job.get_signature()
+            if signature is not None and signature in leaders:
+                self._shared.append((leaders[signature], job))
+                self.saved_queries += job.get_query_count()
+                continue
+            if signature is not None:
+                leaders[signature] = job
+            unique_jobs.append(job)
+
+        self.planned_jobs += len(jobs)
+        self.executed_jobs += len(unique_jobs)
+        if self._shared:
+            logger.debug(
+                "Query planner: %s computation field preparations, %s executed, %s queries saved",
+                self.planned_jobs,
+                self.executed_jobs,
+                self.saved_queries,
+            )
+        return unique_jobs
+
+    def get_shared_jobs(self):
+        """
+        :return: the planned (leader, job) pairs, the job getting the results of its leader on `share_results`
+        """
+        return list(self._shared)
+
+    def share_results(self):
+        """
+        To be called once the planned jobs are executed, hands their results to their duplicates
+        """
+        for leader, job in self._shared:
+            job.instance._cache = leader.instance._cache
+        self._shared = []
+
+
+class FusedQuery:
+    """
+    Computes a set of jobs in one `values(group_by).annotate(...)` query (or one `aggregate(...)` when not grouped)
+    using an aggregate filtered on each job own filters.
+    """
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.group_by = jobs[0].get_group_by()
+
+    @staticmethod
+    def _job_q(q_filters, kwargs_filters):
+        return Q(*q_filters, **kwargs_filters)
+
+    def get_where(self):
+        """
+        The WHERE clause of the fused query: the filters common to all jobs, and the union of the rest.
+        """
+        all_filters = [job.get_filters() for job in self.jobs]
+        common_q = [q for q in all_filters[0][0] if all(q in f[0] for f in all_filters[1:])]
+        common_kwargs = {
+            k: v
+            for k, v in all_filters[0][1].items()
+            if all(k in f[1] and make_hashable(f[1][k]) == make_hashable(v) for f in all_filters[1:])
+        }
+        where = Q(*common_q, **common_kwargs)
+
+        rest = OrderedDict()
+        for q_filters, kwargs_filters in all_filters:
+            remaining_q = [q for q in q_filters if q not in common_q]
+            remaining_kwargs = {k: v for k, v in kwargs_filters.items() if k not in common_kwargs}
+            if not (remaining_q or remaining_kwargs):
+                # one job needs all the rows matching the common filters
+                return where
+            rest[(make_hashable(remaining_q), make_hashable(remaining_kwargs))] = Q(*remaining_q, **remaining_kwargs)
+
+        if len(rest) <= FUSED_WHERE_MAX_TERMS:
+            where &= reduce(or_, rest.values())
+        return where
+
+    def get_annotations(self):
+        annotations = {}
+        for index, job in enumerate(self.jobs):
+            field = job.instance
+            q_filters, kwargs_filters = job.get_filters()
+            debit_q = self._job_q(q_filters + list(field.plus_side_q or []), kwargs_filters)
+            annotations[f"slick_fused_{index}_d"] = self.get_aggregate(field, debit_q or None)
+            if field._debit_and_credit:
+                credit_q = self._job_q(q_filters + list(field.minus_side_q or []), kwargs_filters)
+                annotations[f"slick_fused_{index}_c"] = self.get_aggregate(field, credit_q or None)
+        return annotations
+
+    def get_aggregate(self, field, filter):
+        """
+        :return: the aggregate of a computation field, restricted to the rows matching `filter`
+        """
+        return field.calculation_method(field.calculation_field, filter=filter)
+
+    def get_queryset(self):
+        return self.jobs[0].instance.get_queryset()
+
+    def execute(self):
+        queryset = self.get_queryset()
+        where = self.get_where()
+        if where:
+            queryset = queryset.filter(where)
+        annotations = self.get_annotations()
+
+        if self.group_by:
+            rows = list(queryset.values(self.group_by).annotate(**annotations))
+        else:
+            rows = [queryset.aggregate(**annotations)]
+
+        for index, job in enumerate(self.jobs):
+            debit_results = self._distribute(rows, job, f"slick_fused_{index}_d")
+            credit_results = None
+            if job.instance._debit_and_credit:
+                credit_results = self._distribute(rows, job, f"slick_fused_{index}_c")
+            job.instance._cache = debit_results, credit_results
+
+    def _distribute(self, rows, job, alias):
+        """
+        Shape the fused rows of one aggregate the same way `ComputationField.apply_aggregation` does
+        """
+        annotation_name = job.annotation_name
+        if not self.group_by:
+            return {annotation_name: rows[0][alias]}
+
+        results = {}
+        for row in rows:
+            value = row[alias]
+            if value is None:
+                # No rows for this group within the job filters, same as the group missing from its own query
+                continue
+            results[str(row[self.group_by])] = {self.group_by: row[self.group_by], annotation_name: value}
+        return results
+
+
+def execute_fused(jobs, tasks=None):
+    """
+    Execute the fusable jobs, one query per shared base queryset.
+    :param jobs: list of PreparationJob
+    :param tasks: if a list is given, the queries are appended to it instead of being executed (see `run_tasks`)
+    :return: the jobs which could not be fused
+    """
+    remaining = []
+    groups = OrderedDict()
+    for job in jobs:
+        key = job.get_fuse_key()
+        if key is None:
+            remaining.append(job)
+        else:
+            groups.setdefault(key, []).append(job)
+
+    _run_or_defer([FusedQuery(group) for group in groups.values()], tasks)
+    return remaining
+
+
+class RollupQuery(FusedQuery):
+    """
+    Computes a set of jobs from a rollup table (see `slick_reporting.models.ReportRollup`) instead of the report
+    model, in one fused query summing the rollup columns.
+    """
+
+    def __init__(self, jobs, rollup):
+        """
+        :param jobs: list of PreparationJob the rollup answers, sharing the same grouping
+        :param rollup: the rollup model
+        """
+        super().__init__(jobs)
+        self.rollup = rollup
+
+    def get_aggregate(self, field, filter):
+        return Sum(self.rollup.get_column_name(field.calculation_method, field.calculation_field), filter=filter)
+
+    def get_queryset(self):
+        return self.rollup._default_manager.order_by()
+
+
+def execute_rollups(jobs, rollups, tasks=None):
+    """
+    Execute the jobs a rollup table can answer, one query per rollup and grouping
+    :param jobs: list of PreparationJob
+    :param rollups: the rollup models, see `ReportRollup.answers`
+    :param tasks: if a list is given, the queries are appended to it instead of being executed
+    :return: the jobs no rollup could answer
+    """
+    remaining = []
+    groups = OrderedDict()
+    for job in jobs:
+        rollup = next((rollup for rollup in rollups if rollup.answers(job)), None)
+        if rollup is None:
+            remaining.append(job)
+        else:
+            groups.setdefault((rollup, job.get_group_by()), []).append(job)
+
+    _run_or_defer([RollupQuery(group, rollup) for (rollup, group_by), group in groups.items()], tasks)
+    return remaining
+
+
+def truncate_date(value, kind):
+    """
+    Python equivalent of the database `Trunc` function, used to check a time series is aligned with its buckets
+    :param value: a date or a datetime
+    :param kind: "day", "week", "month", "quarter" or "year"
+    :return: the truncated value
+    """
+    value = _local_naive(value)
+    if kind == "week":
+        value = value - datetime.timedelta(days=value.weekday())
+    elif kind == "month":
+        value = value.replace(day=1)
+    elif kind == "quarter":
+        value = value.replace(month=3 * ((value.month - 1) // 3) + 1, day=1)
+    elif kind == "year":
+        value = value.replace(month=1, day=1)
+    return datetime.datetime.combine(value.date(), datetime.time.min)
+
+
+def get_next_bucket(value, kind):
+    """
+    The start of the bucket following the one starting at `value`
+    :param value: a date / datetime on a `kind` boundary
+    :param kind: "day", "week", "month", "quarter" or "year"
+    """
+    if kind in ("day", "week"):
+        return value + datetime.timedelta(days=1 if kind == "day" else 7)
+    months = {"month": 1, "quarter": 3, "year": 12}[kind]
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def is_truncated(value, kind):
+    """
+    Check if the date / datetime is on a `kind` boundary in the current time zone
+    """
+    return truncate_date(value, kind) == _local_naive(value)
+
+
+def _local_naive(value):
+    """
+    Bring a date / aware datetime to a naive datetime in the current time zone, the way the database buckets it
+    """
+    if not isinstance(value, datetime.datetime):
+        return datetime.datetime.combine(value, datetime.time.min)
+    if timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+class TimeBucketQuery:
+    """
+    Computes all the periods of a time series for one computation field in a single query,
+    grouped by (group_by, Trunc(date_field)).
+    """
+
+    bucket_alias = "slick_bucket"
+
+    def __init__(self, jobs, date_field, kind):
+        """
+        :param jobs: list of (period_start, period_end, PreparationJob) sharing the same query apart from the period
+        :param date_field: the date field to bucket on
+        :param kind: the Trunc kind
+        """
+        self.jobs = jobs
+        self.date_field = date_field
+        self.kind = kind
+        self.group_by = jobs[0][2].get_group_by()
+
+    def get_queryset(self):
+        job = self.jobs[0][2]
+        field = job.instance
+        q_filters, kwargs_filters = job.get_filters()
+        kwargs_filters = {k: v for k, v in kwargs_filters.items() if k not in self.date_keys}
+        kwargs_filters[f"{self.date_field}__gte"] = min(start for start, end, job in self.jobs)
+        kwargs_filters[f"{self.date_field}__lt"] = max(end for start, end, job in self.jobs)
+
+        queryset = field.get_queryset().filter(*q_filters, **kwargs_filters)
+        queryset = queryset.annotate(**{self.bucket_alias: Trunc(self.date_field, self.kind)})
+        values = [self.group_by, self.bucket_alias] if self.group_by else [self.bucket_alias]
+
+        return queryset.values(*values).annotate(**_side_annotations(field))
+
+    @property
+    def date_keys(self):
+        return f"{self.date_field}__gte", f"{self.date_field}__lt"
+
+    def execute(self):
+        jobs = sorted(self.jobs, key=lambda x: _local_naive(x[0]))
+        starts = [_local_naive(start) for start, end, job in jobs]
+        field = jobs[0][2].instance
+        empty_value = getattr(field.calculation_method, "empty_result_set_value", None)
+        annotation_name = jobs[0][2].annotation_name
+
+        debit_results = [{} if self.group_by else {annotation_name: empty_value} for x in jobs]
+        credit_results = [{} if self.group_by else {annotation_name: empty_value} for x in jobs]
+        for row in self.get_queryset():
+            bucket = row[self.bucket_alias]
+            if bucket is None:
+                continue
+            index = bisect_right(starts, _local_naive(bucket)) - 1
+            if index < 0:
+                continue
+            for results, alias in ((debit_results, "slick_debit"), (credit_results, "slick_credit")):
+                value = row.get(alias)
+                if value is None:
+                    continue
+                if self.group_by:
+                    key = str(row[self.group_by])
+                    current = results[index].get(key, {}).get(annotation_name)
+                    results[index][key] = {self.group_by: row[self.group_by], annotation_name: _add(current, value)}
+                else:
+                    results[index][annotation_name] = _add(results[index][annotation_name] or None, value)
+
+        for index, (start, end, job) in enumerate(jobs):
+            credit = credit_results[index] if field._debit_and_credit else None
+            job.instance._cache = debit_results[index], credit
+
+
+def _side_annotations(field):
+    """
+    The debit (and credit, if the field is double sided) aggregates of a computation field
+    """
+    annotations = {"slick_debit": field.calculation_method(field.calculation_field, filter=_side_q(field.plus_side_q))}
+    if field._debit_and_credit:
+        annotations["slick_credit"] = field.calculation_method(
+            field.calculation_field, filter=_side_q(field.minus_side_q)
+        )
+    return annotations
+
+
+def _side_q(side_q):
+    return Q(*side_q) if side_q else None
+
+
+def _add(current, value):
+    return value if current is None else current + value
+
+
+class OpeningBalanceQuery(TimeBucketQuery):
+    """
+    Computes the opening balance (ie: `__fb__`) of all the periods of a time series with two queries:
+    the balance before the first period, and the movement bucketed per period, accumulated as a running sum.
+    """
+
+    def get_opening_queryset(self):
+        job = self.jobs[0][2]
+        q_filters, kwargs_filters = job.get_filters()
+        kwargs_filters = {k: v for k, v in kwargs_filters.items() if k not in self.date_keys}
+        kwargs_filters[f"{self.date_field}__lt"] = min(start for start, end, job in self.jobs)
+        queryset = job.instance.get_queryset().filter(*q_filters, **kwargs_filters)
+        annotations = _side_annotations(job.instance)
+        if self.group_by:
+            return queryset.values(self.group_by).annotate(**annotations)
+        return [queryset.aggregate(**annotations)]
+
+    def get_queryset(self):
+        job = self.jobs[0][2]
+        q_filters, kwargs_filters = job.get_filters()
+        kwargs_filters = {k: v for k, v in kwargs_filters.items() if k not in self.date_keys}
+        kwargs_filters[f"{self.date_field}__gte"] = min(start for start, end, job in self.jobs)
+        kwargs_filters[f"{self.date_field}__lt"] = max(start for start, end, job in self.jobs)
+
+        queryset = job.instance.get_queryset().filter(*q_filters, **kwargs_filters)
+        queryset = queryset.annotate(**{self.bucket_alias: Trunc(self.date_field, self.kind)})
+        values = [self.group_by, self.bucket_alias] if self.group_by else [self.bucket_alias]
+        return queryset.values(*values).annotate(**_side_annotations(job.instance))
+
+    def execute(self):
+        jobs = sorted(self.jobs, key=lambda x: _local_naive(x[0]))
+        starts = [_local_naive(start) for start, end, job in jobs]
+        field = jobs[0][2].instance
+        annotation_name = jobs[0][2].annotation_name
+        sides = ["slick_debit", "slick_credit"] if field._debit_and_credit else ["slick_debit"]
+
+        movements = [{} for x in jobs]
+        for row in self.get_queryset():
+            bucket = row[self.bucket_alias]
+            if bucket is None:
+                continue
+            index = bisect_right(starts, _local_naive(bucket)) - 1
+            if index >= 0:
+                self._accumulate(movements[index], row, sides)
+
+        balance = {}
+        for row in self.get_opening_queryset():
+            self._accumulate(balance, row, sides)
+
+        empty_value = getattr(field.calculation_method, "empty_result_set_value", None)
+        for index, (start, end, job) in enumerate(jobs):
+            results = []
+            for side in sides:
+                if self.group_by:
+                    results.append(
+                        {
+                            group: {self.group_by: row[self.group_by], annotation_name: row[side]}
+                            for group, row in balance.items()
+                            if row[side] is not None
+                        }
+                    )
+                else:
+                    results.append({annotation_name: balance.get("", {}).get(side, empty_value)})
+            job.instance._cache = results[0], results[1] if field._debit_and_credit else None
+            for row in movements[index].values():
+                self._accumulate(balance, row, sides)
+
+    def _accumulate(self, balance, row, sides):
+        group = str(row[self.group_by]) if self.group_by else ""
+        current = balance.setdefault(group, {self.group_by: row[self.group_by]} if self.group_by else {})
+        for side in sides:
+            current[side] = current.get(side) if row[side] is None else _add(current.get(side), row[side])
+
+
+def _query_key(job, q_filters, kwargs_filters):
+    """
+    The signature of a job query, without the part a strategy computes in one go (ie: the period, the crosstab id)
+    """
+    field = job.instance
+    return (
+        job.get_fuse_key(),
+        field.calculation_field,
+        field.calculation_method,
+        make_hashable(q_filters),
+        make_hashable(kwargs_filters),
+        make_hashable(field.plus_side_q or []),
+        make_hashable(field.minus_side_q or []),
+        bool(field._debit_and_credit),
+    )
+
+
+def execute_bucketed(jobs, date_field, kind, periods, tasks=None):
+    """
+    Execute the time series jobs bucketed by the database, one query per computation field,
+    and two for the opening balances (ie: `__fb__`) of all the periods
+    :param jobs: list of PreparationJob
+    :param date_field: the date field the time series is computed on
+    :param kind: the Trunc kind matching the time series pattern
+    :param periods: the time series [(start_date, end_date), ...], aligned on `kind`
+    :param tasks: if a list is given, the queries are appended to it instead of being executed
+    :return: the jobs which could not be bucketed
+    """
+    date_keys = f"{date_field}__gte", f"{date_field}__lt"
+    period_starts = {start for start, end in periods}
+    periods = set(periods)
+    remaining = []
+    groups = OrderedDict()
+    for job in jobs:
+        if job.get_fuse_key() is None:
+            remaining.append(job)
+            continue
+        q_filters, kwargs_filters = job.get_filters()
+        period = kwargs_filters.get(date_keys[0]), kwargs_filters.get(date_keys[1])
+        other_filters = {k: v for k, v in kwargs_filters.items() if k not in date_keys}
+        if period in periods:
+            key = TimeBucketQuery, _query_key(job, q_filters, other_filters)
+        elif (
+            date_keys[0] not in kwargs_filters
+            and period[1] in period_starts
+            and issubclass(job.instance.calculation_method, ADDITIVE_AGGREGATES)
+        ):
+            # an opening balance, all the movement before the period start
+            key = OpeningBalanceQuery, _query_key(job, q_filters, other_filters)
+        else:
+            remaining.append(job)
+            continue
+        groups.setdefault(key, []).append((period[1] if key[0] is OpeningBalanceQuery else period[0], period[1], job))
+
+    _run_or_defer([query_class(group, date_field, kind) for (query_class, key), group in groups.items()], tasks)
+    return remaining
+
+
+class CrosstabQuery:
+    """
+    Computes all the crosstab ids of a computation field in a single query grouped by (group_by, crosstab_field).
+    The remainder is derived as the group total minus the selected ids, so only additive aggregates are supported.
+    """
+
+    def __init__(self, jobs, crosstab_field, crosstab_ids):
+        """
+        :param jobs: list of PreparationJob sharing the same query apart from the crosstab filter
+        :param crosstab_field: the crosstab column name
+        :param crosstab_ids: the selected crosstab ids
+        """
+        self.jobs = jobs
+        self.crosstab_field = crosstab_field
+        self.crosstab_ids = crosstab_ids
+        self.group_by = jobs[0].get_group_by()
+
+    def get_queryset(self):
+        job = self.jobs[0]
+        q_filters, kwargs_filters = job.get_filters()
+        q_filters = [q for q in q_filters if q not in get_crosstab_filters(self.crosstab_field, self.crosstab_ids)]
+        return job.instance.get_queryset().filter(*q_filters, **kwargs_filters)
+
+    def get_results(self):
+        """
+        :return: the rows of the selected crosstab ids, and of the total of all ids if a remainder is needed
+        """
+        annotations = _side_annotations(self.jobs[0].instance)
+        queryset = self.get_queryset()
+        values = [self.group_by, self.crosstab_field] if self.group_by else [self.crosstab_field]
+        id_rows = queryset.filter(**{f"{self.crosstab_field}__in": self.crosstab_ids}).values(*values)
+        id_rows = id_rows.annotate(**annotations)
+
+        total_rows = []
+        if any(job.crosstab[1] for job in self.jobs):
+            if self.group_by:
+                total_rows = queryset.values(self.group_by).annotate(**annotations)
+            else:
+                total_rows = [queryset.aggregate(**annotations)]
+        return id_rows, total_rows
+
+    def execute(self):
+        field = self.jobs[0].instance
+        annotation_name = self.jobs[0].annotation_name
+        sides = ["slick_debit", "slick_credit"] if field._debit_and_credit else ["slick_debit"]
+        id_rows, total_rows = self.get_results()
+
+        selected = {}
+        selected_totals = {}
+        for row in id_rows:
+            group = str(row[self.group_by]) if self.group_by else ""
+            selected.setdefault(str(row[self.crosstab_field]), {})[group] = row
+            for side in sides:
+                totals = selected_totals.setdefault(group, {})
+                totals[side] = _add(totals.get(side), row[side])
+
+        remainder = {}
+        for row in total_rows:
+            group = str(row[self.group_by]) if self.group_by else ""
+            remainder[group] = dict(row)
+            for side in sides:
+                if row[side] is not None:
+                    remainder[group][side] = row[side] - (selected_totals.get(group, {}).get(side) or 0)
+
+        for job in self.jobs:
+            crosstab_id, is_remainder = job.crosstab
+            rows = remainder if is_remainder else selected.get(str(crosstab_id), {})
+            results = []
+            for side in sides:
+                if self.group_by:
+                    results.append(
+                        {
+                            group: {self.group_by: row[self.group_by], annotation_name: row[side]}
+                            for group, row in rows.items()
+                            if row[side]
+                        }
+                    )
+                else:
+                    empty_value = getattr(field.calculation_method, "empty_result_set_value", None)
+                    results.append({annotation_name: rows.get("", {}).get(side, empty_value)})
+            job.instance._cache = results[0], results[1] if field._debit_and_credit else None
+
+
+def get_crosstab_filters(crosstab_field, crosstab_ids):
+    """
+    The filters the generator uses for each crosstab id, and for the remainder
+    """
+    return [Q(**{crosstab_field: crosstab_id}) for crosstab_id in crosstab_ids] + [
+        ~Q(**{f"{crosstab_field}__in": crosstab_ids})
+    ]
+
+
+def execute_crosstab_grouped(jobs, crosstab_field, crosstab_ids, tasks=None):
+    """
+    Execute the crosstab jobs grouped by the crosstab field, two queries per computation field
+    :param jobs: list of PreparationJob
+    :param crosstab_field: the crosstab column name
+    :param crosstab_ids: the selected crosstab ids
+    :param tasks: if a list is given, the queries are appended to it instead of being executed
+    :return: the jobs which could not be grouped
+    """
+    remaining = []
+    groups = OrderedDict()
+    crosstab_filters = get_crosstab_filters(crosstab_field, crosstab_ids)
+    for job in jobs:
+        field = job.instance
+        if (
+            job.crosstab is None
+            or job.get_fuse_key() is None
+            or not issubclass(field.calculation_method, ADDITIVE_AGGREGATES)
+        ):
+            remaining.append(job)
+            continue
+        q_filters, kwargs_filters = job.get_filters()
+        key = _query_key(job, [q for q in q_filters if q not in crosstab_filters], kwargs_filters)
+        groups.setdefault(key, []).append(job)
+
+    _run_or_defer([CrosstabQuery(group, crosstab_field, crosstab_ids) for group in groups.values()], tasks)
+    return remaining
+
+
+def get_task_jobs(task):
+    """
+    :param task: a task returned by the execution strategies, a `PreparationJob.run` or a shared query `execute`
+    :return: the jobs the task prepares
+    """
+    owner = getattr(task, "__self__", None)
+    if isinstance(owner, PreparationJob):
+        return [owner]
+    return [job[2] if isinstance(job, tuple) else job for job in getattr(owner, "jobs", [])]
+
+
+def _run_or_defer(queries, tasks=None):
+    if tasks is None:
+        for query in queries:
+            query.execute()
+    else:
+        tasks += [query.execute for query in queries]
+
+
+def run_tasks(tasks, workers=None):
+    """
+    Run the preparation tasks, on a thread pool if `workers` > 1.
+    The tasks must be independent reads: the requirements of a computation field are prepared by their own task
+    (or inside the task of a field customizing `init_preparation`), the results are only combined at resolve time.
+    Each worker thread uses its own database connections, closed once the worker is done.
+    Inside an atomic block the tasks are run in the current thread, the other connections would not see its
+    uncommitted changes.
+    :param tasks: a list of callables
+    :param workers: the maximum number of threads
+    """
+    workers = min(workers or 1, len(tasks))
+    if workers < 2 or any(connection.in_atomic_block for connection in connections.all()):
+        for task in tasks:
+            task()
+        return
+
+    queue = deque(tasks)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slick_reporting") as pool:
+        futures = [pool.submit(_drain_tasks, queue) for _ in range(workers)]
+    for future in futures:
+        future.result()
+
+
+async def arun_tasks(tasks, workers=None):
+    """
+    The async counterpart of `run_tasks`, the tasks are run off the event loop by `workers` threads (at least one)
+    gathered together, so the event loop keeps serving the other requests meanwhile.
+    :param tasks: a list of callables
+    :param workers: the maximum number of threads
+    """
+    if not tasks:
+        return
+    queue = deque(tasks)
+    drain = sync_to_async(_drain_tasks, thread_sensitive=False)
+    await asyncio.gather(*(drain(queue) for _ in range(min(max(workers or 1, 1), len(tasks)))))
+
+
+def _drain_tasks(queue):
+    """
+    Run the tasks from the shared queue until it's empty, then close this thread database connections
+    """
+    try:
+        while True:
+            try:
+                task = queue.popleft()
+            except IndexError:
+                return
+            task()
+    finally:
+        connections.close_all()
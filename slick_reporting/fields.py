@@ -2,10 +2,14 @@ from __future__ import annotations
 
 from warnings import warn
 
-from django.db.models import Sum, Q
+from inspect import isclass
+
+from django.db.models import Sum, Q, Aggregate, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.template.defaultfilters import date as date_filter
 from django.utils.translation import gettext_lazy as _
 
+from .execution import PreparationJob
 from .registry import field_registry
 
 
@@ -59,6 +63,10 @@ class ComputationField(object):
     prevent_group_by = False
     """Will prevent group by calculation for this specific field, serves when you want to compute overall results"""
 
+    fusable = True
+    """If True (and `prepare` is not customized), the generator can compute this field inside a single fused query
+    alongside its siblings when `fused_execution` is enabled. Set to False to always go through `prepare`"""
+
     def __new__(cls, *args, **kwargs):
         """
         This is where we register the class in the registry
@@ -126,6 +134,8 @@ class ComputationField(object):
         self.requires = self.requires or []
         self.group_by = self.group_by or group_by
         self._cache = None, None, None
+        self._indexed_results = None
+        self._indexed_results_source = None
         self._require_classes = self._get_required_classes()
         self._required_prepared_results = None
 
@@ -158,6 +168,17 @@ class ComputationField(object):
         kwargs_filters = kwargs_filters or {}
 
         required_prepared_results = self._prepare_required_computations(q_filters, kwargs_filters.copy())
+        self.prepare_own_results(q_filters, kwargs_filters, **kwargs)
+        self._required_prepared_results = required_prepared_results
+
+    def prepare_own_results(self, q_filters=None, kwargs_filters=None, **kwargs):
+        """
+        Run the query(ies) of this field only, without its requirements, and cache the results for `resolve`
+        :param q_filters:
+        :param kwargs_filters:
+        :param kwargs:
+        :return:
+        """
         queryset = self.get_queryset()
         if self.group_by_custom_querysets:
             debit_results, credit_results = self.prepare_custom_group_by_queryset(q_filters, kwargs_filters, **kwargs)
@@ -171,7 +192,74 @@ class ComputationField(object):
                 **kwargs,
             )
         self._cache = debit_results, credit_results
-        self._required_prepared_results = required_prepared_results
+
+    def collect_preparations(self, q_filters=None, kwargs_filters=None):
+        """
+        Instantiate the requirements of this field (recursively) and return the preparations needed to compute it,
+        without hitting the database. The generator then decides how to execute them.
+        Fields customizing `init_preparation` are returned as a single opaque preparation.
+        :param q_filters:
+        :param kwargs_filters:
+        :return: a list of `PreparationJob`, requirements first.
+        """
+        kwargs_filters = kwargs_filters or {}
+        if not self.is_plannable():
+            return [PreparationJob(self, q_filters, kwargs_filters, opaque=True)]
+
+        jobs = []
+        values = {}
+        for required_klass in self._require_classes:
+            dep = self._get_required_instance(required_klass)
+            jobs += dep.collect_preparations(q_filters, kwargs_filters.copy())
+            values[dep.name] = {"results": None, "instance": dep}
+        self._required_prepared_results = values
+        jobs.append(PreparationJob(self, q_filters, kwargs_filters))
+        return jobs
+
+    def is_plannable(self):
+        """
+        Can the preparation of this field be split into its own query and its requirements ones.
+        """
+        klass = type(self)
+        return (
+            klass.init_preparation is ComputationField.init_preparation
+            and klass._prepare_required_computations is ComputationField._prepare_required_computations
+        )
+
+    def is_fusable(self):
+        """
+        Can this field results be computed as a filtered aggregate inside a query shared with other fields.
+        """
+        return bool(
+            self.fusable
+            and not self.group_by_custom_querysets
+            and self.uses_default_prepare()
+            and type(self).get_queryset is ComputationField.get_queryset
+            and isclass(self.calculation_method)
+            and issubclass(self.calculation_method, Aggregate)
+        )
+
+    @classmethod
+    def uses_default_prepare(cls):
+        """
+        Is this field computed by the default `prepare` and `apply_aggregation`, ie: its results only depend on
+        the queryset, the filters and the calculation field & method.
+        """
+        return all(
+            getattr(cls, method) is getattr(ComputationField, method)
+            for method in ("prepare_own_results", "prepare_custom_group_by_queryset", "prepare", "apply_aggregation")
+        )
+
+    def get_prepare_filters(self, q_filters=None, kwargs_filters=None):
+        """
+        Hook to alter the filters this field is computed with, used by `prepare` and by the fused execution.
+        :param q_filters: a Q object or a list of Q objects
+        :param kwargs_filters:
+        :return: a tuple of (list of Q objects, dict of kwargs filters)
+        """
+        if type(q_filters) is Q:
+            q_filters = [q_filters]
+        return list(q_filters or []), dict(kwargs_filters or {})
 
     def prepare_custom_group_by_queryset(self, q_filters=None, kwargs_filters=None, **kwargs):
         debit_output, credit_output = [], []
@@ -210,10 +298,9 @@ class ComputationField(object):
         queryset = main_queryset.all()
         group_by = "" if prevent_group_by else group_by
         credit_results = None
+        q_filters, kwargs_filters = self.get_prepare_filters(q_filters, kwargs_filters)
 
         if q_filters:
-            if type(q_filters) is Q:
-                q_filters = [q_filters]
             queryset = queryset.filter(*q_filters)
         if kwargs_filters:
             queryset = queryset.filter(**kwargs_filters)
@@ -234,6 +321,44 @@ class ComputationField(object):
 
         return debit_results, credit_results
 
+    def get_subquery(self, q_filters=None, kwargs_filters=None, outer_ref=None):
+        """
+        An expression computing this field for the outer group by row, used by the generator to order and filter
+        (see `having`) the report in the database.
+        Override it along with `resolve`, the default is only used when `resolve` is not customized.
+        :param q_filters:
+        :param kwargs_filters:
+        :param outer_ref: a dict filtering the group by field on an `OuterRef`
+        :return: the expression, or None if this field can't be computed as a subquery
+        """
+        if type(self).resolve is not ComputationField.resolve:
+            return None
+        return self.get_prepared_subquery(q_filters, kwargs_filters, outer_ref)
+
+    def get_prepared_subquery(self, q_filters=None, kwargs_filters=None, outer_ref=None):
+        """
+        The expression of the value this field prepares, as the default `resolve` returns it
+        :param q_filters:
+        :param kwargs_filters:
+        :param outer_ref: a dict filtering the group by field on an `OuterRef`
+        :return: the expression, or None if the preparation can't be computed as a subquery
+        """
+        if not (
+            self.is_fusable()
+            and not self._debit_and_credit
+            and not self.prevent_group_by
+            and self.group_by
+        ):
+            return None
+        q_filters, kwargs_filters = self.get_prepare_filters(q_filters, kwargs_filters)
+        queryset = self.get_queryset().filter(*q_filters, **kwargs_filters).filter(**(outer_ref or {}))
+        subquery = Subquery(
+            queryset.values(self.group_by)
+            .annotate(slick_value=self.calculation_method(self.calculation_field))
+            .values("slick_value")[:1]
+        )
+        return Coalesce(subquery, 0, output_field=subquery.output_field)
+
     def get_queryset(self):
         queryset = self.queryset
         if self.base_q_filters:
@@ -249,19 +374,22 @@ class ComputationField(object):
     ):
         values = {}
         for required_klass in self._require_classes:
-            dep = required_klass(
-                self.plus_side_q,
-                self.minus_side_q,
-                self.report_model,
-                date_field=self.date_field,
-                group_by=self.group_by,
-                queryset=self.queryset,
-                group_by_custom_querysets=self.group_by_custom_querysets,
-            )
+            dep = self._get_required_instance(required_klass)
             results = dep.init_preparation(q_filters, extra_filters)
             values[dep.name] = {"results": results, "instance": dep}
         return values
 
+    def _get_required_instance(self, required_klass):
+        return required_klass(
+            self.plus_side_q,
+            self.minus_side_q,
+            self.report_model,
+            date_field=self.date_field,
+            group_by=self.group_by,
+            queryset=self.queryset,
+            group_by_custom_querysets=self.group_by_custom_querysets,
+        )
+
     def resolve(self, prepared_results, required_computation_results: dict, current_pk, current_row=None) -> float:
         """
         Reponsible for getting the exact data from the prepared value
@@ -304,25 +432,43 @@ class ComputationField(object):
         return dep_results
 
     def extract_data(self, prepared_results, current_obj):
+        """
+        Get the (debit, credit) values of the current object from the prepared results
+        :param prepared_results: the returned data from prepare
+        :param current_obj: the value of group by id
+        :return: a tuple of (debit, credit)
+        """
+        if prepared_results is not self._indexed_results_source:
+            self._indexed_results = self.index_prepared_results(prepared_results)
+            self._indexed_results_source = prepared_results
+        index, default = self._indexed_results
+        return index.get(str(current_obj), default)
+
+    def index_prepared_results(self, prepared_results):
+        """
+        Normalize the prepared results once into a flat map, so that `extract_data` is a single lookup per record
+        :param prepared_results: the returned data from prepare
+        :return: a tuple of ({group_key: (debit, credit)}, default (debit, credit))
+        """
         group_by = "" if self.prevent_group_by else (self.group_by or self.group_by_custom_querysets)
         annotation = "__".join([self.calculation_field.lower(), self.calculation_method.name.lower()])
 
         cached_debit, cached_credit = prepared_results
-
-        cached = [cached_debit, cached_credit]
-        output = []
-        for results in cached:
-            value = 0
-            if results:
-                if not group_by:
-                    x = list(results.keys())[0]
-                    value = results[x]
-                elif self.group_by_custom_querysets:
-                    value = results[int(current_obj)][annotation]
-                else:
-                    value = results.get(str(current_obj), {}).get(annotation, 0)
-            output.append(value)
-        return output
+        if not group_by:
+            values = [next(iter(results.values())) if results else 0 for results in (cached_debit, cached_credit)]
+            return {}, tuple(values)
+
+        sides = []
+        for results in (cached_debit, cached_credit):
+            if not results:
+                sides.append({})
+            elif self.group_by_custom_querysets:
+                sides.append({str(i): x[annotation] for i, x in enumerate(results)})
+            else:
+                sides.append({key: x.get(annotation, 0) for key, x in results.items()})
+        debit, credit = sides
+        index = {key: (debit.get(key, 0), credit.get(key, 0)) for key in debit.keys() | credit.keys()}
+        return index, (0, 0)
 
     @classmethod
     def get_full_dependency_list(cls):
@@ -386,29 +532,24 @@ class FirstBalanceField(ComputationField):
     name = "__fb__"
     verbose_name = _("opening balance")
 
-    def prepare(
-        self,
-        q_filters: list | object = None,
-        kwargs_filters: dict = None,
-        main_queryset=None,
-        group_by: str = None,
-        prevent_group_by=None,
-        **kwargs,
-    ):
-        extra_filters = kwargs_filters or {}
+    def get_prepare_filters(self, q_filters=None, kwargs_filters=None):
+        q_filters, extra_filters = super().get_prepare_filters(q_filters, kwargs_filters)
         if self.date_field:
             from_date_value = extra_filters.get(f"{self.date_field}__gte")
             extra_filters.pop(f"{self.date_field}__gte", None)
             extra_filters[f"{self.date_field}__lt"] = from_date_value
-        return super(FirstBalanceField, self).prepare(
-            q_filters, kwargs_filters, main_queryset, group_by, prevent_group_by, **kwargs
-        )
+        return q_filters, extra_filters
 
     def resolve(self, prepared_results, required_computation_results: dict, current_pk, current_row=None) -> float:
         if not self.date_field:
             return 0
         return super().resolve(prepared_results, required_computation_results, current_pk, current_row)
 
+    def get_subquery(self, q_filters=None, kwargs_filters=None, outer_ref=None):
+        if not self.date_field:
+            return Value(0)
+        return self.get_prepared_subquery(q_filters, kwargs_filters, outer_ref)
+
 
 field_registry.register(FirstBalanceField)
 
@@ -433,6 +574,13 @@ class BalanceReportField(ComputationField):
 
         return result + fb
 
+    def get_subquery(self, q_filters=None, kwargs_filters=None, outer_ref=None):
+        expression = self.get_prepared_subquery(q_filters, kwargs_filters, outer_ref)
+        if expression is None:
+            return None
+        fb = self._get_required_instance(FirstBalanceField).get_subquery(q_filters, kwargs_filters, outer_ref)
+        return None if fb is None else expression + fb
+
 
 field_registry.register(BalanceReportField)
 
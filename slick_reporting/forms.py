@@ -1,13 +1,24 @@
+import json
 from collections import OrderedDict
+from functools import partial
 
 from crispy_forms.helper import FormHelper
 from django import forms
+from django.db import connections
+from django.db.models.expressions import RawSQL
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from . import app_settings
+from .cache import LocalCache, freeze
 from .helpers import get_foreign_keys, get_field_from_query_text
 
+report_form_classes = LocalCache(max_size=256)
+"""The report form classes, per view class and configuration"""
+
+distinct_choices = LocalCache(max_size=128, timeout=300)
+"""The choices of the traversing crosstab fields, refreshed every 5 minutes"""
+
 TIME_SERIES_CHOICES = (
     ("monthly", _("Monthly")),
     ("weekly", _("Weekly")),
@@ -40,6 +51,8 @@ def get_crispy_helper(
     helper.form_tag = False
     helper.disable_csrf = True
     helper.render_unmentioned_fields = True
+    # the widgets media depends on jQuery, it's rendered by the report template after the slick reporting resources
+    helper.include_media = False
 
     helper.layout = Layout()
     if add_date_range:
@@ -72,6 +85,19 @@ def get_choices_form_queryset_list(qs):
     return choices
 
 
+def get_distinct_choices(model, field_name):
+    """
+    The distinct values of a model field as choices, served from the `distinct_choices` cache
+    :param model: the model
+    :param field_name: the field name
+    :return: a list of (value, value)
+    """
+    return distinct_choices.get_or_set(
+        (model._meta.label_lower, field_name),
+        lambda: get_choices_form_queryset_list(list(model.objects.values_list(field_name, flat=True).distinct())),
+    )
+
+
 class OrderByForm(forms.Form):
     order_by = forms.CharField(required=False)
 
@@ -103,6 +129,53 @@ class OrderByForm(forms.Form):
         return None, None
 
 
+VALUES_PARAMETER_SQL = {
+    "postgresql": "SELECT unnest(%s)",
+    "sqlite": "SELECT value FROM json_each(%s)",
+}
+"""The subquery of the values of a single array (PostgreSQL) or JSON (SQLite) parameter, per database vendor"""
+
+
+def get_values_parameter(values, field, using="default"):
+    """
+    Pass a list of values to the database as a single parameter, so that a selection of thousands of objects neither
+    binds thousands of parameters nor hits the SQLite variables limit
+    :param values: the values
+    :param field: the model field the values are compared to
+    :param using: the database alias
+    :return: a RawSQL subquery usable with `__in`, or None if the database doesn't support it
+    """
+    connection = connections[using]
+    sql = VALUES_PARAMETER_SQL.get(connection.vendor)
+    if sql is None:
+        return None
+    values = [field.get_db_prep_value(value, connection) for value in values]
+    if connection.vendor == "sqlite":
+        values = json.dumps(values, default=str)
+    return RawSQL(sql, [values], output_field=field)
+
+
+def get_foreign_key_subquery(field, queryset):
+    """
+    Return the selected objects of a foreign key filter as a subquery of the values the foreign key refers to
+    (the primary key, or its `to_field`).
+    A lazy queryset stays a subquery, keeping its criteria in SQL. An evaluated one, like the selection of the
+    generated form (fetched by its validation), is passed as a single parameter where the database supports it.
+    :param field: the foreign key field of the report model
+    :param queryset: the selected objects queryset
+    :return: a subquery usable with `{field.attname}__in`
+    """
+    target_field = getattr(field, "target_field", None)
+    if target_field is None:
+        return queryset.values("pk")
+    if queryset._result_cache is not None:
+        values = [getattr(obj, target_field.attname) for obj in queryset]
+        subquery = get_values_parameter(values, target_field, queryset.db)
+        if subquery is not None:
+            return subquery
+    return queryset.values(target_field.attname)
+
+
 class BaseReportForm:
     def get_filters(self):
         raise NotImplementedError(
@@ -141,6 +214,7 @@ class BaseReportForm:
         helper.form_tag = False
         helper.disable_csrf = True
         helper.render_unmentioned_fields = True
+        helper.include_media = False
         return helper
 
 
@@ -161,6 +235,8 @@ class SlickReportForm(BaseReportForm):
     def get_filters(self):
         """
         Get the foreign key filters for report queryset, excluding crosstab ids, handled by `get_crosstab_ids()`
+        Each filter is a subquery on the values the foreign key refers to, the selection (already fetched by the form
+        validation) being bound as a single parameter, see `get_foreign_key_subquery`.
         :return: a dicttionary of filters to be used with QuerySet.filter(**returned_value)
         """
         _values = {}
@@ -172,8 +248,7 @@ class SlickReportForm(BaseReportForm):
                 if key in self.cleaned_data and not key == self.crosstab_key_name:
                     val = self.cleaned_data[key]
                     if val:
-                        val = [x for x in val.values_list("pk", flat=True)]
-                        _values["%s__in" % key] = val
+                        _values["%s__in" % key] = get_foreign_key_subquery(field, val)
             return None, _values
 
     @cached_property
@@ -215,6 +290,35 @@ class SlickReportForm(BaseReportForm):
         )
 
 
+class AutocompleteSelectMultiple(forms.SelectMultiple):
+    """
+    A multiple select rendering only its selected options, the others are searched via the report view
+    `_autocomplete` endpoint.
+    """
+
+    @property
+    def media(self):
+        media = app_settings.SLICK_REPORTING_SETTINGS["AUTOCOMPLETE"]["MEDIA"]
+        return forms.Media(css=media.get("css", {}), js=media.get("js", ()))
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        selected = [v for v in value if v not in (None, "")]
+        if not selected:
+            self.choices = []
+        elif hasattr(choices, "queryset"):
+            field = choices.field
+            lookup = f"{field.to_field_name or 'pk'}__in"
+            self.choices = [
+                (field.prepare_value(obj), field.label_from_instance(obj))
+                for obj in choices.queryset.filter(**{lookup: selected})
+            ]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+
 def _default_foreign_key_widget(f_field):
     return {
         "form_class": forms.ModelMultipleChoiceField,
@@ -222,6 +326,14 @@ def _default_foreign_key_widget(f_field):
     }
 
 
+def _autocomplete_foreign_key_widget(name):
+    return {
+        "form_class": forms.ModelMultipleChoiceField,
+        "required": False,
+        "widget": AutocompleteSelectMultiple(attrs={"data-autocomplete-field": name}),
+    }
+
+
 def report_form_factory(
     model,
     crosstab_model=None,
@@ -238,6 +350,7 @@ def report_form_factory(
     time_series_selector_allow_empty=False,
     add_start_date=True,
     add_end_date=True,
+    autocomplete_fields=None,
 ):
     """
     Create a Report Form based on the report_model passed by
@@ -255,6 +368,8 @@ def report_form_factory(
     :param excluded_fields: a list of fields to be excluded from the report form
     :param initial a dict for fields initial
     :param required a list of fields that should be marked as required
+    :param autocomplete_fields: a list of foreign keys only rendering their selected options, the others being searched
+           via the report view `_autocomplete` endpoint
     :return:
     """
     crosstab_field_related_name = ""
@@ -301,9 +416,13 @@ def report_form_factory(
             choices=time_series_selector_choices or TIME_SERIES_CHOICES,
         )
 
+    autocomplete_fields = autocomplete_fields or []
     for name, f_field in fkeys_map.items():
         fkeys_list.append(name)
-        field_attrs = foreign_key_widget_func(f_field)
+        if name in autocomplete_fields:
+            field_attrs = _autocomplete_foreign_key_widget(name)
+        else:
+            field_attrs = foreign_key_widget_func(f_field)
         if name in required:
             field_attrs["required"] = True
         field_attrs["initial"] = initial.get(name, "")
@@ -332,13 +451,8 @@ def report_form_factory(
                 pass
             else:
                 fields[crosstab_field_related_name] = forms.MultipleChoiceField(
-                    choices=get_choices_form_queryset_list(
-                        list(
-                            crosstab_field_klass.model.objects.values_list(
-                                crosstab_field_related_name, flat=True
-                            ).distinct()
-                        )
-                    ),
+                    # evaluated on use, so the form class can be reused
+                    choices=partial(get_distinct_choices, crosstab_field_klass.model, crosstab_field_related_name),
                     required=False,
                     label=crosstab_field_klass.verbose_name,
                 )
@@ -363,3 +477,19 @@ def report_form_factory(
         },
     )
     return new_form
+
+
+def get_report_form_class(owner, model, **kwargs):
+    """
+    A memoized `report_form_factory`: the form class is built once per owner (ie: the view class), model and arguments.
+    The callable arguments (ie: `fkeys_filter_func`) are considered part of the owner and are not in the key.
+    :param owner: the class the form is for
+    :param model: the report model
+    :param kwargs: the `report_form_factory` arguments
+    :return: the form class
+    """
+    try:
+        key = (owner, model, freeze({k: v for k, v in kwargs.items() if not callable(v)}))
+    except TypeError:
+        return report_form_factory(model, **kwargs)
+    return report_form_classes.get_or_set(key, lambda: report_form_factory(model, **kwargs))
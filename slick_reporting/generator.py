@@ -1,12 +1,28 @@
 import datetime
 import logging
+import operator
+from contextlib import nullcontext
 from dataclasses import dataclass
 from inspect import isclass
 
+from asgiref.sync import sync_to_async
 from django.core.exceptions import ImproperlyConfigured, FieldDoesNotExist
-from django.db.models import Q, ForeignKey
+from django.db.models import F, ForeignKey, OuterRef, Q, QuerySet
+from django.utils.translation import get_language
 
 from .app_settings import SLICK_REPORTING_DEFAULT_CHARTS_ENGINE
+from .cache import ClosedPeriodsMemo, LocalCache, freeze
+from .execution import (
+    arun_tasks,
+    execute_bucketed,
+    execute_crosstab_grouped,
+    execute_fused,
+    execute_rollups,
+    is_truncated,
+    run_tasks,
+    QueryPlanner,
+    TRUNC_KINDS,
+)
 from .fields import ComputationField
 from .helpers import get_field_from_query_text
 from .registry import field_registry
@@ -14,6 +30,18 @@ from . import app_settings
 
 logger = logging.getLogger(__name__)
 
+_exhausted = object()
+
+HAVING_LOOKUPS = {
+    "exact": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda value, values: value in values,
+}
+
 
 @dataclass
 class Chart:
@@ -44,6 +72,22 @@ class Chart:
         )
 
 
+@dataclass(frozen=True)
+class ReportPlan:
+    """
+    The parsed columns of a report configuration, compiled once and shared by the generators of that configuration.
+    The generators work on copies of the columns.
+    """
+
+    parsed_columns: tuple
+    crosstab_parsed_columns: tuple
+    time_series_parsed_columns: tuple
+
+
+report_plans = LocalCache(max_size=256)
+"""The report plans, per generator class and configuration"""
+
+
 class ReportGeneratorAPI:
     report_model = None
     """The main model where data is """
@@ -150,6 +194,46 @@ class ReportGeneratorAPI:
     """If True, crosstab reads pre-computed values from the database instead of aggregating raw data.
     In this mode, crosstab_columns should be a list of DB column name strings (not ComputationField classes)."""
 
+    fused_execution = False
+    """If True, computation fields sharing the same base queryset are computed together in a single query,
+    using one filtered aggregate per column / period / crosstab id.
+    Computation fields with a custom `prepare` (or `fusable = False`) are still prepared on their own."""
+
+    time_series_engine = "periods"
+    """How the time series columns are computed:
+    `periods`: one query per period per computation field (default)
+    `database`: one query per computation field, grouped by the period start using the database `Trunc` function.
+    Opening balances (ie: `__fb__`) take two queries for all the periods, accumulated as a running sum.
+    Used with the daily, weekly, monthly, quarterly & annually patterns when the dates are aligned on the period
+    boundaries, otherwise the `periods` engine is used."""
+
+    defer_preparations = False
+    """If True, the computation fields queries are not run on init, but on `run_preparations` (or awaited on
+    `arun_preparations`), or lazily when the report data is first requested."""
+
+    crosstab_engine = "ids"
+    """How the crosstab columns are computed:
+    `ids`: one query per crosstab id per computation field, plus one for the remainder (default)
+    `database`: one query per computation field grouped by (group_by, crosstab_field), plus one for the group totals
+    when the remainder is computed, the remainder being the total minus the selected ids.
+    Used with `Sum` and `Count` computation fields, other fields (and `crosstab_ids_custom_filters`) use `ids`."""
+
+    having = None
+    """A list of (column name, lookup, value) conditions the report rows must meet, ie: `[("__balance__", "ne", 0)]`.
+    The lookups are `exact`, `ne`, `gt`, `gte`, `lt`, `lte` and `in`.
+    The conditions on the group by columns and on the computation fields which can be expressed as a subquery are
+    filtered by the database, so only the surviving groups are resolved, the others are checked on the resolved rows."""
+
+    memoize_closed_periods = False
+    """If True, the computation fields results over closed periods (ie: the past months of a time series) are kept in
+    the cache indefinitely, so only the open period is computed again, see `slick_reporting.cache.ClosedPeriodsMemo`.
+    Call `slick_reporting.cache.invalidate_closed_periods` after changing rows of a closed period."""
+
+    rollups = None
+    """The rollup models (see `slick_reporting.models.ReportRollup`) the computation fields are read from when they
+    can answer their queries. None (default) for the rollups derived from this generator, or from its container
+    view (see `ReportRollup.report_view`), an empty list to always read the report model."""
+
 
 class ReportGenerator(ReportGeneratorAPI, object):
     """
@@ -160,6 +244,27 @@ class ReportGenerator(ReportGeneratorAPI, object):
     """You can have a custom computation field locator! It only needs a `get_field_by_name(string)` 
     and returns a ReportField`"""
 
+    query_planner_class = QueryPlanner
+    """The class in charge of executing each distinct computation query only once per report, its instance is
+    available as `query_planner` and reports the number of `saved_queries`"""
+
+    iterator_chunk_size = 2000
+    """The number of records fetched at once by `get_report_data_iter`"""
+
+    executor_workers = None
+    """The number of threads the independent computation fields queries are run on, 0 or 1 to run them one after
+    the other. None (default) to use `SLICK_REPORTING_SETTINGS["EXECUTOR"]["workers"]`"""
+
+    cache_report_plan = True
+    """If True, the parsed columns (the report plan) are reused across the generators of the same configuration,
+    see `get_report_plan_key`. Set to False if the columns hooks depend on anything else (ie: the request)."""
+
+    cache_alias = "default"
+    """The cache the closed periods results are memoized in, see `memoize_closed_periods`"""
+
+    profiler = None
+    """A `slick_reporting.profiling.ReportProfiler` recording the timings and queries of the report generation"""
+
     def __init__(
         self,
         report_model=None,
@@ -182,6 +287,11 @@ class ReportGenerator(ReportGeneratorAPI, object):
         crosstab_ids_custom_filters=None,
         crosstab_compute_remainder=None,
         crosstab_precomputed=None,
+        fused_execution=None,
+        time_series_engine=None,
+        crosstab_engine=None,
+        having=None,
+        defer_preparations=None,
         swap_sign=False,
         show_empty_records=None,
         print_flag=False,
@@ -193,6 +303,10 @@ class ReportGenerator(ReportGeneratorAPI, object):
         start_date_field_name=None,
         end_date_field_name=None,
         table_name=None,
+        rollups=None,
+        memoize_closed_periods=None,
+        cache_alias=None,
+        profiler=None,
     ):
         """
 
@@ -211,6 +325,11 @@ class ReportGenerator(ReportGeneratorAPI, object):
         :param crosstab_columns:
         :param crosstab_ids:
         :param crosstab_compute_remainder:
+        :param fused_execution:
+        :param time_series_engine:
+        :param crosstab_engine:
+        :param having: a list of (column name, lookup, value) conditions the rows must meet
+        :param defer_preparations:
         :param swap_sign:
         :param show_empty_records:
         :param base_model:
@@ -218,6 +337,10 @@ class ReportGenerator(ReportGeneratorAPI, object):
         :param doc_type_plus_list:
         :param doc_type_minus_list:
         :param limit_records:
+        :param rollups: the rollup models the computation fields can be read from
+        :param memoize_closed_periods: memoize the computation fields results over closed periods
+        :param cache_alias: the cache the closed periods results are memoized in
+        :param profiler: a `ReportProfiler` instance
         """
         from .app_settings import (
             SLICK_REPORTING_DEFAULT_START_DATE,
@@ -268,6 +391,27 @@ class ReportGenerator(ReportGeneratorAPI, object):
         )
         self.crosstab_precomputed = self.crosstab_precomputed if crosstab_precomputed is None else crosstab_precomputed
         self._precomputed_crosstab_data = {}
+        self.fused_execution = self.fused_execution if fused_execution is None else fused_execution
+        self.time_series_engine = time_series_engine or self.time_series_engine
+        if self.time_series_engine not in ("periods", "database"):
+            raise ImproperlyConfigured(
+                f"time_series_engine should be either 'periods' or 'database', not '{self.time_series_engine}'"
+            )
+        self.defer_preparations = self.defer_preparations if defer_preparations is None else defer_preparations
+        self._pending_tasks = []
+        self.crosstab_engine = crosstab_engine or self.crosstab_engine
+        if self.crosstab_engine not in ("ids", "database"):
+            raise ImproperlyConfigured(
+                f"crosstab_engine should be either 'ids' or 'database', not '{self.crosstab_engine}'"
+            )
+        self.having = list(having or self.having or [])
+        for condition in self.having:
+            if len(condition) != 3 or condition[1] not in HAVING_LOOKUPS:
+                raise ImproperlyConfigured(
+                    f"having conditions should be (column name, lookup, value) tuples, the lookup one of "
+                    f"{', '.join(HAVING_LOOKUPS)}, not {condition!r}"
+                )
+        self._having_checks = []
 
         if self.crosstab_precomputed:
             if not self.crosstab_field:
@@ -305,6 +449,8 @@ class ReportGenerator(ReportGeneratorAPI, object):
 
         self._prepared_results = {}
         self.report_fields_classes = {}
+        self._job_names = None
+        self.query_planner = self.query_planner_class() if self.query_planner_class else None
 
         self._report_fields_dependencies = {
             "time_series": {},
@@ -344,11 +490,22 @@ class ReportGenerator(ReportGeneratorAPI, object):
         # todo delete this
         self.show_empty_records = False  # show_empty_records if show_empty_records else self.show_empty_records
 
+        self.rollups = self.rollups if rollups is None else rollups
+        self.memoize_closed_periods = (
+            self.memoize_closed_periods if memoize_closed_periods is None else memoize_closed_periods
+        )
+        self.cache_alias = cache_alias or self.cache_alias
+        self.closed_periods_memo = None
+
         # Preparing actions
-        self._parse()
+        self.profiler = profiler or self.profiler
+        with self._profile_phase("parse"):
+            self._parse()
 
         self.main_queryset = self.prepare_queryset(main_queryset)
         self._prepare_report_dependencies()
+        if self.having:
+            self.main_queryset, self._having_checks = self.apply_having(self.main_queryset)
 
     def _get_fk_group_by_queryset(self, filtered_qs):
         """Return the related-model queryset for a ForeignKey group_by field."""
@@ -365,6 +522,8 @@ class ReportGenerator(ReportGeneratorAPI, object):
         if self.crosstab_precomputed:
             self._build_precomputed_crosstab_data(queryset)
             self._crosstab_parsed_columns = self.get_crosstab_parsed_columns()
+            # the crosstab ids are discovered with the data, after the report plan
+            self._display_time_series_columns = self.get_time_series_parsed_columns()
 
             if not self.group_by:
                 return [{}]
@@ -450,6 +609,17 @@ class ReportGenerator(ReportGeneratorAPI, object):
         if not self.crosstab_ids:
             self.crosstab_ids = sorted(crosstab_values_set)
 
+    def get_crosstab_column_name(self, crosstab_field=None):
+        """
+        The name the crosstab field is filtered on
+        :param crosstab_field: default to `crosstab_field`
+        :return: the field column, or the crosstab field as is if it traverses a relation
+        """
+        crosstab_field = crosstab_field or self.crosstab_field
+        if "__" in crosstab_field:
+            return crosstab_field
+        return get_field_from_query_text(crosstab_field, self.report_model).column
+
     def _construct_crosstab_filter(self, col_data, queryset_filters=None):
         """
         In charge of adding the needed crosstab filter, specific to the case of is_remainder or not
@@ -459,11 +629,7 @@ class ReportGenerator(ReportGeneratorAPI, object):
         if queryset_filters:
             return queryset_filters[0], queryset_filters[1]
 
-        if "__" in col_data["crosstab_field"]:
-            column_name = col_data["crosstab_field"]
-        else:
-            field = get_field_from_query_text(col_data["crosstab_field"], self.report_model)
-            column_name = field.column
+        column_name = self.get_crosstab_column_name(col_data["crosstab_field"])
         if col_data["is_remainder"] and not queryset_filters:
             filters = [~Q(**{f"{column_name}__in": self.crosstab_ids})]
         else:
@@ -473,6 +639,7 @@ class ReportGenerator(ReportGeneratorAPI, object):
     def _prepare_report_dependencies(self):
         from .fields import ComputationField
 
+        jobs = []
         all_columns = (
             ("normal", self._parsed_columns),
             ("time_series", self._time_series_parsed_columns),
@@ -523,20 +690,148 @@ class ReportGenerator(ReportGeneratorAPI, object):
                     group_by_custom_querysets=self.group_by_custom_querysets,
                 )
 
-                q_filters = None
-                date_filter = {}
-                if self.start_date_field_name:
-                    date_filter[f"{self.start_date_field_name}__gte"] = col_data.get("start_date", self.start_date)
-                if self.end_date_field_name:
-                    date_filter[f"{self.end_date_field_name}__lt"] = col_data.get("end_date", self.end_date)
+                q_filters, date_filter = self.get_column_filters(window, col_data)
+                preparations = report_class.collect_preparations(q_filters, date_filter)
+                if "is_remainder" in col_data and not self.crosstab_ids_custom_filters:
+                    for job in preparations:
+                        job.crosstab = col_data["id"], col_data["is_remainder"]
+                jobs += preparations
+                self.report_fields_classes[name] = report_class
 
-                date_filter.update(self.kwargs_filters)
-                if window == "crosstab" or col_data.get("computation_flag", "") == "crosstab":
-                    q_filters, kw_filters = col_data["queryset_filters"]
-                    date_filter.update(kw_filters)
+        self._execute_preparations(jobs)
 
-                report_class.init_preparation(q_filters, date_filter)
-                self.report_fields_classes[name] = report_class
+    def get_executor_workers(self):
+        """
+        :return: the number of threads the computation fields are prepared on
+        """
+        if self.executor_workers is not None:
+            return self.executor_workers
+        return app_settings.SLICK_REPORTING_SETTINGS["EXECUTOR"].get("workers")
+
+    def get_column_filters(self, window, col_data):
+        """
+        Get the filters a computation field column is computed with
+        :param window: "normal", "time_series" or "crosstab"
+        :param col_data: the parsed column
+        :return: a tuple of (q_filters, kwargs_filters)
+        """
+        q_filters = None
+        date_filter = {}
+        if self.start_date_field_name:
+            date_filter[f"{self.start_date_field_name}__gte"] = col_data.get("start_date", self.start_date)
+        if self.end_date_field_name:
+            date_filter[f"{self.end_date_field_name}__lt"] = col_data.get("end_date", self.end_date)
+
+        date_filter.update(self.kwargs_filters)
+        if window == "crosstab" or col_data.get("computation_flag", "") == "crosstab":
+            q_filters, kw_filters = col_data["queryset_filters"]
+            date_filter.update(kw_filters)
+        return q_filters, date_filter
+
+    def _execute_preparations(self, jobs):
+        """
+        Run the queries needed by the computation fields on the report
+        :param jobs: a list of `PreparationJob`
+        """
+        tasks = []
+        if self.query_planner:
+            jobs = self.query_planner.plan(jobs)
+        if self.memoize_closed_periods:
+            self.closed_periods_memo = ClosedPeriodsMemo(
+                self.report_model or self.queryset.model,
+                self.start_date_field_name,
+                self.end_date_field_name,
+                cache_alias=self.cache_alias,
+            )
+            jobs = self.closed_periods_memo.load(jobs)
+        rollups = self.get_rollups()
+        if rollups:
+            jobs = execute_rollups(jobs, rollups, tasks=tasks)
+        if self.time_series_engine == "database":
+            bucket_kind = self.get_time_series_bucket_kind()
+            if bucket_kind:
+                jobs = execute_bucketed(
+                    jobs,
+                    self.start_date_field_name,
+                    bucket_kind,
+                    self._get_time_series_dates(self.time_series_pattern),
+                    tasks=tasks,
+                )
+        if self.crosstab_engine == "database" and self.crosstab_field and not self.crosstab_precomputed:
+            jobs = execute_crosstab_grouped(jobs, self.get_crosstab_column_name(), self.crosstab_ids, tasks=tasks)
+        if self.fused_execution:
+            jobs = execute_fused(jobs, tasks=tasks)
+        tasks += [job.run for job in jobs]
+        if self.profiler:
+            tasks = [self.profiler.wrap_task(task, self) for task in tasks]
+        self._pending_tasks = tasks
+        if not self.defer_preparations:
+            self.run_preparations()
+
+    def get_rollups(self):
+        """
+        :return: the rollup models the computation fields can be read from
+        """
+        if self.rollups is not None:
+            return self.rollups
+        # the rollups are models, only loaded once the apps are ready
+        from .models import get_rollup_models
+
+        return [
+            rollup
+            for rollup in get_rollup_models()
+            if isinstance(self, rollup.get_report_view()) or isinstance(self.container_class, rollup.get_report_view())
+        ]
+
+    def run_preparations(self):
+        """
+        Run the pending computation fields queries
+        """
+        tasks, self._pending_tasks = self._pending_tasks, []
+        with self._profile_phase("prepare"):
+            run_tasks(tasks, self.get_executor_workers())
+        self._share_planned_results()
+        if self.closed_periods_memo:
+            self.closed_periods_memo.store()
+
+    def _share_planned_results(self):
+        if not self.query_planner:
+            return
+        if self.profiler:
+            for leader, job in self.query_planner.get_shared_jobs():
+                self.profiler.shared[self.get_job_name(job)] = self.get_job_name(leader)
+        self.query_planner.share_results()
+
+    async def arun_preparations(self):
+        """
+        Await the pending computation fields queries, run concurrently off the event loop
+        """
+        tasks, self._pending_tasks = self._pending_tasks, []
+        with self._profile_phase("prepare"):
+            await arun_tasks(tasks, self.get_executor_workers())
+        self._share_planned_results()
+        if self.closed_periods_memo:
+            await sync_to_async(self.closed_periods_memo.store)()
+
+    def _profile_phase(self, name):
+        return self.profiler.phase(name) if self.profiler else nullcontext()
+
+    def get_job_name(self, job):
+        """
+        The name a preparation job is profiled under: its column name, prefixed to the requirement name for the
+        requirements of a computation field (ie: `__total__TS20240201.__debit__`)
+        :param job: a `PreparationJob`
+        """
+        if self._job_names is None:
+            self._job_names = {}
+            for name, instance in self.report_fields_classes.items():
+                self._add_job_names(name, instance)
+        return self._job_names.get(id(job.instance), job.instance.name)
+
+    def _add_job_names(self, name, instance):
+        self._job_names[id(instance)] = name
+        for dep_name, requirement in (getattr(instance, "_required_prepared_results", None) or {}).items():
+            self._add_job_names(f"{name}.{dep_name}", requirement["instance"])
 
     # @staticmethod
     def get_primary_key_name(self, model):
@@ -554,72 +849,294 @@ class ReportGenerator(ReportGeneratorAPI, object):
         :param: columns： The columns we iterate on
         :return: a dict object containing all needed data
         """
+        return self._resolve_record(obj, self._compile_record_plan(columns))
 
-        data = {}
-        group_by_val = None
+    def _get_group_by_key(self):
+        """
+        The key holding the group by value in each record of the main queryset
+        :return: a string or None if the report is not grouped
+        """
         if self.group_by_custom_querysets:
-            group_by_val = str(obj["__index__"])
-
-        elif self.group_by:
+            return "__index__"
+        if self.group_by:
             if self.group_by_field.related_model and "__" not in self.group_by:
-                primary_key_name = self.get_primary_key_name(self.group_by_field.related_model)
-            else:
-                primary_key_name = self.group_by_field_attname
-
-            column_data = obj.get(primary_key_name, obj.get("id"))
-            group_by_val = str(column_data)
+                return self.get_primary_key_name(self.group_by_field.related_model)
+            return self.group_by_field_attname
+        return None
 
+    def _compile_record_plan(self, columns):
+        """
+        Compile the columns into the plan resolving each record, done once per report instead of once per record
+        :param columns: The columns we iterate on
+        :return: a tuple of (group_by_key, [(column_name, resolver(obj, group_by_val, data)), ...])
+        """
+        grouped = bool(self.group_by or self.group_by_custom_querysets)
+        resolvers = []
         for window, window_cols in columns:
             for col_data in window_cols:
                 name = col_data["name"]
+                source = col_data.get("source", "")
+
+                if source == "precomputed_crosstab":
+                    resolver = self._get_precomputed_crosstab_resolver(
+                        col_data["crosstab_value"], col_data["crosstab_column"]
+                    )
+                elif source in ("attribute_field", "container_class_attribute_field"):
+                    resolver = self._get_attribute_resolver(col_data["ref"])
+                elif (source == "magic_field" and grouped) or not grouped:
+                    resolver = self._get_computation_resolver(window, col_data)
+                    if resolver is None:
+                        continue
+                else:
+                    resolver = self._get_value_resolver(name)
+                resolvers.append((name, resolver))
+        return self._get_group_by_key(), resolvers
 
-                if col_data.get("source", "") == "precomputed_crosstab":
-                    crosstab_val = col_data["crosstab_value"]
-                    crosstab_col = col_data["crosstab_column"]
-                    group_data = self._precomputed_crosstab_data.get(group_by_val, {})
-                    data[name] = group_data.get(crosstab_val, {}).get(crosstab_col, 0)
-
-                elif col_data.get("source", "") == "attribute_field":
-                    data[name] = col_data["ref"](obj, data)
-                elif col_data.get("source", "") == "container_class_attribute_field":
-                    data[name] = col_data["ref"](obj, data)
-
-                elif (
-                    col_data.get("source", "") == "magic_field" and (self.group_by or self.group_by_custom_querysets)
-                ) or (not (self.group_by or self.group_by_custom_querysets)):
-                    source = self._report_fields_dependencies[window].get(name, False)
-
-                    if source:
-                        computation_class = self.report_fields_classes[source]
-                        # the computation field is being asked from another computation field that requires it.
-                        value = computation_class.get_dependency_value(group_by_val, col_data["ref"].name)
-                    else:
-                        try:
-                            computation_class = self.report_fields_classes[name]
-                        except KeyError:
-                            continue
-                        value = computation_class.do_resolve(group_by_val, data)
-                    if self.swap_sign:
-                        value = -value
-                    data[name] = value
+    def _resolve_record(self, obj, plan):
+        """
+        Apply a compiled record plan on a record of the main queryset
+        :param obj: current row
+        :param plan: the plan returned by `_compile_record_plan`
+        :return: a dict object containing all needed data
+        """
+        group_by_key, resolvers = plan
+        group_by_val = None
+        if group_by_key:
+            group_by_val = str(obj.get(group_by_key, obj.get("id")))
 
-                else:
-                    data[name] = obj.get(name, "")
+        data = {}
+        for name, resolver in resolvers:
+            data[name] = resolver(obj, group_by_val, data)
         return data
 
+    def _get_precomputed_crosstab_resolver(self, crosstab_val, crosstab_col):
+        precomputed_data = self._precomputed_crosstab_data
+
+        def resolver(obj, group_by_val, data):
+            return precomputed_data.get(group_by_val, {}).get(crosstab_val, {}).get(crosstab_col, 0)
+
+        return resolver
+
+    @staticmethod
+    def _get_attribute_resolver(ref):
+        def resolver(obj, group_by_val, data):
+            return ref(obj, data)
+
+        return resolver
+
+    @staticmethod
+    def _get_value_resolver(name):
+        def resolver(obj, group_by_val, data):
+            return obj.get(name, "")
+
+        return resolver
+
+    def _get_computation_resolver(self, window, col_data):
+        """
+        :return: the resolver of a computation field column, None if the column is not computed on this report
+        """
+        name = col_data["name"]
+        source = self._report_fields_dependencies[window].get(name, False)
+        if source:
+            # the computation field is being asked from another computation field that requires it.
+            get_dependency_value = self.report_fields_classes[source].get_dependency_value
+            dependency_name = col_data["ref"].name
+
+            def resolve(obj, group_by_val, data):
+                return get_dependency_value(group_by_val, dependency_name)
+
+        else:
+            computation_class = self.report_fields_classes.get(name)
+            if computation_class is None:
+                return None
+            do_resolve = computation_class.do_resolve
+
+            def resolve(obj, group_by_val, data):
+                return do_resolve(group_by_val, data)
+
+        if not self.swap_sign:
+            return resolve
+
+        def resolver(obj, group_by_val, data):
+            return -resolve(obj, group_by_val, data)
+
+        return resolver
+
     def get_report_data(self):
         main_queryset = self.main_queryset[: self.limit_records] if self.limit_records else self.main_queryset
+        return list(self._iter_records(main_queryset))
+
+    def get_report_data_page(self, start=0, length=None, order_by=None):
+        """
+        Get a page of the report rows, only the rows of the page are resolved.
+        When possible, the ordering is done by the database, otherwise all the rows are resolved and sorted.
+        :param start: the index of the first row
+        :param length: the number of rows, None for all the rows
+        :param order_by: a column name, prefixed with "-" for a descending order, ignored if not on the report
+        :return: a tuple of (rows, records_total)
+        """
+        if order_by and self._get_column_data(order_by.lstrip("-"))[1] is None:
+            order_by = None
+        if self._having_checks:
+            # the rows filtered in python can't be counted nor paginated by the database
+            data = self.order_rows(self.get_report_data(), order_by)
+            return data[start : None if length is None else start + length], len(data)
+
+        main_queryset = self.main_queryset[: self.limit_records] if self.limit_records else self.main_queryset
+        is_queryset = isinstance(main_queryset, QuerySet)
+        records_total = main_queryset.count() if is_queryset else len(main_queryset)
+        end = None if length is None else start + length
+
+        if order_by:
+            ordered_queryset = None
+            if is_queryset and not self.limit_records:
+                ordered_queryset = self.get_ordered_queryset(main_queryset, order_by)
+            if ordered_queryset is None:
+                return self.order_rows(self.get_report_data(), order_by)[start:end], records_total
+            main_queryset = ordered_queryset
+
+        return list(self._iter_records(main_queryset[start:end])), records_total
+
+    def order_rows(self, rows, order_by):
+        """
+        Order the report rows in python, the rows without a value come last (first in a descending order)
+        :param rows: a list of rows
+        :param order_by: a column name, prefixed with "-" for a descending order, ignored if not on the report
+        :return: the ordered list of rows
+        """
+        field = (order_by or "").lstrip("-")
+        if not field or self._get_column_data(field)[1] is None:
+            return rows
+        return sorted(rows, key=lambda x: (x[field] is None, x[field]), reverse=order_by.startswith("-"))
+
+    def get_ordered_queryset(self, queryset, order_by):
+        """
+        Order the main queryset by a column in the database, a computation field is annotated as a subquery
+        :param queryset: the main queryset
+        :param order_by: a column name, prefixed with "-" for a descending order
+        :return: the ordered queryset, or None if the column can't be ordered by the database
+        """
+        expression = self.get_column_expression(queryset, order_by.lstrip("-"))
+        if expression is None:
+            return None
+        if isinstance(expression, F):
+            field = expression
+        else:
+            queryset = queryset.alias(slick_order_by=expression)
+            field = F("slick_order_by")
+
+        return queryset.order_by(
+            field.desc() if order_by.startswith("-") else field.asc(), *queryset.query.values_select
+        )
+
+    def get_column_expression(self, queryset, name):
+        """
+        The database expression of a column value for each record of the main queryset,
+        a computation field is expressed as a subquery
+        :param queryset: the main queryset
+        :param name: the column name
+        :return: the expression, or None if the column can't be computed by the database
+        """
+        window, col_data = self._get_column_data(name)
+        if col_data is None or self.swap_sign:
+            return None
+
+        source = col_data.get("source", "")
+        if source == "magic_field":
+            computation_class = self.report_fields_classes.get(name)
+            if computation_class is None or not self.group_by or self.group_by_custom_querysets:
+                return None
+            if type(self.group_by_field) is ForeignKey:
+                outer_ref = {self.group_by_field_attname: OuterRef(self.group_by_field.target_field.attname)}
+            else:
+                outer_ref = {self.group_by_field_attname: OuterRef(self.group_by_field_attname)}
+            q_filters, kwargs_filters = self.get_column_filters(window, col_data)
+            return computation_class.get_subquery(q_filters, kwargs_filters, outer_ref)
+        elif source == "database" and name in queryset.query.values_select:
+            return F(name)
+        return None
+
+    def _get_column_data(self, name):
+        """
+        :return: a tuple of (the columns window: normal, time_series or crosstab, the parsed column), or
+        (None, None) if the column is not on the report
+        """
+        all_columns = (
+            ("normal", self._parsed_columns),
+            ("time_series", self._time_series_parsed_columns),
+            ("crosstab", self._crosstab_parsed_columns),
+        )
+        return next(
+            ((window, col) for window, cols in all_columns for col in cols if col["name"] == name), (None, None)
+        )
+
+    def apply_having(self, queryset):
+        """
+        Filter the main queryset on the `having` conditions the database can compute, so only the surviving groups
+        are resolved. The other conditions are checked on the resolved rows.
+        :param queryset: the main queryset
+        :return: a tuple of (the filtered queryset, the [(column name, check, value)] left to check on the rows)
+        """
+        remaining = []
+        for index, (name, lookup, value) in enumerate(self.having):
+            if self._get_column_data(name)[1] is None:
+                raise ImproperlyConfigured(f"having column {name} is not on the report")
+            expression = self.get_column_expression(queryset, name) if isinstance(queryset, QuerySet) else None
+            if expression is None:
+                remaining.append((name, HAVING_LOOKUPS[lookup], value))
+                continue
+            alias = f"slick_having_{index}"
+            queryset = queryset.alias(**{alias: expression})
+            if lookup == "ne":
+                queryset = queryset.exclude(**{alias: value})
+            else:
+                queryset = queryset.filter(**{f"{alias}__{lookup}": value})
+        return queryset, remaining
+
+    def get_report_data_iter(self, chunk_size=None):
+        """
+        Yield the report rows one by one, fetching the main queryset in chunks,
+        so that the memory used doesn't grow with the number of rows.
+        :param chunk_size: the number of records fetched from the database at once, default to `iterator_chunk_size`
+        :return: a generator of the formatted rows
+        """
+        main_queryset = self.main_queryset[: self.limit_records] if self.limit_records else self.main_queryset
+        if isinstance(main_queryset, QuerySet):
+            main_queryset = main_queryset.iterator(chunk_size=chunk_size or self.iterator_chunk_size)
+        yield from self._iter_records(main_queryset)
 
+    def _iter_records(self, records):
+        if self._pending_tasks:
+            self.run_preparations()
         all_columns = (
             ("normal", self._parsed_columns),
             ("time_series", self._time_series_parsed_columns),
             ("crosstab", self._crosstab_parsed_columns),
         )
 
-        get_record_data = self._get_record_data
+        plan = self._compile_record_plan(all_columns)
+        resolve_record = self._resolve_record
         format_row = self.format_row
-        data = [format_row(get_record_data(obj, all_columns)) for obj in main_queryset]
-        return data
+        having = self._having_checks
+        if not self.profiler and not having:
+            for obj in records:
+                yield format_row(resolve_record(obj, plan))
+            return
+
+        if self.profiler:
+            plan = self.profiler.wrap_record_plan(plan)
+        records = iter(records)
+        while True:
+            # the rows phase covers the records fetching and assembly, not the time the consumer spends on each row
+            with self._profile_phase("rows"):
+                obj = next(records, _exhausted)
+                if obj is _exhausted:
+                    break
+                row = resolve_record(obj, plan)
+                if having and not all(check(row[name], value) for name, check, value in having):
+                    continue
+                row = format_row(row)
+            yield row
 
     def _default_format_row(self, row_obj):
         """
@@ -761,7 +1278,54 @@ class ReportGenerator(ReportGeneratorAPI, object):
         return parsed_columns
 
     def _parse(self):
-        self.parsed_columns = self.check_columns(
+        if self.group_by_custom_querysets and "__index__" not in self.columns:
+            self.columns.insert(0, "__index__")
+        key = self.get_report_plan_key()
+        plan = self.compile_report_plan() if key is None else report_plans.get_or_set(key, self.compile_report_plan)
+
+        self.parsed_columns = self._copy_plan_columns(plan.parsed_columns)
+        self._parsed_columns = list(self.parsed_columns)
+        self._crosstab_parsed_columns = self._copy_plan_columns(plan.crosstab_parsed_columns)
+        self._time_series_parsed_columns = self._copy_plan_columns(plan.time_series_parsed_columns)
+        self._display_time_series_columns = self._time_series_parsed_columns
+
+    def get_report_plan_key(self):
+        """
+        Get everything the parsed columns depend on, to reuse the report plan across generators
+        :return: a hashable key, or None to compile the plan for this generator only
+        """
+        if not self.cache_report_plan or self.crosstab_ids_custom_filters:
+            return None
+        try:
+            return freeze(
+                (
+                    type(self),
+                    type(self.container_class),
+                    self.report_model,
+                    self.group_by,
+                    self.columns,
+                    self.time_series_pattern,
+                    self.time_series_columns,
+                    self.time_series_custom_dates,
+                    self.start_date,
+                    self.end_date,
+                    self.crosstab_field,
+                    self.crosstab_columns,
+                    self.crosstab_ids,
+                    self.crosstab_compute_remainder,
+                    self.crosstab_precomputed,
+                    get_language(),
+                )
+            )
+        except TypeError:
+            return None
+
+    def compile_report_plan(self):
+        """
+        Parse the columns, the time series and crosstab ones
+        :return: a ReportPlan
+        """
+        parsed_columns = self.check_columns(
             self,
             self.columns,
             self.group_by,
@@ -769,9 +1333,25 @@ class ReportGenerator(ReportGeneratorAPI, object):
             self.container_class,
             self.group_by_custom_querysets,
         )
-        self._parsed_columns = list(self.parsed_columns)
+        # the time series columns include the crosstab ones
         self._crosstab_parsed_columns = self.get_crosstab_parsed_columns()
-        self._time_series_parsed_columns = self.get_time_series_parsed_columns()
+        return ReportPlan(
+            tuple(parsed_columns),
+            tuple(self._crosstab_parsed_columns),
+            tuple(self.get_time_series_parsed_columns()),
+        )
+
+    def _copy_plan_columns(self, columns):
+        # the attribute columns refer to the generator (or container) the plan was compiled for
+        copies = []
+        for col in columns:
+            col = col.copy()
+            if col.get("source") == "attribute_field":
+                col["ref"] = getattr(self, col["name"], col["ref"])
+            elif col.get("source") == "container_class_attribute_field":
+                col["ref"] = getattr(self.container_class, col["name"], col["ref"])
+            copies.append(col)
+        return copies
 
     def get_database_columns(self):
         return [col["name"] for col in self.parsed_columns if "source" in col and col["source"] == "database"]
@@ -780,9 +1360,9 @@ class ReportGenerator(ReportGeneratorAPI, object):
     #     return [col['name'] for col in self.parsed_columns if col['type'] == 'method']
 
     def get_list_display_columns(self):
-        columns = self.parsed_columns
+        columns = list(self.parsed_columns)
         if self.time_series_pattern:
-            time_series_columns = self.get_time_series_parsed_columns()
+            time_series_columns = self._display_time_series_columns
             try:
                 index = self.columns.index("__time_series__")
                 columns[index:index] = time_series_columns
@@ -790,7 +1370,7 @@ class ReportGenerator(ReportGeneratorAPI, object):
                 columns += time_series_columns
 
         if self.crosstab_field:
-            crosstab_columns = self.get_crosstab_parsed_columns()
+            crosstab_columns = self._crosstab_parsed_columns
 
             try:
                 index = self.columns.index("__crosstab__")
@@ -829,6 +1409,7 @@ class ReportGenerator(ReportGeneratorAPI, object):
                         "start_date": dt[0],
                         "end_date": dt[1],
                         "source": "magic_field" if magic_field_class else "",
+                        "type": magic_field_class.type,
                         "is_summable": magic_field_class.is_summable,
                     }
                 )
@@ -857,6 +1438,19 @@ class ReportGenerator(ReportGeneratorAPI, object):
         pattern = pattern or self.time_series_pattern
         return computation_class.get_time_series_field_verbose_name(date_period, index, series, pattern)
 
+    def get_time_series_bucket_kind(self):
+        """
+        Get the database `Trunc` kind matching the time series, used by the `database` time series engine
+        :return: "day", "week", "month", "quarter" or "year", None if the time series can't be bucketed by the database
+        """
+        kind = TRUNC_KINDS.get(self.time_series_pattern)
+        if not kind or self.start_date_field_name != self.end_date_field_name:
+            return None
+        for start_date, end_date in self._get_time_series_dates(self.time_series_pattern):
+            if not is_truncated(start_date, kind) or not is_truncated(end_date, kind):
+                return None
+        return kind
+
     def get_custom_time_series_dates(self):
         """
         Hook to get custom , maybe separated date periods
@@ -989,8 +1583,8 @@ class ReportGenerator(ReportGeneratorAPI, object):
         A hook to send data about the report for front end which can later be used in charting
         :return:
         """
-        time_series_columns = self.get_time_series_parsed_columns()
-        crosstab_columns = self.get_crosstab_parsed_columns()
+        time_series_columns = self._display_time_series_columns
+        crosstab_columns = self._crosstab_parsed_columns
         metadata = {
             "time_series_pattern": self.time_series_pattern,
             "time_series_column_names": [x["name"] for x in time_series_columns],
@@ -1026,7 +1620,7 @@ class ReportGenerator(ReportGeneratorAPI, object):
     def get_full_response(
         self, data=None, report_slug=None, chart_settings=None, default_chart_title=None, default_chart_engine=None
     ):
-        data = data or self.get_report_data()
+        data = self.get_report_data() if data is None else data
         data = {
             "report_slug": report_slug or self.__class__.__name__,
             "data": data,
@@ -1092,55 +1686,50 @@ class ListViewReportGenerator(ReportGenerator):
             return query.values(*fields)
         return query
 
-    def _get_record_data(self, obj, columns):
+    def _compile_record_plan(self, columns):
         """
-        the function is run for every obj in the main_queryset
-        :param obj: current row
-        :param: columns： The columns we iterate on
-        :return: a dict object containing all needed data
+        Compile the columns into the plan resolving each record of the list
+        :param columns: The columns we iterate on
+        :return: a tuple of (group_by_key, [(column_name, resolver(obj, group_by_val, data)), ...])
         """
-
-        data = {}
-        group_by_val = None
-        if self.group_by:
-            if self.group_by_field.related_model and "__" not in self.group_by:
-                primary_key_name = self.get_primary_key_name(self.group_by_field.related_model)
-            else:
-                primary_key_name = self.group_by_field_attname
-
-            column_data = obj.get(primary_key_name, obj.get("id"))
-            group_by_val = str(column_data)
-
+        resolvers = []
         for window, window_cols in columns:
             for col_data in window_cols:
                 name = col_data["name"]
+                source = col_data.get("source", "")
+
+                if source == "attribute_field":
+                    resolver = self._get_list_attribute_resolver(col_data["ref"])
+                elif source == "container_class_attribute_field":
+                    resolver = self._get_container_attribute_resolver(col_data["ref"])
+                elif (source == "magic_field" and self.group_by) or (self.time_series_pattern and not self.group_by):
+                    resolver = self._get_computation_resolver(window, col_data)
+                    if resolver is None:
+                        continue
+                else:
+                    resolver = self._get_item_resolver(name)
+                resolvers.append((name, resolver))
+        return self._get_group_by_key(), resolvers
 
-                if col_data.get("source", "") == "attribute_field":
-                    data[name] = col_data["ref"](self, obj, data)
-                    # changed line
-                elif col_data.get("source", "") == "container_class_attribute_field":
-                    data[name] = col_data["ref"](obj)
-
-                elif (col_data.get("source", "") == "magic_field" and self.group_by) or (
-                    self.time_series_pattern and not self.group_by
-                ):
-                    source = self._report_fields_dependencies[window].get(name, False)
-                    if source:
-                        computation_class = self.report_fields_classes[source]
-                        value = computation_class.get_dependency_value(group_by_val, col_data["ref"].name)
-                    else:
-                        try:
-                            computation_class = self.report_fields_classes[name]
-                        except KeyError:
-                            continue
-                        value = computation_class.do_resolve(group_by_val, data)
-                    if self.swap_sign:
-                        value = -value
-                    data[name] = value
+    def _get_list_attribute_resolver(self, ref):
+        def resolver(obj, group_by_val, data):
+            return ref(self, obj, data)
 
-                else:
-                    data[name] = obj[name]
-        return data
+        return resolver
+
+    @staticmethod
+    def _get_container_attribute_resolver(ref):
+        def resolver(obj, group_by_val, data):
+            return ref(obj)
+
+        return resolver
+
+    @staticmethod
+    def _get_item_resolver(name):
+        def resolver(obj, group_by_val, data):
+            return obj[name]
+
+        return resolver
 
     def _remove_order(self, main_queryset):
         return main_queryset
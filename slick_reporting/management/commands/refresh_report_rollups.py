@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from slick_reporting.models import ReportRollup, get_rollup_models
+
+
+class Command(BaseCommand):
+    help = "Refresh the report rollup tables, incrementally unless --full is given"
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help="app_label.ModelName of the rollups to refresh, default to all")
+        parser.add_argument("--full", action="store_true", help="Rebuild the whole rollups")
+        parser.add_argument("--batch-size", type=int, default=1000, help="The number of rows inserted at once")
+
+    def handle(self, *args, **options):
+        rollups = get_rollup_models()
+        if options["models"]:
+            try:
+                rollups = [apps.get_model(label) for label in options["models"]]
+            except (LookupError, ValueError) as e:
+                raise CommandError(e)
+            for rollup in rollups:
+                if not issubclass(rollup, ReportRollup):
+                    raise CommandError(f"{rollup._meta.label} is not a ReportRollup")
+
+        for rollup in rollups:
+            written = rollup.refresh(full=options["full"], batch_size=options["batch_size"])
+            self.stdout.write(f"{rollup._meta.label}: {written} rows refreshed")
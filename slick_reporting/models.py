@@ -0,0 +1,293 @@
+"""
+Rollup tables: the aggregates of a report computation fields, summarized per time bucket and per dimension (the
+group by, the crosstab field, ...), refreshed incrementally and read by the `ReportGenerator` instead of the report
+model whenever they can answer a computation field query.
+"""
+
+from functools import cache, reduce
+from inspect import isclass
+from operator import or_
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models, transaction
+from django.db.models import Max, Q
+from django.db.models.functions import Trunc
+from django.utils.module_loading import import_string
+
+from .execution import ADDITIVE_AGGREGATES, TRUNC_KINDS, get_next_bucket, is_truncated, queryset_signature
+from .fields import ComputationField
+from .registry import field_registry
+
+
+class ReportRollup(models.Model):
+    """
+    Abstract model of a rollup table derived from a report view.
+
+    The concrete model declares, with the same names as on the report model:
+    the view `date_field` (holding the start of each bucket), the `group_by` and `crosstab_field` and any other
+    dimension the report is filtered on, and one column per aggregate of the view computation fields,
+    named by `get_column_name` (ie: `value_sum` for `Sum("value")`, `id_count` for `Count("id")`).
+    Only the `Sum` and `Count` computation fields can be rolled up.
+    """
+
+    report_view = None
+    """The report view (or report generator) class, or its dotted path, the rollup is derived from"""
+
+    rollup_period = "daily"
+    """The time bucket of the rollup rows: daily, weekly, monthly, quarterly or annually.
+    A report is read from the rollup only when its dates fall on the bucket boundaries."""
+
+    watermark_field = None
+    """A change timestamp on the report model (ie: `updated_at`). If set, a refresh recomputes the buckets holding
+    rows changed since the last refresh, otherwise the buckets from the last one refreshed on."""
+
+    source_changed_at = models.DateTimeField(null=True, editable=False)
+    """The latest `watermark_field` value of the report model rows summarized in this rollup row"""
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_report_view(cls):
+        if isinstance(cls.report_view, str):
+            return import_string(cls.report_view)
+        if cls.report_view is None:
+            raise ImproperlyConfigured(f"{cls.__name__}.report_view is not set")
+        return cls.report_view
+
+    @classmethod
+    def get_source_queryset(cls):
+        """
+        :return: the report model queryset the rollup summarizes
+        """
+        view = cls.get_report_view()
+        if view.queryset is not None:
+            return view.queryset.order_by()
+        return view.report_model._default_manager.order_by()
+
+    @classmethod
+    def get_date_field(cls):
+        return cls.get_report_view().date_field
+
+    @classmethod
+    def get_bucket_kind(cls):
+        """
+        :return: the database `Trunc` kind of the `rollup_period`
+        """
+        try:
+            return TRUNC_KINDS[cls.rollup_period]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"{cls.__name__}.rollup_period should be one of {', '.join(TRUNC_KINDS)}, not '{cls.rollup_period}'"
+            )
+
+    @staticmethod
+    def get_column_name(calculation_method, calculation_field):
+        """
+        The rollup column holding an aggregate, ie: `value_sum` for `Sum("value")`
+        """
+        return f"{calculation_field.replace('__', '_')}_{calculation_method.name.lower()}"
+
+    @classmethod
+    def get_aggregates(cls):
+        """
+        The aggregates of the report view computation fields, and their requirements
+        :return: a dict of {column name: (calculation method, calculation field)}
+        """
+        if "_aggregates" not in cls.__dict__:
+            view = cls.get_report_view()
+            aggregates = {}
+            for field in _get_computation_fields(
+                [*(view.columns or []), *(view.time_series_columns or []), *(view.crosstab_columns or [])]
+            ):
+                if (
+                    field.uses_default_prepare()
+                    and field.get_queryset is ComputationField.get_queryset
+                    and not (field.base_q_filters or field.base_kwargs_filters)
+                    and isclass(field.calculation_method)
+                    and issubclass(field.calculation_method, ADDITIVE_AGGREGATES)
+                ):
+                    name = cls.get_column_name(field.calculation_method, field.calculation_field)
+                    aggregates[name] = field.calculation_method, field.calculation_field
+            cls._aggregates = aggregates
+        return cls._aggregates
+
+    @classmethod
+    def get_dimensions(cls):
+        """
+        :return: the rollup fields the summarized rows are grouped by, apart from the date field
+        """
+        excluded = {cls.get_date_field(), "source_changed_at", *cls.get_aggregates()}
+        return [f for f in cls._meta.concrete_fields if not f.primary_key and f.name not in excluded]
+
+    @classmethod
+    def check_rollup(cls):
+        """
+        Check the rollup declares the date field, the dimensions and the aggregate columns of its report view
+        """
+        view = cls.get_report_view()
+        names = {f.name for f in cls._meta.concrete_fields}
+        missing = [
+            name
+            for name in [cls.get_date_field(), view.group_by, view.crosstab_field, *cls.get_aggregates()]
+            if name and "__" not in name and name not in names
+        ]
+        if missing:
+            raise ImproperlyConfigured(f"{cls.__name__} is missing the fields {', '.join(missing)} of its report view")
+        cls.get_bucket_kind()
+
+    @classmethod
+    def answers(cls, job):
+        """
+        Can a computation field preparation be read from this rollup
+        :param job: a `PreparationJob`
+        """
+        field = job.instance
+        if job.get_fuse_key() is None or not issubclass(field.calculation_method, ADDITIVE_AGGREGATES):
+            return False
+        if cls.get_column_name(field.calculation_method, field.calculation_field) not in cls.get_aggregates():
+            return False
+        if "_source_signature" not in cls.__dict__:
+            cls._source_signature = queryset_signature(cls.get_source_queryset())
+        if queryset_signature(field.get_queryset()) != cls._source_signature:
+            return False
+        group_by = job.get_group_by()
+        if group_by and not cls.is_dimension(group_by):
+            return False
+        q_filters, kwargs_filters = job.get_filters()
+        lookups = _get_q_lookups([*q_filters, *(field.plus_side_q or []), *(field.minus_side_q or [])])
+        if lookups is None:
+            return False
+        return all(cls.answers_lookup(key, value) for key, value in [*kwargs_filters.items(), *lookups])
+
+    @classmethod
+    def answers_lookup(cls, key, value):
+        """
+        Can a filter be applied on the rollup: a lookup on a dimension, or a date range on the bucket boundaries
+        """
+        name, _, lookup = key.partition("__")
+        if name == cls.get_date_field():
+            return lookup in ("gte", "lt") and value is not None and is_truncated(value, cls.get_bucket_kind())
+        return cls.is_dimension(name)
+
+    @classmethod
+    def is_dimension(cls, name):
+        try:
+            field = cls._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return field in cls.get_dimensions()
+
+    @classmethod
+    def refresh(cls, full=False, batch_size=1000):
+        """
+        Recompute the rollup rows of the buckets which changed since the last refresh, or all of them if `full`.
+        Rows deleted from the report model, or moved to another bucket, are only caught up by a full refresh
+        (or by another change in their bucket when using `watermark_field`).
+        :param full: rebuild the whole rollup
+        :param batch_size: the number of rollup rows inserted at once
+        :return: the number of rollup rows written
+        """
+        cls.check_rollup()
+        date_field = cls.get_date_field()
+        source = cls.get_source_queryset().annotate(slick_bucket=Trunc(date_field, cls.get_bucket_kind()))
+        stale = cls._default_manager.all()
+
+        if not full and stale.exists():
+            if cls.watermark_field:
+                watermark = stale.aggregate(watermark=Max("source_changed_at"))["watermark"]
+                changed = source
+                if watermark is not None:
+                    changed = source.filter(**{f"{cls.watermark_field}__gt": watermark})
+                buckets = set(changed.values_list("slick_bucket", flat=True).distinct())
+                if not buckets:
+                    return 0
+                kind = cls.get_bucket_kind()
+                source = source.filter(
+                    reduce(
+                        or_,
+                        [
+                            Q(**{f"{date_field}__gte": bucket, f"{date_field}__lt": get_next_bucket(bucket, kind)})
+                            for bucket in buckets
+                        ],
+                    )
+                )
+                stale = stale.filter(**{f"{date_field}__in": buckets})
+            else:
+                last_bucket = stale.aggregate(last_bucket=Max(date_field))["last_bucket"]
+                source = source.filter(**{f"{date_field}__gte": last_bucket})
+                stale = stale.filter(**{f"{date_field}__gte": last_bucket})
+
+        annotations = {name: method(field) for name, (method, field) in cls.get_aggregates().items()}
+        if cls.watermark_field:
+            annotations["source_changed_at"] = Max(cls.watermark_field)
+        dimensions = cls.get_dimensions()
+        rows = source.values("slick_bucket", *[f.name for f in dimensions]).annotate(**annotations).order_by()
+        date_attname = cls._meta.get_field(date_field).attname
+
+        written = 0
+        with transaction.atomic():
+            stale.delete()
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(
+                    cls(
+                        **{date_attname: row["slick_bucket"]},
+                        **{f.attname: row[f.name] for f in dimensions},
+                        **{name: row[name] for name in annotations},
+                    )
+                )
+                if len(batch) == batch_size:
+                    written += len(cls._default_manager.bulk_create(batch))
+                    batch = []
+            written += len(cls._default_manager.bulk_create(batch))
+        return written
+
+
+@cache
+def get_rollup_models():
+    """
+    The installed concrete `ReportRollup` models, looked up once: `apps.get_models()` raises until all the models
+    are loaded, so an incomplete list is never cached.
+    :return: a tuple of models
+    """
+    return tuple(model for model in apps.get_models() if issubclass(model, ReportRollup))
+
+
+def _get_computation_fields(columns):
+    """
+    The computation field classes among the report columns, along with their requirements
+    """
+    fields = []
+    for column in columns:
+        if isinstance(column, (tuple, list)):
+            column = column[0]
+        if isinstance(column, str):
+            try:
+                column = field_registry.get_field_by_name(column)
+            except KeyError:
+                continue
+        if isclass(column) and issubclass(column, ComputationField):
+            fields += [column, *column.get_full_dependency_list()]
+    return fields
+
+
+def _get_q_lookups(q_filters):
+    """
+    :return: the (lookup, value) pairs of a list of Q objects, recursively, or None if any filter is something else
+    (ie: an expression), which a rollup can't tell it answers
+    """
+    lookups = []
+    for q in q_filters:
+        for child in q.children if isinstance(q, Q) else [q]:
+            if isinstance(child, Q):
+                child_lookups = _get_q_lookups([child])
+                if child_lookups is None:
+                    return None
+                lookups += child_lookups
+            elif isinstance(child, tuple) and len(child) == 2 and isinstance(child[0], str):
+                lookups.append(child)
+            else:
+                return None
+    return lookups
@@ -0,0 +1,159 @@
+"""
+Instrumentation of the report generation.
+
+A `ReportProfiler` handed to the `ReportGenerator` (see `ReportView.profiling` and the `_profile` GET parameter)
+records the time of each generation phase, and for each computation fields preparation task its queries, database
+time and number of prepared rows, along with the time spent resolving each column value.
+"""
+
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from .execution import get_task_jobs
+from .signals import preparation_profiled
+
+
+class QueryRecorder:
+    """
+    A database execute wrapper (see `connection.execute_wrapper`) recording the queries run in the current thread
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({"sql": sql, "params": list(params or []), "time": time.perf_counter() - start})
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+def count_prepared_rows(field):
+    """
+    :return: the number of rows (groups) prepared by a computation field, None if it's prepared in a custom way
+    """
+    try:
+        return len(field._cache[0])
+    except (TypeError, IndexError, KeyError):
+        return None
+
+
+class ReportProfiler:
+    """
+    Records the timings of a report generation.
+    The times are kept in seconds, `to_dict` outputs them in milliseconds.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        """{phase: time}, the phases being `parse`, `prepare`, `rows` and `serialize`"""
+
+        self.preparations = []
+        """One record per preparation task: the computation `fields` it prepares, its `strategy` (PreparationJob,
+        FusedQuery, TimeBucketQuery, ...), `time`, `db_time`, the prepared `rows` per field and its `queries`"""
+
+        self.shared = {}
+        """{field: the field whose results it shares}, see `QueryPlanner`"""
+
+        self.resolve_times = {}
+        """{column name: time spent resolving its values}"""
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase, a phase entered several times (ie: the lazy rows iteration) is accumulated
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, duration):
+        self.phases[name] = self.phases.get(name, 0) + duration
+
+    def wrap_task(self, task, generator):
+        """
+        Wrap a preparation task (see `run_tasks`) to record its queries and time
+        :param task: the task callable
+        :param generator: the report generator, sent with the `preparation_profiled` signal
+        :return: the profiled task
+        """
+        jobs = get_task_jobs(task)
+        strategy = type(getattr(task, "__self__", task)).__name__
+
+        def profiled_task():
+            start = time.perf_counter()
+            with QueryRecorder().record() as recorder:
+                task()
+            record = {
+                "fields": [generator.get_job_name(job) for job in jobs],
+                "strategy": strategy,
+                "time": time.perf_counter() - start,
+                "db_time": sum(query["time"] for query in recorder.queries),
+                "rows": {generator.get_job_name(job): count_prepared_rows(job.instance) for job in jobs},
+                "queries": recorder.queries,
+            }
+            self.preparations.append(record)
+            preparation_profiled.send(sender=type(generator), generator=generator, record=record)
+
+        return profiled_task
+
+    def wrap_record_plan(self, plan):
+        """
+        Wrap the resolvers of a record plan (see `ReportGenerator._compile_record_plan`) to time each column
+        """
+        group_by_key, resolvers = plan
+        return group_by_key, [(name, self._wrap_resolver(name, resolver)) for name, resolver in resolvers]
+
+    def _wrap_resolver(self, name, resolver):
+        resolve_times = self.resolve_times
+        resolve_times.setdefault(name, 0)
+
+        def profiled_resolver(obj, group_by_val, data):
+            start = time.perf_counter()
+            try:
+                return resolver(obj, group_by_val, data)
+            finally:
+                resolve_times[name] += time.perf_counter() - start
+
+        return profiled_resolver
+
+    def to_dict(self):
+        """
+        :return: the profile, times in milliseconds
+        """
+        return {
+            "phases": {name: _ms(duration) for name, duration in self.phases.items()},
+            "preparations": [
+                {
+                    **record,
+                    "time": _ms(record["time"]),
+                    "db_time": _ms(record["db_time"]),
+                    "queries": [{**query, "time": _ms(query["time"])} for query in record["queries"]],
+                }
+                for record in self.preparations
+            ],
+            "shared": dict(self.shared),
+            "columns": {name: _ms(duration) for name, duration in self.resolve_times.items()},
+        }
+
+    def get_server_timing(self):
+        """
+        :return: the value of a `Server-Timing` header with the time of each phase
+        """
+        return ", ".join(f"{name};dur={_ms(duration)}" for name, duration in self.phases.items())
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
@@ -0,0 +1,61 @@
+import datetime
+import decimal
+
+import simplejson
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def json_default(obj):
+    """
+    Serialize the objects the json encoder doesn't handle, like dates and lazy translations
+    """
+    if type(obj) is datetime.datetime:
+        return obj.strftime("%Y-%m-%d %H:%M")
+    elif hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    elif isinstance(obj, Promise):
+        return force_str(obj)
+
+
+def simplejson_dumps(data, indent=None):
+    """
+    The default serializer, based on simplejson.
+    :param data: the object to serialize
+    :param indent: the indentation level, None for a compact output
+    :return: the JSON string
+    """
+    return simplejson.dumps(data, indent=indent, use_decimal=True, default=json_default)
+
+
+def orjson_default(obj):
+    """
+    Serialize the objects orjson doesn't handle natively: decimals, datetimes and lazy translations
+    """
+    if isinstance(obj, decimal.Decimal):
+        # embedded as is, to keep its precision
+        return orjson.Fragment(str(obj))
+    return json_default(obj)
+
+
+def orjson_dumps(data, indent=None):
+    """
+    A faster serializer based on orjson, dates, numbers and strings (including their subclasses) are encoded natively.
+    Datetimes are passed to `json_default` to keep the same format as `simplejson_dumps`.
+    orjson only supports an indentation of 2 spaces, any truthy `indent` would use it.
+    :param data: the object to serialize
+    :param indent: the indentation level, None for a compact output
+    :return: the JSON bytes
+    """
+    if not hasattr(orjson, "Fragment"):
+        raise ImproperlyConfigured("orjson_dumps requires orjson >= 3.9, install it with `pip install orjson>=3.9`")
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(data, default=orjson_default, option=option)
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+preparation_profiled = Signal()
+"""Sent after each computation fields preparation task of a profiled report, possibly from an executor thread.
+Arguments: `sender` (the report generator class), `generator`, `record` (see `ReportProfiler.preparations`)"""
+
+report_profiled = Signal()
+"""Sent once the response of a profiled report is serialized.
+Arguments: `sender` (the view class), `view`, `profile` (see `ReportProfiler.to_dict`)"""
@@ -0,0 +1,44 @@
+/*jshint esversion: 6 */
+
+/**
+ * The autocomplete filters: a select2 searching the report view `_autocomplete` endpoint,
+ * the select only holds the selected options.
+ */
+
+(function ($) {
+
+    function initialize($elements) {
+        if (typeof $.fn.select2 === 'undefined') {
+            console.error('select2 is needed by the autocomplete filters');
+            return;
+        }
+        $elements.each(function (i, elem) {
+            let $elem = $(elem);
+            let url = $elem.closest('form').attr('action') || window.location.pathname;
+            $elem.select2({
+                width: '100%',
+                ajax: {
+                    url: url,
+                    dataType: 'json',
+                    delay: 250,
+                    data: function (params) {
+                        return {
+                            _autocomplete: $elem.attr('data-autocomplete-field'),
+                            term: params.term || '',
+                            page: params.page || 1
+                        };
+                    }
+                }
+            });
+        });
+    }
+
+    $.slick_reporting.autocomplete = {
+        initialize: initialize,
+    };
+
+    $(document).ready(function () {
+        initialize($('select[data-autocomplete-field]'));
+    });
+
+}(jQuery));
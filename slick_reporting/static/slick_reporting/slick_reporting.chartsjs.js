@@ -21,6 +21,13 @@
         return response['metadata']['time_series_column_names'];
     }
 
+    function getColumnKeys(response, names) {
+        // the keys of the columns values in the response rows
+        return names.map(function (name) {
+            return $.slick_reporting.getColumnKey(response, name);
+        });
+    }
+
     function createChartObject(response, chartOptions, extraOptions) {
         let extractedData = extractDataFromResponse(response, chartOptions);
 
@@ -83,13 +90,14 @@
 
         let legendResults = [];
         let datasetData = [];
-        let dataFieldName = chartOptions['data_source'];
+        let dataFieldName = $.slick_reporting.getColumnKey(response, chartOptions['data_source']);
         let titleFieldName = chartOptions['title_source'];
+        let titleKey = $.slick_reporting.getColumnKey(response, titleFieldName);
 
         for (let i = 0; i < response.data.length; i++) {
             let row = response.data[i];
             if (titleFieldName !== '') {
-                let txt = row[titleFieldName];
+                let txt = row[titleKey];
                 txt = $(txt).text() || txt; // the title is an <a tag , we want the text only
                 legendResults.push(txt)
             }
@@ -117,7 +125,7 @@
 
     function extractDataFromResponse(response, chartOptions) {
         let dataFieldName = chartOptions['data_source'];
-        let titleFieldName = chartOptions['title_source'];
+        let titleFieldName = $.slick_reporting.getColumnKey(response, chartOptions['title_source']);
         let isTimeSeries = is_time_series(response, chartOptions);
         let isCrosstab = is_crosstab(response, chartOptions);
         let datasets = [];
@@ -126,7 +134,7 @@
 
         if (isTimeSeries) {
             legendResults = response.metadata['time_series_column_verbose_names'];
-            let seriesColNames = getTimeSeriesColumnNames(response);
+            let seriesColNames = getColumnKeys(response, getTimeSeriesColumnNames(response));
 
             // Pie charts on time series should always show totals
             if (chartOptions.type === 'pie') {
@@ -179,7 +187,7 @@
 
         if (isCrosstab) {
             legendResults = response.metadata['crosstab_column_verbose_names'];
-            let crosstabColNames = getCrosstabColumnNames(response, chartOptions);
+            let crosstabColNames = getColumnKeys(response, getCrosstabColumnNames(response, chartOptions));
 
             if (chartOptions.plot_total) {
                 let results = $.slick_reporting.calculateTotalOnObjectArray(response.data, crosstabColNames);
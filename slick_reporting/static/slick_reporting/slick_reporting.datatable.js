@@ -20,7 +20,12 @@
         let footer_th = '';
         let footer_colspan = 0;
         let stop_colspan_detection = false;
-        let totals_container = $.slick_reporting.calculateTotalOnObjectArray(data, total_fields);
+        // the rows of a columnar response are arrays of the values, ordered as the columns
+        let columnar = {format: Array.isArray(data[0]) ? 'columnar' : '', columns: cols};
+        let total_keys = total_fields.map(function (name) {
+            return $.slick_reporting.getColumnKey(columnar, name);
+        });
+        let totals_container = $.slick_reporting.calculateTotalOnObjectArray(data, total_keys);
         if (data.length <= 1) {
             add_footer = false;
         }
@@ -34,7 +39,7 @@
             if (!stop_colspan_detection) {
                 footer_colspan += 1;
             } else {
-                let column_total = totals_container[col_name]
+                let column_total = totals_container[$.slick_reporting.getColumnKey(columnar, col_name)]
                 if (!(column_total || column_total === 0)) {
                     column_total = ''
                 }
@@ -69,7 +74,8 @@
             }
         }
 
-        if (total_fields.length === 0) provide_total = false;
+        // with the server side pagination, the data is only the current page, totals would be misleading
+        if (total_fields.length === 0 || data.server_side) provide_total = false;
 
         datatable_container.html(constructTable(
             $.slick_reporting.datatable.defaults.tableCssClass, data['columns'], column_names,
@@ -89,7 +95,7 @@
 
             let server_data = data['columns'][i];
             let col_data = {
-                "data": server_data['name'],
+                "data": $.slick_reporting.getColumnKey(data, server_data['name']),
                 'visible': server_data['visible'],
                 'title': server_data['verbose_name']
             };
@@ -100,6 +106,38 @@
     }
 
 
+    function getServerSideAjax(data, $reportWidget) {
+        // Fetch each page from the report view, sending the datatable.net draw, start, length & order parameters
+        let firstDraw = true;
+        return function (dtParams, callback) {
+            if (firstDraw) {
+                // the first page is already in the report response
+                firstDraw = false;
+                callback({
+                    draw: dtParams.draw,
+                    data: data.data,
+                    recordsTotal: data.recordsTotal,
+                    recordsFiltered: data.recordsFiltered
+                });
+                return;
+            }
+            let request = $.slick_reporting.report_loader.getReportRequest($reportWidget);
+            if (!request) return;
+            let params = {draw: dtParams.draw, start: dtParams.start, length: dtParams.length};
+            if (dtParams.order && dtParams.order.length) {
+                let order = dtParams.order[0];
+                let prefix = order.dir === 'desc' ? '-' : '';
+                params.order_by = prefix + data['columns'][order.column].name;
+            }
+            let requestData = typeof request.data === 'string' ? request.data : $.param(request.data);
+            requestData = (requestData ? requestData + '&' : '') + $.param(params);
+            $.get(request.url, requestData, function (response) {
+                callback(response);
+            });
+        };
+    }
+
+
     function initializeReportDatatable(tableSelector, data, extraOptions) {
         tableSelector = typeof tableSelector != 'undefined' ? tableSelector : '.datatable';
         extraOptions = typeof extraOptions != 'undefined' ? extraOptions : {};
@@ -126,6 +164,13 @@
         datatableOptions.processing = true;
         datatableOptions.data = data['data'];
         datatableOptions.columns = getDatatableColumns(data);
+        if (data.server_side && opts.reportWidget) {
+            delete datatableOptions.data;
+            datatableOptions.serverSide = true;
+            datatableOptions.searching = false;
+            datatableOptions.pageLength = data.page_length;
+            datatableOptions.ajax = getServerSideAjax(data, opts.reportWidget);
+        }
         datatableOptions.initComplete = function (settings, json) {
             setTimeout(function () {
                 if (opts.enableFixedHeader) {
@@ -4,23 +4,6 @@
  */
 (function ($) {
 
-        function dataArrayToObject(data, key) {
-            // Turn a data array to an object
-            // Example:
-            // in: [
-            // {'key': key , 'value': 0},
-            // {'key': key , 'value': 1},
-            // {'key': key , 'value': 2},
-            // ]
-            // out: {'key':key , 'value':[0,1,2]}
-            var output = {};
-            for (var r = 0; r < data.length; r++) {
-                output[data[r][key]] = data[r];
-            }
-            return output
-        }
-
-
         let _chart_cache = {};
 
         function normalStackedTooltipFormatter() {
@@ -257,10 +240,12 @@
                 })
             })
 
+            let title_key = $.slick_reporting.getColumnKey(response, chartOptions.title_source);
+            let data_key = $.slick_reporting.getColumnKey(response, chartOptions.data_source);
             response.data.forEach(function (elem, index) {
                 series.push({
-                    'name': elem[chartOptions.title_source],
-                    'data': [elem[chartOptions.data_source]]
+                    'name': elem[title_key],
+                    'data': [elem[data_key]]
                 })
             })
             return {
@@ -278,10 +263,11 @@
                 data_sources[elem] = [];
                 response.columns.forEach(function (col, key) {
                     if (col.computation_field === elem) {
-                        data_sources[elem].push(col.name)
+                        data_sources[elem].push($.slick_reporting.getColumnKey(response, col.name))
                     }
                 })
             })
+            let title_key = $.slick_reporting.getColumnKey(response, chartOptions.title_source);
             if (!chartOptions.plot_total) {
                 response.data.forEach(function (elem, index) {
                     Object.keys(data_sources).forEach(function (series_cols, index) {
@@ -290,7 +276,7 @@
                             data.push(elem[col])
                         })
                         series.push({
-                            'name': elem[chartOptions.title_source],
+                            'name': elem[title_key],
                             'data': data
                         })
                     })
@@ -335,15 +321,19 @@
 
             let series = []
             let data_sources = {};
-            let col_dict = dataArrayToObject(response.columns, 'name')
+            let col_dict = {};
+            response.columns.forEach(function (col) {
+                col_dict[$.slick_reporting.getColumnKey(response, col.name)] = col;
+            })
             chartOptions.data_source.forEach(function (elem, key) {
                 data_sources[elem] = [];
                 response.columns.forEach(function (col, key) {
                     if (col.computation_field === elem) {
-                        data_sources[elem].push(col.name)
+                        data_sources[elem].push($.slick_reporting.getColumnKey(response, col.name))
                     }
                 })
             })
+            let title_key = $.slick_reporting.getColumnKey(response, chartOptions.title_source);
             if (!chartOptions.plot_total) {
                 response.data.forEach(function (elem, index) {
                     Object.keys(data_sources).forEach(function (series_cols, index) {
@@ -352,7 +342,7 @@
                             data.push(elem[col])
                         })
                         series.push({
-                            'name': elem[chartOptions.title_source],
+                            'name': elem[title_key],
                             'data': data
                         })
                     })
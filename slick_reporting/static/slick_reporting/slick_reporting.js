@@ -64,6 +64,16 @@
         return total_container;
     }
 
+    function getColumnKey(response, name) {
+        // The key of a column value in the response rows: its index in the rows of a columnar response
+        // (`_format=columnar`), lists of values ordered as the response columns, its name otherwise.
+        if (response.format !== 'columnar') return name;
+        for (let i = 0; i < response.columns.length; i++) {
+            if (response.columns[i].name === String(name)) return i;
+        }
+        return -1;
+    }
+
     function get_xpath($element, forceTree) {
         if ($element.length === 0) {
             return null;
@@ -97,6 +107,7 @@
     $.slick_reporting = {
         'getObjFromArray': getObjFromArray,
         'calculateTotalOnObjectArray': calculateTotalOnObjectArray,
+        'getColumnKey': getColumnKey,
         "executeFunctionByName": executeFunctionByName,
         "get_xpath": get_xpath,
         defaults: {
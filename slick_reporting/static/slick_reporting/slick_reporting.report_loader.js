@@ -30,7 +30,7 @@
 
         let tableElem = $elem.find('[data-report-table]');
         if (tableElem.length !== 0) {
-            $.slick_reporting.datatable.buildAdnInitializeDatatable(data, tableElem);
+            $.slick_reporting.datatable.buildAdnInitializeDatatable(data, tableElem, {reportWidget: $elem});
         }
 
     }
@@ -51,12 +51,10 @@
     }
 
 
-    function refreshReportWidget($elem, extra_params) {
-        let successFunctionName = $elem.attr('data-success-callback');
-        successFunctionName = successFunctionName || "$.slick_reporting.report_loader.successCallback";
-        let failFunctionName = $elem.attr('data-fail-callback');
-        failFunctionName = failFunctionName || "$.slick_reporting.report_loader.failFunction";
-
+    function getReportRequest($elem, extra_params) {
+        // Get the url and the data of the report widget request, null if there is no url to request.
+        // The rows are requested in the columnar format, lighter to transfer and parse, and read as is by the
+        // tables and charts, see `$.slick_reporting.getColumnKey`
         let data = {};
 
         let url = $elem.attr('data-report-url');
@@ -65,17 +63,43 @@
 
         let formSelector = $elem.attr('data-form-selector');
         if (formSelector) {
-            data = $(formSelector).serialize();
+            data = $(formSelector).serialize() + '&_format=columnar';
         } else {
-            if (url === '#') return; // there is no actual url, probably not enough permissions
+            data._format = 'columnar';
+            if (url === '#') return null; // there is no actual url, probably not enough permissions
 
             if (extraParams !== '') {
                 url = url + "?" + extraParams;
             }
 
         }
+        return {url: url, data: data};
+    }
+
+
+    function refreshReportWidget($elem, extra_params) {
+        let successFunctionName = $elem.attr('data-success-callback');
+        successFunctionName = successFunctionName || "$.slick_reporting.report_loader.successCallback";
+        let failFunctionName = $elem.attr('data-fail-callback');
+        failFunctionName = failFunctionName || "$.slick_reporting.report_loader.failFunction";
 
-        $.get(url, data, function (data) {
+        let request = getReportRequest($elem, extra_params);
+        if (!request) return;
+
+        // the validator and body of the last response to the same request, the body is reused on a 304
+        let requestKey = request.url + '?' + (typeof request.data === 'string' ? request.data : $.param(request.data));
+        let validator = $.slick_reporting.cache[requestKey];
+        let headers = validator ? {'If-None-Match': validator.etag} : {};
+
+        $.ajax({url: request.url, data: request.data, headers: headers}).done(function (data, textStatus, jqXHR) {
+            if (jqXHR.status === 304 && validator) {
+                data = jQuery.extend(true, {}, validator.data);
+            } else {
+                let etag = jqXHR.getResponseHeader('ETag');
+                if (etag) {
+                    $.slick_reporting.cache[requestKey] = {etag: etag, data: jQuery.extend(true, {}, data)};
+                }
+            }
             $.slick_reporting.cache[data['report_slug']] = jQuery.extend(true, {}, data);
             $.slick_reporting.executeFunctionByName(successFunctionName, window, data, $elem);
         }).fail(function (data) {
@@ -172,6 +196,7 @@
         // "extractDataFromResponse": extractDataFromResponse,
         initialize: initialize,
         refreshReportWidget: refreshReportWidget,
+        getReportRequest: getReportRequest,
         failFunction: failFunction,
         displayChart: displayChart,
         createChartsUIfromResponse: createChartsUIfromResponse,
@@ -1,21 +1,33 @@
 import csv
 import datetime
+import decimal
+import re
+import tempfile
+import time
 import warnings
+from functools import reduce
+from itertools import chain, islice
+from operator import or_
 
 import simplejson as json
+from asgiref.sync import sync_to_async
 from django import forms
 from django.conf import settings
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.db.models import Q
+from django.db import models
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Max, Q
 from django.forms import modelform_factory
-from django.http import HttpResponse, StreamingHttpResponse, JsonResponse
-from django.utils.encoding import force_str
-from django.utils.functional import Promise
-from django.views.generic import FormView
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.generic import FormView, View
 
-from .app_settings import SLICK_REPORTING_SETTINGS, get_access_function
+from .app_settings import SLICK_REPORTING_SETTINGS, get_access_function, get_json_serializer
 from .forms import (
-    report_form_factory,
+    report_form_factory,  # noqa # kept for the backward compatible imports
+    get_report_form_class,
     get_crispy_helper,
     default_formfield_callback,
     OrderByForm,
@@ -26,6 +38,21 @@ from .generator import (
     ReportGeneratorAPI,
     Chart,  # noqa # needed for easier importing in other apps
 )
+from .profiling import ReportProfiler
+from .serializers import json_default
+from .signals import report_profiled
+
+try:
+    import openpyxl
+except ImportError:  # optional dependency
+    openpyxl = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None
 
 
 def dictsort(value, arg, desc=False):
@@ -84,6 +111,242 @@ class ExportToStreamingCSV(ExportToCSV):
         )
 
 
+class ExportToStreamingJSON(ExportToCSV):
+    def get_response(self):
+        encoder = json.JSONEncoder(use_decimal=True, default=json_default, iterable_as_array=True)
+        return StreamingHttpResponse(
+            encoder.iterencode(self.report_data),
+            content_type="application/json",
+            headers={
+                "Content-Disposition": f'attachment; filename="{self.get_filename()}.json"'
+            },
+        )
+
+
+class ExportToXLSX(ExportToCSV):
+    """
+    Export to an Excel workbook written in openpyxl write-only mode: the rows are consumed from the report data
+    iterator and flushed to a temporary file one at a time, so the memory stays flat whatever the number of rows.
+    Numbers and dates are kept typed, and a totals row sums the `is_summable` columns.
+    """
+
+    content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    def get_sheet_title(self):
+        # Excel sheet titles are limited to 31 characters, and some characters are not allowed
+        return re.sub(r"[\\/*?:\[\]]", " ", str(self.report_title or "Report"))[:31]
+
+    def get_cell_value(self, value):
+        if value is None or isinstance(value, (int, float, decimal.Decimal, str, datetime.date, datetime.time)):
+            if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+                # Excel does not support time zones
+                return timezone.make_naive(value)
+            return value
+        return str(value)
+
+    def get_totals_row(self, columns, totals):
+        row = [totals.get(name, "") for name in columns]
+        if columns and columns[0] not in totals:
+            row[0] = str(SLICK_REPORTING_SETTINGS["MESSAGES"]["total"])
+        return row
+
+    def get_response(self):
+        if openpyxl is None:
+            raise ImproperlyConfigured("ExportToXLSX requires openpyxl, `pip install django-slick-reporting[xlsx]`")
+
+        columns, verbose_names = self.get_columns()
+        summable = {
+            col["name"] for col in self.report_data["columns"] if col.get("is_summable") and col["name"] in columns
+        }
+        totals = dict.fromkeys(summable, 0)
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet(self.get_sheet_title())
+        header = []
+        for verbose_name in verbose_names:
+            cell = openpyxl.cell.WriteOnlyCell(sheet, value=str(verbose_name))
+            cell.font = openpyxl.styles.Font(bold=True)
+            header.append(cell)
+        sheet.append(header)
+
+        for line in self.report_data["data"]:
+            row = []
+            for name in columns:
+                value = self.get_cell_value(line[name])
+                if name in summable and isinstance(value, (int, float, decimal.Decimal)):
+                    totals[name] += value
+                row.append(value)
+            sheet.append(row)
+
+        if summable:
+            sheet.append(self.get_totals_row(columns, totals))
+
+        output = tempfile.TemporaryFile()  # noqa: SIM115 # closed by the FileResponse
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(
+            output, as_attachment=True, filename=f"{self.get_filename()}.xlsx", content_type=self.content_type
+        )
+
+
+class _ChunkSink:
+    """
+    A write only file collecting the bytes written by pyarrow, handed over to the response as they come
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def pop(self):
+        content = b"".join(self.chunks)
+        self.chunks = []
+        return content
+
+
+class ExportToArrow(ExportToCSV):
+    """
+    Export to the Apache Arrow IPC streaming format, a record batch of `batch_size` rows at a time, so large reports
+    never sit in memory. The columns are named after the report columns `name`, and typed from their `type`:
+    dates, datetimes, booleans, integers, choices (dictionary encoded) and texts. The `number` and decimal columns are
+    all `decimal128(38, decimal_places)`, whatever the values of a batch, so that the schema written with the first
+    batch holds for the following ones.
+    """
+
+    content_type = "application/vnd.apache.arrow.stream"
+    extension = "arrows"
+    batch_size = 10000
+    decimal_places = 10
+    """The scale of the decimal columns, the values with more decimal places are rounded"""
+
+    def get_writer(self, sink, schema):
+        return pyarrow.ipc.new_stream(sink, schema)
+
+    def get_arrow_type(self, column, values):
+        """
+        :param column: a column of `get_columns_data()`
+        :param values: the column values in the first batch
+        :return: the arrow type of the column
+        """
+        column_type = column.get("type", "text")
+        if column_type == "DateField":
+            return pyarrow.date32()
+        if column_type == "DateTimeField":
+            return pyarrow.timestamp("us", tz=timezone.get_current_timezone_name() if settings.USE_TZ else None)
+        if column_type == "TimeField":
+            return pyarrow.time64("us")
+        if column_type == "BooleanField":
+            return pyarrow.bool_()
+        if column_type == "FloatField":
+            return pyarrow.float64()
+        if column_type.endswith(("IntegerField", "AutoField")):
+            return pyarrow.int64()
+        if column_type in ("text", "CharField", "TextField", "SlugField", "EmailField", "URLField", "UUIDField"):
+            return pyarrow.string()
+        if column_type in ("number", "DecimalField"):
+            return pyarrow.decimal128(38, self.decimal_places)
+        if column_type == "choice":
+            return pyarrow.dictionary(pyarrow.int32(), self.infer_arrow_type(values))
+        return self.infer_arrow_type(values)
+
+    def infer_arrow_type(self, values):
+        if any(isinstance(value, decimal.Decimal) for value in values):
+            return pyarrow.decimal128(38, self.decimal_places)
+        arrow_type = pyarrow.array(values).type
+        if pyarrow.types.is_null(arrow_type):
+            return pyarrow.string()
+        return arrow_type
+
+    def get_decimal_value(self, value, exponent, context):
+        """
+        Bring a number to the decimal columns scale, the non finite numbers (NaN, infinity) are written as nulls
+        """
+        if value is None:
+            return None
+        value = value if isinstance(value, decimal.Decimal) else decimal.Decimal(str(value))
+        return value.quantize(exponent, context=context) if value.is_finite() else None
+
+    def get_schema(self, rows):
+        fields = []
+        for column in self.report_data["columns"]:
+            name = column["name"]
+            arrow_type = self.get_arrow_type(column, [row[name] for row in rows])
+            fields.append(pyarrow.field(name, arrow_type, metadata={"verbose_name": str(column["verbose_name"])}))
+        return pyarrow.schema(fields)
+
+    def get_record_batch(self, rows, schema):
+        arrays = []
+        for field in schema:
+            values = [row[field.name] for row in rows]
+            value_type = field.type.value_type if pyarrow.types.is_dictionary(field.type) else field.type
+            if pyarrow.types.is_string(value_type):
+                values = [value if value is None else str(value) for value in values]
+            elif pyarrow.types.is_decimal(value_type):
+                exponent = decimal.Decimal(1).scaleb(-value_type.scale)
+                context = decimal.Context(prec=value_type.precision, rounding=decimal.ROUND_HALF_EVEN)
+                values = [self.get_decimal_value(value, exponent, context) for value in values]
+            arrays.append(pyarrow.array(values, type=field.type))
+        return pyarrow.record_batch(arrays, schema=schema)
+
+    def get_batches(self):
+        rows = iter(self.report_data["data"])
+        batch = list(islice(rows, self.batch_size))
+        while batch:
+            yield batch
+            batch = list(islice(rows, self.batch_size))
+
+    def get_content(self):
+        batches = self.get_batches()
+        first_batch = next(batches, [])
+        schema = self.get_schema(first_batch)
+        sink = _ChunkSink()
+        writer = self.get_writer(pyarrow.PythonFile(sink, mode="w"), schema)
+        for batch in chain([first_batch], batches):
+            writer.write_batch(self.get_record_batch(batch, schema))
+            yield sink.pop()
+        writer.close()
+        yield sink.pop()
+
+    def get_response(self):
+        if pyarrow is None:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} requires pyarrow, `pip install django-slick-reporting[arrow]`"
+            )
+        return StreamingHttpResponse(
+            self.get_content(),
+            content_type=self.content_type,
+            headers={"Content-Disposition": f'attachment; filename="{self.get_filename()}.{self.extension}"'},
+        )
+
+
+class ExportToParquet(ExportToArrow):
+    """
+    Export to Parquet, each record batch being written as a row group
+    """
+
+    content_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def get_writer(self, sink, schema):
+        return pyarrow.parquet.ParquetWriter(sink, schema)
+
+
 class PrintHTMLExport:
     template_name = "slick_reporting/print_report.html"
 
@@ -97,8 +360,10 @@ class PrintHTMLExport:
 
         columns = self.report_data.get("columns", [])
         headers = [col["verbose_name"] for col in columns]
-        rows = [[row.get(col["name"], "") for col in columns] for row in self.report_data.get("data", [])]
-        return render(self.request, self.template_name, {"report_title": self.report_title, "headers": headers, "rows": rows})
+        rows = ([row.get(col["name"], "") for col in columns] for row in self.report_data.get("data", []))
+        return render(
+            self.request, self.template_name, {"report_title": self.report_title, "headers": headers, "rows": rows}
+        )
 
 
 class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
@@ -117,6 +382,9 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
     chart_settings = None
 
     excluded_fields = None
+    autocomplete_fields = None
+    autocomplete_search_fields = None
+    autocomplete_page_size = 20
 
     time_series_selector = False
     time_series_selector_choices = None
@@ -125,6 +393,10 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
 
     csv_export_class = ExportToStreamingCSV
     print_export_class = PrintHTMLExport
+    json_export_class = None
+    xlsx_export_class = ExportToXLSX
+    arrow_export_class = ExportToArrow
+    parquet_export_class = ExportToParquet
 
     with_type = False
     doc_type_field_name = "doc_type"
@@ -139,6 +411,31 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
 
     export_actions = None
 
+    cache_results = False
+    cache_alias = "default"
+    cache_timeout = 300
+
+    conditional_response = False
+    last_modified_field = None
+
+    profiling = False
+    profiler = None
+
+    server_side_pagination = False
+    server_side_page_length = 10
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Connect the cache invalidation when the view is defined, so that every process saving the report model
+        # invalidates its cached results, not only the processes which served the report.
+        # The table_name (dynamic) views are connected on their first request, their model requiring the database.
+        if (cls.cache_results or cls.conditional_response) and not cls.table_name:
+            from .cache import connect_model
+
+            model = cls.get_report_model()
+            if model is not None:
+                connect_model(model, cls.cache_alias)
+
     def test_func(self):
         access_function = get_access_function()
         return access_function(self)
@@ -184,6 +481,8 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
             actions.append("export_csv")
         if self.print_export_class:
             actions.append("export_print")
+        if self.json_export_class:
+            actions.append("export_json")
 
         if self.export_actions:
             actions = actions + self.export_actions
@@ -206,7 +505,24 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
             )
         return export_actions
 
+    def get_export_function(self, export_option):
+        """
+        The export method of an `_export` parameter, only one of the `get_export_actions()`: the optional exports
+        (ie: `export_xlsx`) are only served once listed in `export_actions`
+        :param export_option: the `_export` parameter, ie: `csv`
+        :return: the bound export method, or None
+        """
+        if not export_option:
+            return None
+        name = f"export_{export_option}"
+        if name not in {action["name"] for action in self.get_export_actions()}:
+            return None
+        return getattr(self, name, None)
+
     def get(self, request, *args, **kwargs):
+        autocomplete_field = request.GET.get("_autocomplete")
+        if autocomplete_field:
+            return self.get_autocomplete_response(autocomplete_field)
         form_class = self.get_form_class()
         self.form = self.get_form(form_class)
         report_data = {}
@@ -214,17 +530,25 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
             if self.request.GET or self.request.POST or request.headers.get("x-requested-with") == "XMLHttpRequest":
                 # only display results if it's requested,
                 # considered requested if it's ajax request, or a populated GET or POST.
-                report_data = self.get_report_results()
-
-                export_option = request.GET.get("_export", "")
-                if export_option:
-                    try:
-                        return getattr(self, f"export_{export_option}")(report_data)
-                    except AttributeError:
-                        pass
-
-                if request.headers.get("x-requested-with") == "XMLHttpRequest":
-                    return self.ajax_render_to_response(report_data)
+                export_function = self.get_export_function(request.GET.get("_export", ""))
+                is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+                validators = self.get_response_validators() if is_ajax and not export_function else None
+                if validators:
+                    not_modified = get_conditional_response(request, *validators)
+                    if not_modified is not None:
+                        return self.set_response_validators(not_modified, *validators)
+
+                self.profiler = self.get_profiler() if is_ajax and not export_function else None
+                report_data = self.get_report_results(streaming=getattr(export_function, "streaming", False))
+
+                if export_function:
+                    return export_function(report_data)
+
+                if is_ajax:
+                    response = self.ajax_render_to_response(report_data)
+                    if validators:
+                        self.set_response_validators(response, *validators)
+                    return response
 
             return self.render_to_response(self.get_context_data(report_data=report_data))
         else:
@@ -238,6 +562,7 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
     export_csv.title = SLICK_REPORTING_SETTINGS["MESSAGES"]["export_to_csv"]
     export_csv.css_class = "btn btn-primary"
     export_csv.icon = ""
+    export_csv.streaming = True
 
     def export_print(self, report_data):
         return self.print_export_class(self.request, report_data, self.get_report_title()).get_response()
@@ -246,6 +571,39 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
     export_print.css_class = "btn btn-secondary"
     export_print.icon = ""
     export_print.new_window = True
+    export_print.streaming = True
+
+    def export_json(self, report_data):
+        return self.json_export_class(self.request, report_data, self.report_title).get_response()
+
+    export_json.title = SLICK_REPORTING_SETTINGS["MESSAGES"].get("export_to_json", "Export to JSON")
+    export_json.css_class = "btn btn-primary"
+    export_json.icon = ""
+    export_json.streaming = True
+
+    def export_xlsx(self, report_data):
+        return self.xlsx_export_class(self.request, report_data, self.report_title).get_response()
+
+    export_xlsx.title = SLICK_REPORTING_SETTINGS["MESSAGES"].get("export_to_xlsx", "Export to Excel")
+    export_xlsx.css_class = "btn btn-primary"
+    export_xlsx.icon = ""
+    export_xlsx.streaming = True
+
+    def export_arrow(self, report_data):
+        return self.arrow_export_class(self.request, report_data, self.report_title).get_response()
+
+    export_arrow.title = SLICK_REPORTING_SETTINGS["MESSAGES"].get("export_to_arrow", "Export to Arrow")
+    export_arrow.css_class = "btn btn-primary"
+    export_arrow.icon = ""
+    export_arrow.streaming = True
+
+    def export_parquet(self, report_data):
+        return self.parquet_export_class(self.request, report_data, self.report_title).get_response()
+
+    export_parquet.title = SLICK_REPORTING_SETTINGS["MESSAGES"].get("export_to_parquet", "Export to Parquet")
+    export_parquet.css_class = "btn btn-primary"
+    export_parquet.icon = ""
+    export_parquet.streaming = True
 
     @classmethod
     def get_report_model(cls):
@@ -258,35 +616,85 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
         return cls.report_model
 
     def ajax_render_to_response(self, report_data):
+        if self.get_response_format() == "columnar":
+            report_data = self.get_columnar_response(report_data)
+        if self.profiler:
+            return self.get_profiled_response(report_data)
         return HttpResponse(self.serialize_to_json(report_data), content_type="application/json")
 
-    def serialize_to_json(self, response_data):
-        """Returns the JSON string for the compiled data object."""
+    def is_profile_requested(self):
+        """
+        Is the profile of the report requested, via the `_profile` GET parameter, by a staff user
+        """
+        return bool(self.request.GET.get("_profile")) and self.request.user.is_staff
 
-        def date_handler(obj):
-            if type(obj) is datetime.datetime:
-                return obj.strftime("%Y-%m-%d %H:%M")
-            elif hasattr(obj, "isoformat"):
-                return obj.isoformat()
-            elif isinstance(obj, Promise):
-                return force_str(obj)
+    def get_profiler(self):
+        """
+        Hook to get the `ReportProfiler` of the report generation, if `profiling` is set or the profile is requested
+        :return: a ReportProfiler or None
+        """
+        if self.profiling or self.is_profile_requested():
+            return ReportProfiler()
+        return None
+
+    def get_profiled_response(self, report_data):
+        """
+        Serialize the response of a profiled report, and send the `report_profiled` signal.
+        If the profile is requested, it's added to the response as `profile` (without the serialization time), and
+        the time of each phase is sent in the `Server-Timing` header.
+        :param report_data: the report response
+        :return: HttpResponse
+        """
+        profile_requested = self.is_profile_requested()
+        if profile_requested:
+            report_data = {**report_data, "profile": self.profiler.to_dict()}
+        with self.profiler.phase("serialize"):
+            content = self.serialize_to_json(report_data)
+        response = HttpResponse(content, content_type="application/json")
+        if profile_requested:
+            response["Server-Timing"] = self.profiler.get_server_timing()
+        report_profiled.send(sender=self.__class__, view=self, profile=self.profiler.to_dict())
+        return response
 
+    def get_response_format(self):
+        """
+        The format of the ajax response data requested via the `_format` GET parameter, `columnar` or the default
+        list of dicts
+        """
+        return self.request.GET.get("_format", "")
+
+    @staticmethod
+    def get_columnar_response(report_data):
+        """
+        Turn the response rows into lists of values ordered as the response `columns`, sparing the repetition of the
+        column names in every row
+        :param report_data: the report response
+        :return: a copy of the response, with its `format` set to `columnar`
+        """
+        names = [column["name"] for column in report_data["columns"]]
+        data = [[row.get(name) for name in names] for row in report_data["data"]]
+        return {**report_data, "data": data, "format": "columnar"}
+
+    def serialize_to_json(self, response_data):
+        """Returns the JSON string (or bytes) for the compiled data object, using the `JSON_SERIALIZER` setting."""
         indent = None
         if settings.DEBUG:
             indent = 4
 
-        return json.dumps(response_data, indent=indent, use_decimal=True, default=date_handler)
+        return get_json_serializer()(response_data, indent=indent)
 
     def get_form_class(self):
         """
         Automatically instantiate a form based on details provided
         :return:
         """
-        return self.form_class or report_form_factory(
+        return self.form_class or get_report_form_class(
+            self.__class__,
             self.get_report_model(),
             crosstab_model=self.crosstab_field,
             display_compute_remainder=self.crosstab_compute_remainder,
             excluded_fields=self.excluded_fields,
+            autocomplete_fields=self.autocomplete_fields,
             fkeys_filter_func=self.fkeys_filter_func_hook,
             initial=self.get_initial(),
             show_time_series_selector=self.time_series_selector,
@@ -392,10 +800,19 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
             crosstab_compute_remainder=crosstab_compute_remainder,
             crosstab_ids_custom_filters=self.crosstab_ids_custom_filters,
             crosstab_precomputed=self.crosstab_precomputed,
+            fused_execution=self.fused_execution,
+            time_series_engine=self.time_series_engine,
+            crosstab_engine=self.crosstab_engine,
+            having=self.having,
+            rollups=self.rollups,
+            memoize_closed_periods=self.memoize_closed_periods,
+            cache_alias=self.cache_alias,
+            defer_preparations=self.defer_preparations,
             format_row_func=self.format_row,
             container_class=self,
             doc_type_plus_list=doc_type_plus_list,
             doc_type_minus_list=doc_type_minus_list,
+            profiler=self.profiler,
         )
 
     def format_row(self, row_obj):
@@ -415,15 +832,218 @@ class ReportViewBase(ReportGeneratorAPI, UserPassesTestMixin, FormView):
         """
         return generator.get_columns_data()
 
-    def get_report_results(self, for_print=False):
+    def get_report_results(self, for_print=False, streaming=False):
+        """
+        Gets the reports Data, and, its meta data used by datatables.net and highcharts,
+        from the cache if `cache_results` is set
+        :param for_print: is print request
+        :param streaming: if True, the data is a lazy iterator over the rows, unless an ordering is requested
+        :return: JsonResponse
+        """
+        if not self.cache_results or streaming or self.profiler:
+            return self.compute_report_results(for_print, streaming)
+
+        from .cache import get_or_compute
+
+        return get_or_compute(
+            self.get_report_model(),
+            self.get_cache_key_parts(for_print),
+            lambda: self.compute_report_results(for_print),
+            cache_alias=self.cache_alias,
+            timeout=self.cache_timeout,
+        )
+
+    def get_autocomplete_response(self, field_name):
+        """
+        The JSON results of an `autocomplete_fields` filter search, in the select2 format.
+        Expects the `term` and `page` GET parameters.
+        :param field_name: the form field name
+        :return: JsonResponse
+        """
+        form_field = self.get_form_class().base_fields.get(field_name)
+        # the field may be excluded from the form, or not be a foreign key filter
+        if field_name not in (self.autocomplete_fields or []) or not hasattr(form_field, "queryset"):
+            return JsonResponse({"error": f"{field_name} is not an autocomplete field"}, status=404)
+        try:
+            page = max(int(self.request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        queryset = self.get_autocomplete_queryset(field_name, form_field.queryset, self.request.GET.get("term", ""))
+        start = (page - 1) * self.autocomplete_page_size
+        # one extra record tells if there is a next page
+        objects = list(queryset[start : start + self.autocomplete_page_size + 1])
+        return JsonResponse(
+            {
+                "results": [
+                    {"id": form_field.prepare_value(obj), "text": form_field.label_from_instance(obj)}
+                    for obj in objects[: self.autocomplete_page_size]
+                ],
+                "pagination": {"more": len(objects) > self.autocomplete_page_size},
+            }
+        )
+
+    def get_autocomplete_queryset(self, field_name, queryset, term):
+        """
+        Hook to search the related records of an autocomplete filter, by default the records whose
+        `autocomplete_search_fields[field_name]` (or the first char field of the related model) start with the term
+        :param field_name: the form field name
+        :param queryset: the related records queryset
+        :param term: the searched text
+        :return: an ordered queryset
+        """
+        search_fields = (self.autocomplete_search_fields or {}).get(field_name)
+        if search_fields is None:
+            search_fields = [
+                field.name for field in queryset.model._meta.concrete_fields if isinstance(field, models.CharField)
+            ][:1]
+        if term and search_fields:
+            queryset = queryset.filter(
+                reduce(or_, (Q(**{f"{search_field}__istartswith": term}) for search_field in search_fields))
+            )
+        return queryset.order_by(*search_fields, "pk")
+
+    def get_response_validators(self):
+        """
+        Get the validators of the ajax response if `conditional_response` is set, computed without running the report.
+        The ETag changes with the report model data version (renewed on its `post_save` and `post_delete`), the
+        latest `last_modified_field` value, the cache key parts, the response format and every `cache_timeout`
+        seconds, so the changes the signals miss are seen at the latest after `cache_timeout`.
+        :return: a tuple of (etag, last_modified timestamp or None), or None
+        """
+        if not self.conditional_response:
+            return None
+        from .cache import get_etag
+
+        last_modified = None
+        if self.last_modified_field:
+            last_modified = self.get_queryset().aggregate(last_modified=Max(self.last_modified_field))["last_modified"]
+        key_parts = {
+            **self.get_cache_key_parts(),
+            "format": self.get_response_format(),
+            "last_modified": last_modified,
+            "period": int(time.time() // self.cache_timeout) if self.cache_timeout else None,
+        }
+        etag = get_etag(self.get_report_model(), key_parts, cache_alias=self.cache_alias)
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    @staticmethod
+    def set_response_validators(response, etag, last_modified=None):
+        """
+        Set the `ETag` and `Last-Modified` headers of the response, and make the browsers revalidate it on each use
+        :param response: the HttpResponse
+        :param etag: the ETag
+        :param last_modified: the last modified timestamp
+        :return: the response
+        """
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_cache_key_parts(self, for_print=False):
+        """
+        Hook to get everything the cached report results depend on, add here any request specific part
+        (ie: the user if the queryset depends on it)
+        :param for_print: is print request
+        :return: a dict
+        """
+        time_series_pattern = self.time_series_pattern
+        if self.time_series_selector:
+            time_series_pattern = self.form.get_time_series_pattern()
+        return {
+            "report_slug": self.get_report_slug(),
+            "filters": self.form.cleaned_data,
+            "time_series_pattern": time_series_pattern,
+            "crosstab_ids": self.crosstab_ids,
+            "order_by": self.request.GET.get("order_by", ""),
+            "for_print": for_print,
+            "page": self.get_page_params() if self.is_server_side_paginated(for_print) else None,
+        }
+
+    def is_server_side_paginated(self, for_print=False, streaming=False):
+        """
+        Should only the requested page of the results be computed
+        """
+        return (
+            self.server_side_pagination
+            and not (for_print or streaming)
+            and self.request.headers.get("x-requested-with") == "XMLHttpRequest"
+        )
+
+    def get_page_params(self):
+        """
+        Get the page requested by the datatables.net server side processing, via the `draw`, `start` and `length`
+        GET parameters
+        :return: a tuple of (draw, start, length), length is None for all the records
+        """
+
+        def get_int(name, default):
+            try:
+                return int(self.request.GET.get(name, default))
+            except (TypeError, ValueError):
+                return default
+
+        length = get_int("length", self.server_side_page_length)
+        return get_int("draw", 0), max(get_int("start", 0), 0), None if length < 0 else length
+
+    def compute_report_page(self, report_generator):
+        """
+        Computes only the requested page of the results, ordered in the database when possible
+        :param report_generator: the report generator
+        :return: JsonResponse
+        """
+        draw, start, length = self.get_page_params()
+        order_field, desc = OrderByForm(self.request.GET).get_order_by(self.default_order_by)
+        order_by = f"{'-' if desc else ''}{order_field}" if order_field else None
+        if type(self).filter_results is not ReportViewBase.filter_results:
+            # the rows filtered in python can't be counted nor paginated by the database
+            data = report_generator.order_rows(list(self.filter_results(report_generator.get_report_data())), order_by)
+            records_total = len(data)
+            data = data[start : None if length is None else start + length]
+        else:
+            data, records_total = report_generator.get_report_data_page(start, length, order_by)
+        response = report_generator.get_full_response(
+            data=data,
+            report_slug=self.get_report_slug(),
+            chart_settings=self.chart_settings,
+            default_chart_title=self.report_title,
+            default_chart_engine=self.chart_engine,
+        )
+        response.update(
+            {
+                "server_side": True,
+                "page_length": self.server_side_page_length,
+                "draw": draw,
+                "recordsTotal": records_total,
+                "recordsFiltered": records_total,
+            }
+        )
+        return response
+
+    def compute_report_results(self, for_print=False, streaming=False):
         """
-        Gets the reports Data, and, its meta data used by datatables.net and highcharts
+        Computes the reports Data, and, its meta data used by datatables.net and highcharts
+        :param for_print: is print request
+        :param streaming: if True, the data is a lazy iterator over the rows, unless an ordering is requested
         :return: JsonResponse
         """
 
         queryset = self.get_queryset()
         report_generator = self.get_report_generator(queryset, for_print)
-        data = report_generator.get_report_data()
+        return self.get_report_generator_results(report_generator, for_print, streaming)
+
+    def get_report_generator_results(self, report_generator, for_print=False, streaming=False):
+        """
+        Get the reports Data, and, its meta data, from the report generator
+        :param report_generator: the report generator
+        :param for_print: is print request
+        :param streaming: if True, the data is a lazy iterator over the rows, unless an ordering is requested
+        :return: JsonResponse
+        """
+        if self.is_server_side_paginated(for_print, streaming):
+            return self.compute_report_page(report_generator)
+        data = report_generator.get_report_data_iter() if streaming else report_generator.get_report_data()
         data = self.filter_results(data, for_print)
         data = self.order_results(data)
 
@@ -583,6 +1203,7 @@ class SlickReportingListViewMixin(ReportViewBase):
             columns=self.columns,
             format_row_func=self.format_row,
             container_class=self,
+            profiler=self.profiler,
         )
 
     def get_form_class(self):
@@ -596,11 +1217,13 @@ class SlickReportingListViewMixin(ReportViewBase):
                 formfield_callback=default_formfield_callback,
             )
 
-        return report_form_factory(
+        return get_report_form_class(
+                self.__class__,
                 self.get_report_model(),
                 crosstab_model=self.crosstab_field,
                 display_compute_remainder=self.crosstab_compute_remainder,
                 excluded_fields=self.excluded_fields,
+                autocomplete_fields=self.autocomplete_fields,
                 fkeys_filter_func=self.fkeys_filter_func_hook,
                 initial=self.get_initial(),
                 show_time_series_selector=self.time_series_selector,
@@ -611,15 +1234,22 @@ class SlickReportingListViewMixin(ReportViewBase):
                 add_end_date=self.end_date_field_name or self.date_field,
             )
 
-    def get_report_results(self, for_print=False):
+    def compute_report_results(self, for_print=False, streaming=False):
         """
-        Gets the reports Data, and, its meta data used by datatables.net and highcharts
+        Computes the reports Data, and, its meta data used by datatables.net and highcharts
+        :param for_print: is print request
+        :param streaming: if True, the data is a lazy iterator over the rows
         :return: JsonResponse
         """
 
         queryset = self.get_queryset()
         report_generator = self.get_report_generator(queryset, for_print)
-        data = report_generator.get_report_data()
+        return self.get_report_generator_results(report_generator, for_print, streaming)
+
+    def get_report_generator_results(self, report_generator, for_print=False, streaming=False):
+        if self.is_server_side_paginated(for_print, streaming):
+            return self.compute_report_page(report_generator)
+        data = report_generator.get_report_data_iter() if streaming else report_generator.get_report_data()
         data = self.filter_results(data, for_print)
 
         return report_generator.get_full_response(
@@ -645,6 +1275,103 @@ class ListReportView(SlickReportingListViewMixin):
     pass
 
 
+class AsyncReportViewMixin:
+    """
+    Serves the report from an async `get`, for ASGI deployments: the computation fields queries are awaited,
+    run concurrently off the event loop (see `SLICK_REPORTING_SETTINGS["EXECUTOR"]`), and the rest of the
+    synchronous work (form validation, generator setup, rows resolution, exports) runs in the request thread via
+    `sync_to_async`.
+    The exports receive the computed list of rows instead of a lazy iterator.
+    """
+
+    defer_preparations = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await sync_to_async(self.get_test_func())():
+            return await sync_to_async(self.handle_no_permission)()
+        return await View.dispatch(self, request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        autocomplete_field = request.GET.get("_autocomplete")
+        if autocomplete_field:
+            return await sync_to_async(self.get_autocomplete_response)(autocomplete_field)
+        self.form = await sync_to_async(lambda: self.get_form(self.get_form_class()))()
+        if not await sync_to_async(self.form.is_valid)():
+            return await sync_to_async(self.form_invalid)(self.form)
+
+        report_data = {}
+        is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+        if self.request.GET or self.request.POST or is_ajax:
+            # only display results if it's requested,
+            # considered requested if it's ajax request, or a populated GET or POST.
+            export_function = await sync_to_async(self.get_export_function)(request.GET.get("_export", ""))
+            validators = None
+            if is_ajax and not export_function:
+                validators = await sync_to_async(self.get_response_validators)()
+            if validators:
+                not_modified = get_conditional_response(request, *validators)
+                if not_modified is not None:
+                    return self.set_response_validators(not_modified, *validators)
+
+            if is_ajax and not export_function:
+                self.profiler = await sync_to_async(self.get_profiler)()
+            report_data = await self.aget_report_results()
+            if export_function:
+                return await sync_to_async(export_function)(report_data)
+
+            if is_ajax:
+                # the serialization, and the report_profiled signal receivers, are synchronous
+                response = await sync_to_async(self.ajax_render_to_response)(report_data)
+                if validators:
+                    self.set_response_validators(response, *validators)
+                return response
+
+        return await sync_to_async(lambda: self.render_to_response(self.get_context_data(report_data=report_data)))()
+
+    async def post(self, request, *args, **kwargs):
+        return await sync_to_async(super().post)(request, *args, **kwargs)
+
+    async def put(self, *args, **kwargs):
+        return await self.post(*args, **kwargs)
+
+    async def aget_report_results(self, for_print=False):
+        """
+        The async counterpart of `get_report_results`
+        :param for_print: is print request
+        :return: JsonResponse
+        """
+        if not self.cache_results or self.profiler:
+            return await self.acompute_report_results(for_print)
+
+        from .cache import aget_or_compute
+
+        # the dynamic model of table_name views is introspected from the database
+        report_model = await sync_to_async(self.get_report_model)()
+        return await aget_or_compute(
+            report_model,
+            await sync_to_async(self.get_cache_key_parts)(for_print),
+            lambda: self.acompute_report_results(for_print),
+            cache_alias=self.cache_alias,
+            timeout=self.cache_timeout,
+        )
+
+    async def acompute_report_results(self, for_print=False):
+        """
+        The async counterpart of `compute_report_results`, awaiting the computation fields queries
+        :param for_print: is print request
+        :return: JsonResponse
+        """
+        report_generator = await sync_to_async(
+            lambda: self.get_report_generator(self.get_queryset(), for_print)
+        )()
+        await report_generator.arun_preparations()
+        return await sync_to_async(self.get_report_generator_results)(report_generator, for_print)
+
+
+class AsyncReportView(AsyncReportViewMixin, ReportView):
+    pass
+
+
 class SlickReportViewBase(ReportViewBase):
     """
     Deprecated in favor of slick_reporting.view.ReportViewBase
@@ -4,6 +4,8 @@ from django.db import models
 
 from django.utils.translation import gettext_lazy as _
 
+from slick_reporting.models import ReportRollup
+
 
 class Product(models.Model):
     CATEGORY_CHOICES = (
@@ -319,3 +321,24 @@ class Initiative(models.Model):
         blank=True,
         to_field="name",
     )
+
+
+class SimpleSalesRollup(ReportRollup):
+    report_view = "tests.report_generators.ClientProductRollupReport"
+    rollup_period = "monthly"
+
+    doc_date = models.DateTimeField()
+    client = models.ForeignKey(Client, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    value_sum = models.DecimalField(max_digits=19, decimal_places=2)
+    quantity_sum = models.DecimalField(max_digits=19, decimal_places=2)
+    id_count = models.PositiveIntegerField()
+
+
+class SimpleSalesChangesRollup(ReportRollup):
+    report_view = "tests.report_generators.ClientRollupReport"
+    watermark_field = "created_at"
+
+    doc_date = models.DateTimeField()
+    client = models.ForeignKey(Client, on_delete=models.CASCADE)
+    value_sum = models.DecimalField(max_digits=19, decimal_places=2)
@@ -416,3 +416,27 @@ class ClientTotalBalancesWithShowEmptyFalse(ClientTotalBalance):
     report_slug = None
     default_order_by = "-__balance__"
     show_empty_records = False
+
+
+class ClientProductRollupReport(ReportGenerator):
+    report_model = SimpleSales
+    date_field = "doc_date"
+    group_by = "client"
+    columns = [
+        "name",
+        "__total__",
+        "__balance__",
+        "__total_quantity__",
+        ComputationField.create(Count, "id", name="rollup_sales_count", verbose_name=_("Sales count")),
+    ]
+    time_series_pattern = "monthly"
+    time_series_columns = ["__total__"]
+    crosstab_field = "product"
+    crosstab_columns = ["__total__"]
+
+
+class ClientRollupReport(ReportGenerator):
+    report_model = SimpleSales
+    date_field = "doc_date"
+    group_by = "client"
+    columns = ["name", "__total__"]
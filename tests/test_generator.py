@@ -1,14 +1,27 @@
+import threading
 from datetime import datetime
-
-from django.db.models import Sum
-from django.test import TestCase
+from io import StringIO
+from unittest.mock import patch
+
+from django.apps import apps as django_apps
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.lookups import GreaterThan
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.translation import gettext_lazy as _
 
+from slick_reporting.cache import invalidate_closed_periods
+from slick_reporting.execution import RollupQuery
 from slick_reporting.fields import ComputationField
-from slick_reporting.generator import ReportGenerator, ListViewReportGenerator
+from slick_reporting.generator import ReportGenerator, ListViewReportGenerator, report_plans
 from slick_reporting.helpers import get_foreign_keys
+from slick_reporting.profiling import ReportProfiler
 from .models import OrderLine, ComplexSales
-from .models import SimpleSales, Client
+from .models import SimpleSales, Client, SalesWithFlag, Product, SimpleSalesRollup, SimpleSalesChangesRollup
 from .report_generators import (
     GeneratorWithAttrAsColumn,
     CrosstabOnClient,
@@ -19,6 +32,12 @@ from .report_generators import (
     CrosstabOnTraversingField,
     CrosstabCustomQueryset,
     TestCountField,
+    ClientSalesMonthlySeries,
+    ProductTotalSalesWithPercentage,
+    TimeSeriesWithOutGroupBy,
+    ProductClientSalesMatrix,
+    ClientProductRollupReport,
+    ClientRollupReport,
 )
 from .tests import BaseTestData, year
 
@@ -452,3 +471,676 @@ class TestListViewGenerator(BaseTestData, TestCase):
         self.assertEqual(len(data), SimpleSales.objects.count())
         self.assertEqual(data[0]["product__name"], "Product 1")
         self.assertEqual(data[0]["client__name"], "Client 1")
+
+
+class SameAsDefaultMixin:
+    generator_options = None
+    """The generator options whose results should match the default execution"""
+
+    def assertSameAsDefault(self, generator_class, **kwargs):
+        default_data = generator_class(**kwargs).get_report_data()
+        data = generator_class(**self.generator_options, **kwargs).get_report_data()
+        self.assertTrue(default_data)
+        self.assertEqual(data, default_data)
+
+
+class FusedExecutionTests(SameAsDefaultMixin, BaseTestData, TestCase):
+    generator_options = {"fused_execution": True}
+
+    def test_fused_results_match_default(self):
+        self.assertSameAsDefault(ClientSalesMonthlySeries)
+        self.assertSameAsDefault(ProductTotalSalesWithPercentage)
+        self.assertSameAsDefault(TimeSeriesWithOutGroupBy)
+        self.assertSameAsDefault(TestCountField)
+        self.assertSameAsDefault(CrosstabOnField)
+        self.assertSameAsDefault(CrosstabOnTraversingField)
+        self.assertSameAsDefault(ProductClientSalesMatrix, crosstab_ids=[self.client1.pk, self.client2.pk])
+
+    def test_fused_crosstab_time_series(self):
+        self.assertSameAsDefault(
+            ReportGenerator,
+            report_model=ComplexSales,
+            date_field="doc_date",
+            group_by="product",
+            columns=["name", "__total_quantity__"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total_quantity__"],
+            crosstab_field="client",
+            crosstab_columns=[ComputationField.create(Sum, "quantity", name="value__sum", verbose_name=_("Sales"))],
+            crosstab_ids=[self.client2.pk, self.client3.pk],
+        )
+
+    def test_fused_time_series_single_query(self):
+        with self.assertNumQueries(1):
+            ClientSalesMonthlySeries(fused_execution=True)
+
+    def test_custom_prepare_opts_out(self):
+        class DoubleTotal(ComputationField):
+            name = "double_total"
+            calculation_field = "value"
+
+            def prepare(self, q_filters=None, kwargs_filters=None, main_queryset=None, group_by=None, *args, **kwargs):
+                debit, credit = super().prepare(q_filters, kwargs_filters, main_queryset, group_by, *args, **kwargs)
+                return {k: {"value__sum": v["value__sum"] * 2} for k, v in debit.items()}, credit
+
+        report = ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["name", "__total__", DoubleTotal],
+            fused_execution=True,
+        )
+        self.assertFalse(report.report_fields_classes["double_total"].is_fusable())
+        data = report.get_report_data()
+        self.assertEqual(data[0]["double_total"], data[0]["__total__"] * 2)
+
+
+class QueryPlannerTests(BaseTestData, TestCase):
+    def test_shared_queries_across_dependencies(self):
+        periods = len(ClientSalesMonthlySeries()._get_time_series_dates())
+        # on each period __debit__, __credit__, __total__ and __balance__ run the very same query, __fb__ its own.
+        with self.assertNumQueries(2 * periods):
+            report = ClientSalesMonthlySeries()
+        self.assertEqual(report.query_planner.saved_queries, 3 * periods)
+
+    def test_results_match_unplanned(self):
+        for generator_class in [ClientSalesMonthlySeries, ProductTotalSalesWithPercentage, ProductClientSalesMatrix]:
+            unplanned_class = type("Unplanned", (generator_class,), {"query_planner_class": None})
+            kwargs = {"crosstab_ids": [self.client1.pk, self.client2.pk]}
+            data = generator_class(**kwargs).get_report_data()
+            self.assertTrue(data)
+            self.assertEqual(data, unplanned_class(**kwargs).get_report_data())
+            self.assertIsNone(unplanned_class(**kwargs).query_planner)
+
+    def test_planner_with_fused_execution(self):
+        report = ClientSalesMonthlySeries(fused_execution=True)
+        self.assertTrue(report.query_planner.saved_queries)
+        self.assertEqual(report.get_report_data(), ClientSalesMonthlySeries().get_report_data())
+
+
+class DatabaseTimeSeriesEngineTests(SameAsDefaultMixin, BaseTestData, TestCase):
+    generator_options = {"time_series_engine": "database"}
+
+    def test_results_match_default(self):
+        self.assertSameAsDefault(ClientSalesMonthlySeries)
+        self.assertSameAsDefault(TimeSeriesWithOutGroupBy)
+        for pattern in ["daily", "weekly", "quarterly", "annually"]:
+            self.assertSameAsDefault(
+                ReportGenerator,
+                report_model=SimpleSales,
+                date_field="doc_date",
+                group_by="client",
+                columns=["name"],
+                time_series_columns=["__total__", "__balance__"],
+                time_series_pattern=pattern,
+                start_date=datetime(year, 1, 1),
+                end_date=datetime(year, 3, 1),
+            )
+
+    def test_crosstab_time_series(self):
+        self.assertSameAsDefault(
+            ReportGenerator,
+            report_model=ComplexSales,
+            date_field="doc_date",
+            group_by="product",
+            columns=["name", "__total_quantity__"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total_quantity__"],
+            crosstab_field="client",
+            crosstab_columns=[ComputationField.create(Sum, "quantity", name="value__sum", verbose_name=_("Sales"))],
+            crosstab_ids=[self.client2.pk, self.client3.pk],
+        )
+
+    def test_one_query_per_computation_field(self):
+        report_kwargs = dict(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["name"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__", "__total_quantity__"],
+        )
+        with self.assertNumQueries(2):
+            ReportGenerator(time_series_engine="database", **report_kwargs)
+
+    def test_fallback_to_periods(self):
+        report = ClientSalesMonthlySeries(
+            time_series_engine="database", start_date=datetime(year, 1, 15), end_date=datetime(year, 5, 1)
+        )
+        self.assertIsNone(report.get_time_series_bucket_kind())
+        bi_weekly_class = type("BiWeekly", (ClientSalesMonthlySeries,), {"time_series_pattern": "bi-weekly"})
+        self.assertIsNone(bi_weekly_class().get_time_series_bucket_kind())
+        self.assertEqual(ClientSalesMonthlySeries().get_time_series_bucket_kind(), "month")
+        self.assertSameAsDefault(
+            ClientSalesMonthlySeries, start_date=datetime(year, 1, 15), end_date=datetime(year, 5, 1)
+        )
+
+    def test_wrong_engine(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ClientSalesMonthlySeries(time_series_engine="bucketed")
+
+    def test_opening_balances_running_sum(self):
+        with self.assertNumQueries(3):
+            # the period movements shared by __debit__, __credit__, __total__ & __balance__, and two for __fb__
+            ClientSalesMonthlySeries(time_series_engine="database")
+        self.assertSameAsDefault(
+            ReportGenerator,
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["name"],
+            time_series_pattern="monthly",
+            time_series_columns=["__fb__", "__balance__", "__balance_quantity__"],
+            start_date=datetime(year, 3, 1),
+            end_date=datetime(year, 9, 1),
+        )
+
+
+class DatabaseCrosstabEngineTests(SameAsDefaultMixin, BaseTestData, TestCase):
+    generator_options = {"crosstab_engine": "database"}
+
+    def test_results_match_default(self):
+        self.assertSameAsDefault(CrosstabOnField)
+        self.assertSameAsDefault(CrosstabOnTraversingField)
+        self.assertSameAsDefault(CrosstabCustomQueryset)
+        self.assertSameAsDefault(ProductClientSalesMatrix, crosstab_ids=[self.client1.pk, self.client2.pk])
+        self.assertSameAsDefault(
+            ProductClientSalesMatrix, crosstab_ids=[self.client1.pk], crosstab_compute_remainder=False
+        )
+        self.assertSameAsDefault(
+            ReportGenerator,
+            report_model=SimpleSales,
+            date_field="doc_date",
+            crosstab_field="client",
+            crosstab_ids=[self.client1.pk],
+            crosstab_columns=["__total__", "__balance__"],
+        )
+
+    def test_crosstab_time_series(self):
+        self.assertSameAsDefault(
+            ReportGenerator,
+            report_model=ComplexSales,
+            date_field="doc_date",
+            group_by="product",
+            columns=["name", "__total_quantity__"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total_quantity__"],
+            crosstab_field="client",
+            crosstab_columns=[ComputationField.create(Sum, "quantity", name="value__sum", verbose_name=_("Sales"))],
+            crosstab_ids=[self.client2.pk, self.client3.pk],
+        )
+
+    def test_two_queries_per_computation_field(self):
+        with self.assertNumQueries(2):
+            ProductClientSalesMatrix(crosstab_engine="database", crosstab_ids=[self.client1.pk, self.client2.pk])
+        with self.assertNumQueries(1):
+            ProductClientSalesMatrix(
+                crosstab_engine="database", crosstab_ids=[self.client1.pk], crosstab_compute_remainder=False
+            )
+
+
+class ServerSidePaginationTests(BaseTestData, TestCase):
+    def get_report(self):
+        return ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["name", "__total__", "__total_quantity__", "__balance__"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__"],
+            start_date=datetime(year, 1, 1),
+            end_date=datetime(year, 12, 31),
+        )
+
+    def assertPageMatchesFullData(self, order_by, start=0, length=2):
+        data = self.get_report().get_report_data()
+        field = order_by.lstrip("-")
+        expected = sorted(data, key=lambda x: x[field], reverse=order_by.startswith("-"))[start : start + length]
+        page, records_total = self.get_report().get_report_data_page(start, length, order_by)
+        self.assertEqual(records_total, len(data))
+        self.assertEqual([row[field] for row in page], [row[field] for row in expected])
+
+    def test_page_matches_ordered_full_data(self):
+        for order_by in ["name", "-name", "__total__", "-__total__", "-__total_quantity__", "-__balance__"]:
+            with self.subTest(order_by=order_by):
+                self.assertPageMatchesFullData(order_by)
+                self.assertPageMatchesFullData(order_by, start=1)
+        report = self.get_report()
+        time_series_column = report.get_time_series_parsed_columns()[2]["name"]
+        self.assertPageMatchesFullData(f"-{time_series_column}")
+
+    def test_group_by_char_field(self):
+        for flag, quantity in [("sales", 5), ("return", 12), ("gift", 1)]:
+            SalesWithFlag.objects.create(
+                doc_date=datetime(year, 1, 2), client=self.client1, product=self.product1, quantity=quantity, flag=flag
+            )
+        report = GroupByCharField()
+        name = report.get_columns_data()[2]["name"]
+        ordered = report.get_ordered_queryset(report.main_queryset, f"-{name}")
+        self.assertIsNotNone(ordered)
+        page, _ = GroupByCharField().get_report_data_page(0, 2, f"-{name}")
+        self.assertTrue(page)
+        expected = sorted(report.get_report_data(), key=lambda x: x[name], reverse=True)[:2]
+        self.assertEqual(page, expected)
+
+    def test_ordered_in_database(self):
+        report = self.get_report()
+        self.assertIsNotNone(report.get_ordered_queryset(report.main_queryset, "-__total__"))
+        self.assertIsNotNone(report.get_ordered_queryset(report.main_queryset, "name"))
+        # __balance__ is computed by the subquery of the period plus the one of the opening balance
+        self.assertIsNotNone(report.get_ordered_queryset(report.main_queryset, "__balance__"))
+
+    def test_only_page_rows_resolved(self):
+        report = self.get_report()
+        resolve_patch = patch.object(report, "_resolve_record", wraps=report._resolve_record)
+        with resolve_patch as record_mock, patch.object(report, "get_report_data") as full_data_mock:
+            page, records_total = report.get_report_data_page(0, 1, "-__total__")
+        full_data_mock.assert_not_called()
+        self.assertEqual(len(page), 1)
+        self.assertGreater(records_total, 1)
+        self.assertEqual(record_mock.call_count, 1)
+
+    def test_all_rows(self):
+        report = self.get_report()
+        page, records_total = report.get_report_data_page(0, None)
+        self.assertEqual(page, report.get_report_data())
+        self.assertEqual(len(page), records_total)
+
+    def test_order_by_unknown_column_ignored(self):
+        report = self.get_report()
+        with patch.object(report, "get_report_data") as full_data_mock:
+            page, _ = report.get_report_data_page(0, 2, "-unknown")
+        full_data_mock.assert_not_called()
+        self.assertEqual(page, report.get_report_data()[:2])
+
+    def test_order_rows_without_value(self):
+        report = self.get_report()
+        rows = [{"name": None}, {"name": "b"}, {"name": "a"}]
+        self.assertEqual(report.order_rows(rows, "name"), [{"name": "a"}, {"name": "b"}, {"name": None}])
+        self.assertEqual(report.order_rows(rows, "-name"), [{"name": None}, {"name": "b"}, {"name": "a"}])
+        self.assertEqual(report.order_rows(rows, "-unknown"), rows)
+
+
+class ThreadCountingField(ComputationField):
+    name = "thread_counting_value"
+    calculation_field = "value"
+    calculation_method = Sum
+    threads = None
+
+    def prepare(self, *args, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        return super().prepare(*args, **kwargs)
+
+
+class ParallelExecutionTests(TransactionTestCase):
+    def setUp(self):
+        ThreadCountingField.threads = set()
+        product = Product.objects.create(name="Product 1")
+        for index in range(3):
+            client = Client.objects.create(name=f"Client {index}")
+            for month in range(1, 7):
+                SimpleSales.objects.create(
+                    doc_date=datetime(year, month, 2), client=client, product=product, quantity=index + month, price=10
+                )
+
+    def get_report(self, generator_class=ReportGenerator, **kwargs):
+        return generator_class(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["name", "__total__", "__balance__"],
+            time_series_pattern="monthly",
+            time_series_columns=[ThreadCountingField, "__total_quantity__"],
+            start_date=datetime(year, 1, 1),
+            end_date=datetime(year, 7, 1),
+            **kwargs,
+        )
+
+    def test_profiled_in_threads(self):
+        profiler = ReportProfiler()
+        with override_settings(SLICK_REPORTING_SETTINGS={"EXECUTOR": {"workers": 4}}):
+            self.get_report(profiler=profiler)
+        self.assertGreater(len(ThreadCountingField.threads), 1)
+        # the queries run in the worker threads are recorded within their task
+        self.assertTrue(profiler.preparations)
+        self.assertTrue(all(len(record["queries"]) == 1 for record in profiler.preparations))
+
+    def test_results_match_sequential(self):
+        sequential_data = self.get_report().get_report_data()
+        self.assertEqual(ThreadCountingField.threads, {threading.current_thread().name})
+
+        ThreadCountingField.threads = set()
+        with override_settings(SLICK_REPORTING_SETTINGS={"EXECUTOR": {"workers": 4}}):
+            parallel_data = self.get_report().get_report_data()
+        self.assertTrue(sequential_data)
+        self.assertEqual(parallel_data, sequential_data)
+        self.assertGreater(len(ThreadCountingField.threads), 1)
+        self.assertNotIn(threading.current_thread().name, ThreadCountingField.threads)
+
+    def test_sequential_in_atomic_block(self):
+        parallel_class = type("ParallelReport", (ReportGenerator,), {"executor_workers": 4})
+        with transaction.atomic():
+            data = self.get_report(parallel_class).get_report_data()
+        self.assertTrue(data)
+        self.assertEqual(ThreadCountingField.threads, {threading.current_thread().name})
+
+
+class RecordPlanTests(BaseTestData, TestCase):
+    def test_primary_key_name_resolved_once(self):
+        calls = []
+
+        class CountingGenerator(ProductTotalSalesWithPercentage):
+            def get_primary_key_name(self, model):
+                calls.append(model)
+                return super().get_primary_key_name(model)
+
+        data = CountingGenerator().get_report_data()
+        self.assertGreater(len(data), 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_record_data_matches_plan(self):
+        report = ClientSalesMonthlySeries(swap_sign=True)
+        all_columns = (
+            ("normal", report._parsed_columns),
+            ("time_series", report._time_series_parsed_columns),
+            ("crosstab", report._crosstab_parsed_columns),
+        )
+        obj = report.main_queryset[0]
+        self.assertEqual(report._get_record_data(obj, all_columns), report.get_report_data()[0])
+
+
+class ReportPlanTests(BaseTestData, TestCase):
+    def test_report_plan_reused(self):
+        report_plans.clear()
+        with patch.object(
+            ClientSalesMonthlySeries,
+            "compile_report_plan",
+            autospec=True,
+            side_effect=ReportGenerator.compile_report_plan,
+        ) as compile_mock:
+            dates = {"start_date": datetime(year, 1, 1), "end_date": datetime(year + 1, 1, 1)}
+            first = ClientSalesMonthlySeries(**dates)
+            second = ClientSalesMonthlySeries(**dates)
+            self.assertEqual(compile_mock.call_count, 1)
+            ClientSalesMonthlySeries(start_date=datetime(year, 3, 1), end_date=dates["end_date"])
+            self.assertEqual(compile_mock.call_count, 2)
+
+        self.assertEqual(second.get_columns_data(), first.get_columns_data())
+        self.assertEqual(second.get_metadata(), first.get_metadata())
+        self.assertEqual(second.get_report_data(), first.get_report_data())
+        # the generators work on their own copy of the plan
+        self.assertIsNot(second._time_series_parsed_columns[0], first._time_series_parsed_columns[0])
+
+    def test_attribute_columns_bound_to_generator(self):
+        report_plans.clear()
+        GeneratorWithAttrAsColumn()
+        report = GeneratorWithAttrAsColumn()
+        self.assertEqual(report.parsed_columns[0]["ref"].__self__, report)
+        self.assertEqual(report.get_columns_data(), report.get_columns_data())
+
+
+class ProfilerTests(BaseTestData, TestCase):
+    def test_fused_execution_profile(self):
+        profiler = ReportProfiler()
+        report = ClientSalesMonthlySeries(fused_execution=True, defer_preparations=True, profiler=profiler)
+        self.assertEqual(list(profiler.phases), ["parse"])
+        report.run_preparations()
+        data = report.get_report_data()
+        self.assertEqual(data, ClientSalesMonthlySeries().get_report_data())
+
+        profile = profiler.to_dict()
+        self.assertEqual(list(profile["phases"]), ["parse", "prepare", "rows"])
+        fused = [p for p in profile["preparations"] if p["strategy"] == "FusedQuery"]
+        self.assertEqual(len(fused), 1)
+        self.assertEqual(len(fused[0]["queries"]), 1)
+        self.assertGreater(len(fused[0]["fields"]), 1)
+        self.assertEqual(len(profile["columns"]), len(data[0]))
+        self.assertEqual(sum(len(p["queries"]) for p in profile["preparations"]), len(profile["preparations"]))
+
+    def test_not_profiled(self):
+        with patch("slick_reporting.profiling.ReportProfiler.wrap_task") as wrap_task:
+            ClientSalesMonthlySeries().get_report_data()
+        wrap_task.assert_not_called()
+
+
+class HavingTests(BaseTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.client_zero = Client.objects.create(name="Client Zero")
+        SimpleSales.objects.create(
+            doc_date=datetime(year, 2, 3), client=cls.client_zero, product=cls.product1, quantity=0, price=10
+        )
+
+    def get_report(self, **kwargs):
+        return ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["name", "__total__", "__balance__"],
+            start_date=datetime(year, 2, 1),
+            end_date=datetime(year, 12, 31),
+            **kwargs,
+        )
+
+    def test_filtered_in_database(self):
+        full_data = self.get_report().get_report_data()
+        for having, expected in [
+            (("__total__", "gt", 0), [row for row in full_data if row["__total__"] > 0]),
+            (("__balance__", "ne", 0), [row for row in full_data if row["__balance__"] != 0]),
+            # Client 1 makes it only with its opening balance
+            (("__balance__", "gte", 300), [row for row in full_data if row["__balance__"] >= 300]),
+            (("name", "in", ["Client 1", "Client 3"]), [full_data[0], full_data[2]]),
+        ]:
+            with self.subTest(having=having):
+                report = self.get_report(having=[having])
+                self.assertEqual(report._having_checks, [])
+                resolve_patch = patch.object(report, "_resolve_record", wraps=report._resolve_record)
+                with resolve_patch as record_mock:
+                    data = report.get_report_data()
+                self.assertEqual(data, expected)
+                self.assertEqual(record_mock.call_count, len(expected))
+                self.assertLess(len(expected), len(full_data))
+
+    def test_page(self):
+        report = self.get_report(having=[("__balance__", "ne", 0)])
+        expected = sorted(
+            [row for row in self.get_report().get_report_data() if row["__balance__"] != 0],
+            key=lambda x: x["__total__"],
+            reverse=True,
+        )
+        page, records_total = report.get_report_data_page(0, 2, "-__total__")
+        self.assertEqual(records_total, len(expected))
+        self.assertEqual(page, expected[:2])
+
+    def test_checked_on_rows(self):
+        # with swap_sign the values are resolved then negated, they can't be filtered by the database
+        full_data = self.get_report(swap_sign=True).get_report_data()
+        expected = [row for row in full_data if row["__balance__"] < 0]
+        self.assertTrue(0 < len(expected) < len(full_data))
+        report = self.get_report(swap_sign=True, having=[("__balance__", "lt", 0)])
+        self.assertEqual(len(report._having_checks), 1)
+        self.assertEqual(report.get_report_data(), expected)
+        page, records_total = report.get_report_data_page(0, 1, "name")
+        self.assertEqual(records_total, len(expected))
+        self.assertEqual(page, expected[:1])
+
+    def test_improperly_configured(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.get_report(having=[("__total__", "contains", 0)])
+        with self.assertRaises(ImproperlyConfigured):
+            self.get_report(having=[("__total_quantity__", "gt", 0)])
+
+
+class RollupTests(BaseTestData, TestCase):
+    def get_report(self, report_class=ClientProductRollupReport, start_date=None, **kwargs):
+        return report_class(
+            start_date=start_date or datetime(year, 1, 1),
+            end_date=datetime(year + 1, 1, 1),
+            crosstab_ids=[self.product1.pk],
+            **kwargs,
+        )
+
+    def assertReadFromRollup(self, report_class=ClientProductRollupReport, **kwargs):
+        with patch.object(RollupQuery, "execute", autospec=True, side_effect=RollupQuery.execute) as execute:
+            data = self.get_report(report_class, **kwargs).get_report_data()
+        self.assertTrue(execute.called)
+        self.assertEqual(data, self.get_report(report_class, rollups=[], **kwargs).get_report_data())
+        return data
+
+    def test_read_from_rollup(self):
+        self.assertGreater(SimpleSalesRollup.refresh(), 0)
+        data = self.assertReadFromRollup()
+        self.assertTrue(any(row["__balance__"] for row in data))
+        with CaptureQueriesContext(connection) as queries:
+            self.get_report().get_report_data()
+        # all the computation fields are read from the rollup in one query, then the clients are listed
+        self.assertEqual(len(queries), 2)
+        self.assertIn('"tests_simplesalesrollup"', queries[0]["sql"])
+
+    def test_not_aligned(self):
+        SimpleSalesRollup.refresh()
+        report = self.get_report(start_date=datetime(year, 1, 15))
+        with patch.object(RollupQuery, "execute") as execute:
+            data = report.get_report_data()
+        execute.assert_not_called()
+        self.assertEqual(data, self.get_report(start_date=datetime(year, 1, 15), rollups=[]).get_report_data())
+
+    def test_expression_filter_not_answered(self):
+        SimpleSalesRollup.refresh()
+        custom_filters = [(Q(GreaterThan(F("quantity"), 1)), {}), (Q(client=self.client1), {})]
+
+        def get_report(**kwargs):
+            return ClientProductRollupReport(
+                start_date=datetime(year, 1, 1),
+                end_date=datetime(year + 1, 1, 1),
+                crosstab_ids_custom_filters=custom_filters,
+                **kwargs,
+            )
+
+        with patch.object(RollupQuery, "execute", autospec=True, side_effect=RollupQuery.execute) as execute:
+            data = get_report().get_report_data()
+        read_from_rollup = [job.q_filters for call in execute.call_args_list for job in call.args[0].jobs]
+        self.assertIn(Q(client=self.client1), read_from_rollup)
+        self.assertNotIn(Q(GreaterThan(F("quantity"), 1)), read_from_rollup)
+        self.assertEqual(data, get_report(rollups=[]).get_report_data())
+
+    def test_rollup_models_looked_up_once(self):
+        from slick_reporting.models import get_rollup_models
+
+        self.assertEqual(set(get_rollup_models()), {SimpleSalesRollup, SimpleSalesChangesRollup})
+        with patch.object(django_apps, "get_models") as get_models:
+            self.get_report().get_report_data()
+        get_models.assert_not_called()
+
+    def test_incremental_refresh(self):
+        SimpleSalesRollup.refresh()
+        SimpleSales.objects.create(
+            doc_date=datetime(year, 3, 20), client=self.client1, product=self.product1, quantity=1, price=7
+        )
+        SimpleSales.objects.create(
+            doc_date=datetime(year, 4, 5), client=self.clientIdle, product=self.product2, quantity=2, price=3
+        )
+        # only the last bucket (March) is recomputed, along with the new ones
+        self.assertEqual(SimpleSalesRollup.refresh(), SimpleSalesRollup.objects.filter(doc_date__month__gte=3).count())
+        self.assertReadFromRollup()
+        SimpleSalesRollup.refresh(full=True)
+        self.assertReadFromRollup()
+
+    def test_watermark_refresh(self):
+        SimpleSalesChangesRollup.refresh()
+        sale = SimpleSales.objects.filter(client=self.client2).earliest("doc_date")
+        sale.quantity += 1
+        sale.created_at = datetime(year + 1, 1, 1)
+        sale.save()
+        # the day of the changed sale is recomputed, for all the clients
+        changed_clients = Client.objects.filter(simplesales__doc_date=sale.doc_date).count()
+        self.assertEqual(SimpleSalesChangesRollup.refresh(), changed_clients)
+        self.assertEqual(SimpleSalesChangesRollup.refresh(), 0)
+        self.assertReadFromRollup(ClientRollupReport)
+
+    def test_refresh_command(self):
+        out = StringIO()
+        call_command("refresh_report_rollups", "tests.SimpleSalesRollup", "--full", stdout=out)
+        self.assertIn(f"tests.SimpleSalesRollup: {SimpleSalesRollup.objects.count()} rows refreshed", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("refresh_report_rollups", "tests.SimpleSales", stdout=out)
+
+
+class ClosedPeriodsMemoTests(BaseTestData, TestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    def get_report(self, **kwargs):
+        # a two years monthly series, the last year months are always closed
+        return ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["name", "__total__"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__", "__balance__"],
+            start_date=datetime(year - 1, 1, 1),
+            end_date=datetime(year + 1, 1, 1),
+            **kwargs,
+        )
+
+    def test_closed_periods_memoized(self):
+        expected = self.get_report().get_report_data()
+        with CaptureQueriesContext(connection) as first_queries:
+            report = self.get_report(memoize_closed_periods=True)
+            self.assertEqual(report.get_report_data(), expected)
+        self.assertEqual(report.closed_periods_memo.hits, 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            report = self.get_report(memoize_closed_periods=True)
+            self.assertEqual(report.get_report_data(), expected)
+        self.assertGreater(report.closed_periods_memo.hits, 12)
+        self.assertLess(len(queries), len(first_queries) - 12)
+
+    def test_invalidation(self):
+        self.get_report(memoize_closed_periods=True).get_report_data()
+        SimpleSales.objects.create(
+            doc_date=datetime(year - 1, 6, 10), client=self.client1, product=self.product1, quantity=1, price=7
+        )
+        # the back-dated sale is not seen until the periods are invalidated
+        stale = self.get_report(memoize_closed_periods=True).get_report_data()
+        self.assertNotEqual(stale, self.get_report().get_report_data())
+
+        invalidate_closed_periods(SimpleSales, since=datetime(year - 1, 6, 10))
+        report = self.get_report(memoize_closed_periods=True)
+        self.assertEqual(report.get_report_data(), self.get_report().get_report_data())
+        # the periods ending before the sale are still memoized
+        self.assertGreaterEqual(report.closed_periods_memo.hits, 5)
+
+        invalidate_closed_periods(SimpleSales)
+        report = self.get_report(memoize_closed_periods=True)
+        report.get_report_data()
+        self.assertEqual(report.closed_periods_memo.hits, 0)
+
+
+class IndexPreparedResultsTests(TestCase):
+    def test_extract_data_indexed_once(self):
+        field_class = ComputationField.create(Sum, "value", name="value__sum")
+        field = field_class(report_model=SimpleSales, group_by="client")
+        field._cache = {str(i): {"client": i, "value__sum": i} for i in range(100)}, None
+
+        with patch.object(field, "index_prepared_results", wraps=field.index_prepared_results) as index_mock:
+            for _ in range(2):
+                for i in range(100):
+                    self.assertEqual(field.do_resolve(str(i)), i)
+
+        self.assertEqual(index_mock.call_count, 1)
+        self.assertEqual(field.do_resolve("missing"), 0)
+
+    def test_index_debit_and_credit(self):
+        field = ComputationField.create(Sum, "value", name="value__sum")(report_model=SimpleSales, group_by="client")
+        index, default = field.index_prepared_results(
+            ({"1": {"value__sum": 10}, "2": {"value__sum": 5}}, {"2": {"value__sum": 3}, "3": {"value__sum": 1}})
+        )
+        self.assertEqual(index, {"1": (10, 0), "2": (5, 3), "3": (0, 1)})
+        self.assertEqual(default, (0, 0))
+
+    def test_index_without_group_by(self):
+        field = ComputationField.create(Sum, "value", name="value__sum")(report_model=SimpleSales)
+        self.assertEqual(field.index_prepared_results(({"value__sum": 7}, {})), ({}, (7, 0)))
@@ -1,17 +1,29 @@
+import asyncio
 import datetime
-from unittest import skip
+import json
+from decimal import Decimal
+from io import BytesIO
+from unittest import skip, skipUnless
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.db.models import Count
-from django.test import TestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import Count, QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from django.utils.timezone import now
+from django.utils.http import http_date
+from django.utils.timezone import make_aware, now
+from django.utils.translation import gettext_lazy
 
 from slick_reporting.fields import ComputationField, BalanceReportField
+from slick_reporting.forms import distinct_choices, get_foreign_key_subquery, get_report_form_class
 from slick_reporting.generator import ReportGenerator
-from slick_reporting.views import ReportView
+from slick_reporting.views import ReportView, openpyxl, pyarrow
 from slick_reporting.registry import field_registry
+from slick_reporting.serializers import orjson, orjson_dumps, simplejson_dumps
+from slick_reporting.signals import preparation_profiled, report_profiled
 from tests.report_generators import (
     ClientTotalBalance,
     ProductClientSalesMatrix2,
@@ -318,6 +330,19 @@ class ReportTest(BaseTestData, TestCase):
 
         self.assertEqual(data[0].get("__balance__"), 300, data[0])
 
+    def test_form_class_memoized(self):
+        distinct_choices.clear()
+        with self.assertNumQueries(0):
+            form_class = get_report_form_class(ReportView, SimpleSales, crosstab_model="product__category")
+        self.assertIs(get_report_form_class(ReportView, SimpleSales, crosstab_model="product__category"), form_class)
+        self.assertIsNot(get_report_form_class(ReportView, SimpleSales, crosstab_model="product__sku"), form_class)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(form_class(data={"category": ["small"]}).is_valid())
+            self.assertEqual(
+                list(form_class().fields["category"].choices), list(form_class().fields["category"].choices)
+            )
+
     def test_compute_from_queryset(self):
         report = report_generators.TotalBalanceWithQueryset()
         data = report.get_report_data()
@@ -433,6 +458,70 @@ class ReportTest(BaseTestData, TestCase):
         self.assertTrue(len(data), 2)
         # self.assertEqual(view_report_data['data'], data)
 
+    @patch("slick_reporting.helpers.user_test_function", return_value=True)
+    def test_view_filter_as_subquery(self, user_test_function):
+        data = ReportGenerator(
+            report_model=SimpleSales2,
+            date_field="doc_date",
+            group_by="client",
+            columns=["slug", "name"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__", "__balance__"],
+            kwargs_filters={"client_id__in": [self.client1.name, self.client2.name]},
+        ).get_report_data()
+        self.assertEqual(len(data), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("report-to-field-set"),
+                data={"client_id": [self.client2.name, self.client1.name]},
+                HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"], data)
+        # the selected clients are filtered within the report queries, never fetched on their own
+        self.assertFalse([q for q in queries if q["sql"].startswith('SELECT "tests_client"."name" FROM')])
+
+        form = get_report_form_class(ReportView, SimpleSales2)({"client_id": [self.client1.name]})
+        kwargs_filters = form.get_filters()[1]
+        self.assertEqual(
+            set(SimpleSales2.objects.filter(**kwargs_filters).values_list("client_id", flat=True)), {self.client1.name}
+        )
+
+        # a lazy selection keeps its criteria in SQL
+        client_field = SimpleSales2._meta.get_field("client")
+        subquery = get_foreign_key_subquery(client_field, Client.objects.filter(name=self.client1.name))
+        self.assertIsInstance(subquery, QuerySet)
+        self.assertEqual(list(subquery), [{"name": self.client1.name}])
+
+    @patch("slick_reporting.helpers.user_test_function", return_value=True)
+    def test_large_selection_bound_as_one_parameter(self, user_test_function):
+        from slick_reporting.profiling import QueryRecorder
+
+        Client.objects.bulk_create([Client(name=f"Extra client {i}") for i in range(1200)])
+        selected = list(Client.objects.values_list("pk", flat=True))
+        data = ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["slug", "name"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__", "__balance__"],
+            kwargs_filters={"client_id__in": selected},
+        ).get_report_data()
+
+        with override_settings(DATA_UPLOAD_MAX_NUMBER_FIELDS=None), QueryRecorder().record() as recorder:
+            response = self.client.get(
+                reverse("report1"), data={"client_id": selected}, HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+            )
+        self.assertEqual(response.json()["data"], data)
+        # apart from the form validation of the selection, no query binds the selected ids one by one
+        report_queries = [q for q in recorder.queries if "json_each" in q["sql"]]
+        self.assertTrue(report_queries)
+        self.assertEqual(len([q for q in recorder.queries if len(q["params"]) > len(selected)]), 0)
+        self.assertEqual(len([q for q in recorder.queries if len(q["params"]) >= len(selected)]), 1)
+        self.assertTrue(all(len(q["params"]) < 20 for q in report_queries))
+
     def test_filter_as_int_n_list(self):
         report = ClientTotalBalance(kwargs_filters={"client": self.client1.pk}, show_empty_records=True)
         data = report.get_report_data()
@@ -549,6 +638,397 @@ class TestView(BaseTestData, TestCase):
 
         self.assertEqual(view_report_data["data"], data)
 
+    def test_streaming_csv_export(self):
+        data = ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["slug", "name"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__", "__balance__"],
+        ).get_report_data()
+        with patch.object(ReportGenerator, "get_report_data", side_effect=AssertionError("data was materialized")):
+            response = self.client.get(reverse("report1"), data={"_export": "csv"})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(data) + 1)
+
+    def test_streaming_json_export(self):
+        from slick_reporting.views import ExportToStreamingJSON
+        from .views import MonthlyProductSales
+
+        data = ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["slug", "name"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__", "__balance__"],
+        ).get_report_data()
+        with patch.object(MonthlyProductSales, "json_export_class", ExportToStreamingJSON):
+            response = self.client.get(reverse("report1"), data={"_export": "json"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b"".join(response.streaming_content))["data"], data)
+
+    @skipUnless(openpyxl, "openpyxl is not installed")
+    def test_streaming_xlsx_export(self):
+        report = ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["slug", "name"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__", "__balance__"],
+        )
+        data = report.get_report_data()
+        columns = report.get_columns_data()
+        from .views import MonthlyProductSales
+
+        # only served once listed in the export actions
+        response = self.client.get(reverse("report1"), data={"_export": "xlsx"})
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+
+        with patch.object(
+            ReportGenerator, "get_report_data", side_effect=AssertionError("data was materialized")
+        ), patch.object(MonthlyProductSales, "export_actions", ["export_xlsx"]):
+            response = self.client.get(reverse("report1"), data={"_export": "xlsx"})
+            self.assertEqual(response.status_code, 200)
+            content = b"".join(response.streaming_content)
+        self.assertIn(".xlsx", response["Content-Disposition"])
+        rows = list(openpyxl.load_workbook(BytesIO(content)).active.values)
+        # header, one row per client, then the totals
+        self.assertEqual(len(rows), len(data) + 2)
+        self.assertEqual(rows[-1][0], "Total")
+        for total, column in zip(rows[-1][1:], columns[1:]):
+            if column["is_summable"]:
+                self.assertEqual(total, sum(line[column["name"]] for line in data))
+            else:
+                self.assertIsNone(total)
+
+    @skipUnless(openpyxl, "openpyxl is not installed")
+    def test_xlsx_typed_cells(self):
+        from slick_reporting.views import ExportToXLSX
+
+        report_data = {
+            "columns": [
+                {"name": "doc_date", "verbose_name": "Date", "is_summable": False},
+                {"name": "client", "verbose_name": "Client", "is_summable": False},
+                {"name": "value", "verbose_name": "Value", "is_summable": True},
+            ],
+            "data": iter(
+                [
+                    {"doc_date": make_aware(datetime.datetime(2020, 1, 2, 4)), "client": 1, "value": Decimal("10.50")},
+                    {"doc_date": datetime.date(2020, 1, 3), "client": gettext_lazy("Sales"), "value": 5},
+                ]
+            ),
+        }
+        response = ExportToXLSX(None, report_data, "Sales: [2020]").get_response()
+        workbook = openpyxl.load_workbook(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(workbook.sheetnames, ["Sales   2020 "])
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[1][0], datetime.datetime(2020, 1, 2, 4))
+        self.assertEqual(rows[1][1:], (1, 10.5))
+        self.assertEqual(rows[2], (datetime.datetime(2020, 1, 3), "Sales", 5))
+        self.assertEqual(rows[3], ("Total", None, 15.5))
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_streaming_arrow_export(self):
+        report = ReportGenerator(
+            report_model=SimpleSales,
+            date_field="doc_date",
+            group_by="client",
+            columns=["slug", "name"],
+            time_series_pattern="monthly",
+            time_series_columns=["__total__", "__balance__"],
+        )
+        data = report.get_report_data()
+        from .views import MonthlyProductSales
+
+        with patch.object(
+            ReportGenerator, "get_report_data", side_effect=AssertionError("data was materialized")
+        ), patch.object(MonthlyProductSales, "export_actions", ["export_arrow", "export_parquet"]):
+            response = self.client.get(reverse("report1"), data={"_export": "arrow"})
+            self.assertTrue(response.streaming)
+            table = pyarrow.ipc.open_stream(b"".join(response.streaming_content)).read_all()
+        self.assertEqual(table.column_names, [column["name"] for column in report.get_columns_data()])
+        self.assertEqual(table.schema.field("name").type, pyarrow.string())
+        self.assertEqual(table.to_pylist(), data)
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet_export_types(self):
+        from slick_reporting.views import ExportToParquet
+
+        rows = [
+            {
+                "doc_date": make_aware(datetime.datetime(2020, 1, 2, 4)),
+                "day": datetime.date(2020, 1, 2),
+                "flag": ["sales", "purchase"][i % 2],
+                "client": gettext_lazy("Sales"),
+                "value": [0, 3, Decimal("10.25"), Decimal("0.12345678901234"), 1.5][i],
+            }
+            for i in range(5)
+        ]
+        report_data = {
+            "columns": [
+                {"name": "doc_date", "verbose_name": "Date", "type": "DateTimeField"},
+                {"name": "day", "verbose_name": "Day", "type": "DateField"},
+                {"name": "flag", "verbose_name": "Flag", "type": "choice"},
+                {"name": "client", "verbose_name": "Client", "type": "text"},
+                {"name": "value", "verbose_name": "Value", "type": "number"},
+            ],
+            "data": iter(rows),
+        }
+        export = ExportToParquet(None, report_data, "Sales")
+        export.batch_size = 2
+        parquet_file = pyarrow.parquet.ParquetFile(BytesIO(b"".join(export.get_response().streaming_content)))
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+        table = parquet_file.read()
+        self.assertEqual(str(table.schema.field("doc_date").type), "timestamp[us, tz=America/Chicago]")
+        self.assertEqual(table.schema.field("day").type, pyarrow.date32())
+        self.assertTrue(pyarrow.types.is_dictionary(table.schema.field("flag").type))
+        # typed as decimals even though the first batch only holds integers
+        self.assertEqual(table.schema.field("value").type, pyarrow.decimal128(38, 10))
+        self.assertEqual(table.schema.field("value").metadata, {b"verbose_name": b"Value"})
+        values = [Decimal(0), Decimal(3), Decimal("10.25"), Decimal("0.1234567890"), Decimal("1.5")]
+        self.assertEqual(table.to_pylist(), [{**row, "client": "Sales", "value": v} for row, v in zip(rows, values)])
+
+    def test_cached_report_results(self):
+        from slick_reporting.cache import get_report_cache_stats, report_cache_stats
+
+        report_cache_stats.reset()
+        response = self.client.get(reverse("cached-report"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        data = response.json()["data"]
+        self.assertEqual(get_report_cache_stats(), {"hits": 0, "misses": 1, "evictions": 0})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("cached-report"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.json()["data"], data)
+        self.assertEqual(get_report_cache_stats()["hits"], 1)
+
+        self.client.get(reverse("cached-report"), data={"client_id": self.client1.pk})
+        self.assertEqual(get_report_cache_stats()["misses"], 2)
+
+        SimpleSales.objects.create(
+            doc_date=datetime.datetime(year, 1, 2),
+            client=self.client1,
+            product=self.product1,
+            quantity=1,
+            price=10,
+        )
+        self.assertEqual(get_report_cache_stats()["evictions"], 1)
+        # nothing was cached since, nothing to evict
+        SimpleSales.objects.create(
+            doc_date=datetime.datetime(year, 1, 3), client=self.client1, product=self.product1, quantity=1, price=10
+        )
+        self.assertEqual(get_report_cache_stats()["evictions"], 1)
+        response = self.client.get(reverse("cached-report"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(get_report_cache_stats()["misses"], 3)
+        self.assertNotEqual(response.json()["data"], data)
+
+    def test_cache_invalidation_connected_on_definition(self):
+        from slick_reporting.cache import _connected_models
+
+        self.assertNotIn("tests.product", _connected_models)
+
+        class CachedProductReport(ReportView):
+            report_model = Product
+            group_by = "name"
+            columns = ["name"]
+            cache_results = True
+
+        self.addCleanup(_connected_models.pop, "tests.product")
+        # connected before any request was served
+        self.assertEqual(_connected_models["tests.product"], {"default"})
+
+    def test_autocomplete_filter(self):
+        url = reverse("autocomplete-report")
+        response = self.client.get(url)
+        self.assertContains(response, 'data-autocomplete-field="client_id"')
+        self.assertContains(response, "slick_reporting.autocomplete.js")
+        self.assertNotContains(response, "Client object")
+
+        # only the selected clients are rendered
+        response = self.client.get(url, data={"client_id": self.client2.pk})
+        self.assertContains(response, f'<option value="{self.client2.pk}" selected>', count=1)
+        self.assertContains(response, 'src="/static/slick_reporting/slick_reporting.autocomplete.js"', count=1)
+
+        results = self.client.get(url, data={"_autocomplete": "client_id", "term": "client"}).json()
+        self.assertEqual([r["id"] for r in results["results"]], [self.client1.pk, self.client2.pk])
+        self.assertTrue(results["pagination"]["more"])
+        results = self.client.get(url, data={"_autocomplete": "client_id", "term": "client", "page": 2}).json()
+        self.assertEqual([r["id"] for r in results["results"]], [self.client3.pk, self.clientIdle.pk])
+        self.assertFalse(results["pagination"]["more"])
+        self.assertEqual(self.client.get(url, data={"_autocomplete": "product_id"}).status_code, 404)
+        # an autocomplete field missing from the form
+        from .views import AutocompleteMonthlyProductSales
+
+        with patch.object(AutocompleteMonthlyProductSales, "autocomplete_fields", ["client_id", "slug"]):
+            self.assertEqual(self.client.get(url, data={"_autocomplete": "slug"}).status_code, 404)
+
+        # the selected ids are still validated
+        response = self.client.get(url, data={"client_id": 0}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("client_id", response.json())
+        response = self.client.get(url, data={"client_id": self.client1.pk}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual([r["name"] for r in response.json()["data"]], ["Client 1"])
+
+    def test_profile(self):
+        url = reverse("report1")
+        records, profiles = [], []
+
+        def on_preparation(sender, generator, record, **kwargs):
+            records.append(record)
+
+        def on_report(sender, view, profile, **kwargs):
+            profiles.append(profile)
+
+        preparation_profiled.connect(on_preparation)
+        report_profiled.connect(on_report)
+        self.addCleanup(preparation_profiled.disconnect, on_preparation)
+        self.addCleanup(report_profiled.disconnect, on_report)
+
+        self.client.force_login(self.user)
+        response = self.client.get(url, data={"_profile": 1}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.status_code, 200)
+        content = response.json()
+        profile = content["profile"]
+        self.assertEqual(list(profile["phases"]), ["parse", "prepare", "rows"])
+        self.assertIn("serialize;dur=", response["Server-Timing"])
+        self.assertEqual(set(profile["columns"]), {column["name"] for column in content["columns"]})
+
+        # the requirements are named after the column they're prepared for
+        name = f"__total__TS{year}0201.__debit__"
+        preparation = next(p for p in profile["preparations"] if name in p["fields"])
+        self.assertEqual(preparation["strategy"], "PreparationJob")
+        self.assertEqual(len(preparation["queries"]), 1)
+        self.assertIn("SUM", preparation["queries"][0]["sql"])
+        self.assertEqual(preparation["rows"][name], 3)
+        # the column own query is the same as its __debit__ requirement one
+        self.assertEqual(profile["shared"][f"__total__TS{year}0201"], name)
+
+        self.assertEqual(len(records), len(profile["preparations"]))
+        self.assertEqual(len(profiles), 1)
+        self.assertIn("serialize", profiles[0]["phases"])
+        self.assertEqual(content["data"], self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()["data"])
+
+        # only staff users get the profile
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        response = self.client.get(url, data={"_profile": 1}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertNotIn("profile", response.json())
+        self.assertFalse(response.has_header("Server-Timing"))
+        self.assertEqual(len(profiles), 1)
+
+    def test_conditional_response(self):
+        url = reverse("conditional-report")
+        response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        etag = response["ETag"]
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        with patch.object(ReportView, "compute_report_results") as compute_report_results:
+            response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        compute_report_results.assert_not_called()
+
+        response = self.client.get(
+            url, data={"_format": "columnar"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # the changes the model signals miss are seen after `cache_timeout`
+        SimpleSales.objects.update(quantity=2)
+        response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with patch("slick_reporting.views.time") as time:
+            time.time.return_value = now().timestamp() + ReportView.cache_timeout
+            response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        created_at = now() + datetime.timedelta(days=1)
+        SimpleSales.objects.create(
+            doc_date=datetime.datetime(datetime.date.today().year, 1, 2),
+            created_at=created_at,
+            client=self.client1,
+            product=self.product1,
+            quantity=1,
+            price=10,
+        )
+        response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response["Last-Modified"], http_date(created_at.timestamp()))
+
+    def test_server_side_pagination(self):
+        from .views import ServerSidePaginatedMonthlyProductSales
+
+        url = reverse("server-side-paginated-report")
+        full_data = self.client.get(reverse("report1"), HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()["data"]
+
+        response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+        self.assertTrue(response["server_side"])
+        self.assertEqual(response["recordsTotal"], len(full_data))
+        self.assertEqual(response["data"], full_data[:2])
+
+        response = self.client.get(
+            url, data={"draw": 3, "start": 1, "length": 1, "order_by": "-name"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+        ).json()
+        self.assertEqual(response["draw"], 3)
+        self.assertEqual(response["data"], sorted(full_data, key=lambda x: x["name"], reverse=True)[1:2])
+
+        response = self.client.get(url, data={"length": -1}, HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+        self.assertEqual(len(response["data"]), len(full_data))
+
+        # exports are not paginated
+        response = self.client.get(url, data={"_export": "csv"})
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), len(full_data) + 1)
+
+        # the rows are filtered before the page is taken, and counted once filtered
+        def filter_results(view, data, for_print=False):
+            return [row for row in data if row["name"] != full_data[0]["name"]]
+
+        with patch.object(ServerSidePaginatedMonthlyProductSales, "filter_results", filter_results):
+            response = self.client.get(url, data={"order_by": "name"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+        filtered_data = sorted(filter_results(None, full_data), key=lambda x: x["name"])
+        self.assertEqual(response["recordsTotal"], len(filtered_data))
+        self.assertEqual(response["data"], filtered_data[:2])
+
+        # an order by a column not on the report is ignored
+        response = self.client.get(url, data={"order_by": "-unknown"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.json()["data"], full_data[:2])
+
+    def test_columnar_format(self):
+        response = self.client.get(reverse("product_crosstab_client"), HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+        columnar = self.client.get(
+            reverse("product_crosstab_client"), data={"_format": "columnar"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+        ).json()
+        self.assertEqual(columnar["format"], "columnar")
+        self.assertEqual(columnar["columns"], response["columns"])
+        names = [column["name"] for column in columnar["columns"]]
+        self.assertEqual([dict(zip(names, row)) for row in columnar["data"]], response["data"])
+
+    @skipUnless(hasattr(orjson, "Fragment"), "orjson >= 3.9 is not installed")
+    def test_orjson_serializer(self):
+        response = self.client.get(reverse("report1"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        with override_settings(
+            SLICK_REPORTING_SETTINGS={"JSON_SERIALIZER": "slick_reporting.serializers.orjson_dumps"}
+        ):
+            orjson_response = self.client.get(reverse("report1"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(orjson_response.json(), response.json())
+
+        data = {
+            "value": Decimal("10.50"),
+            "date": datetime.date(2020, 1, 2),
+            "datetime": datetime.datetime(2020, 1, 2, 3, 4, 5),
+            "title": gettext_lazy("Sales"),
+            1: [None, True],
+        }
+        self.assertEqual(json.loads(orjson_dumps(data)), json.loads(simplejson_dumps(data)))
+        self.assertEqual(orjson_dumps([Decimal("12345678901234567890.12")]), b"[12345678901234567890.12]")
+
+        with patch("slick_reporting.serializers.orjson", object()), self.assertRaises(ImproperlyConfigured):
+            orjson_dumps(data)
+
     def test_ajax(self):
         report_generator = ReportGenerator(
             report_model=SimpleSales,
@@ -667,6 +1147,116 @@ class TestView(BaseTestData, TestCase):
         self.assertRaises(TypeError, test_function)
 
 
+AJAX_HEADERS = {"x-requested-with": "XMLHttpRequest"}
+
+
+class AsyncReportViewTest(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_superuser(**SUPER_LOGIN)
+        self.client.force_login(user)
+        self.async_client.force_login(user)
+        product = Product.objects.create(name="Product 1")
+        for index in range(3):
+            client = Client.objects.create(name=f"Client {index}")
+            for month in range(1, 4):
+                SimpleSales.objects.create(
+                    doc_date=datetime.datetime(year, month, 2),
+                    client=client,
+                    product=product,
+                    quantity=index + month,
+                    price=10,
+                )
+
+    def get_sync_response(self, **params):
+        return self.client.get(reverse("report1"), data=params, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+
+    async def test_ajax(self):
+        response = await self.async_client.get(reverse("async-report"), headers=AJAX_HEADERS)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)["data"]
+        self.assertEqual(len(data), 3)
+        expected = await asyncio.to_thread(self.get_sync_response)
+        self.assertEqual(data, json.loads(expected.content)["data"])
+
+    @override_settings(SLICK_REPORTING_SETTINGS={"EXECUTOR": {"workers": 4}})
+    async def test_concurrent_requests(self):
+        responses = await asyncio.gather(
+            *(
+                self.async_client.get(reverse("async-report"), headers=AJAX_HEADERS)
+                for _ in range(5)
+            )
+        )
+        contents = {response.content for response in responses}
+        self.assertEqual(len(contents), 1)
+        self.assertEqual(len(json.loads(contents.pop())["data"]), 3)
+
+    async def test_conditional_response(self):
+        from .views import AsyncMonthlyProductSales
+
+        with patch.object(AsyncMonthlyProductSales, "conditional_response", True):
+            response = await self.async_client.get(reverse("async-report"), headers=AJAX_HEADERS)
+            etag = response["ETag"]
+            response = await self.async_client.get(
+                reverse("async-report"), headers={**AJAX_HEADERS, "If-None-Match": etag}
+            )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_exports(self):
+        response = await self.async_client.get(reverse("async-report"), data={"_export": "csv"})
+        self.assertEqual(response.status_code, 200)
+        # the rows are already computed, the streaming content is a plain iterator over them
+        content = b"".join(response.streaming_content)
+        self.assertEqual(len(content.splitlines()), 4)
+
+        response = await self.async_client.get(reverse("async-report"), data={"_export": "print"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Client 2", response.content)
+
+    async def test_synchronous_hooks_off_the_event_loop(self):
+        from .views import AsyncMonthlyProductSales
+
+        def get_queryset(view):
+            # ie: the dynamic model introspection of a table_name view
+            Client.objects.exists()
+            return SimpleSales.objects.all()
+
+        def on_profiled(sender, **kwargs):
+            profiled.append(Client.objects.count())
+
+        profiled = []
+        report_profiled.connect(on_profiled)
+        self.addCleanup(report_profiled.disconnect, on_profiled)
+        with patch.object(AsyncMonthlyProductSales, "get_queryset", get_queryset), patch.object(
+            AsyncMonthlyProductSales, "profiling", True
+        ):
+            response = await self.async_client.get(reverse("async-report"), headers=AJAX_HEADERS)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["data"]), 3)
+        self.assertEqual(profiled, [3])
+
+        @classmethod
+        def get_report_model(cls):
+            Client.objects.exists()
+            return SimpleSales
+
+        with patch.object(AsyncMonthlyProductSales, "get_report_model", get_report_model), patch.object(
+            AsyncMonthlyProductSales, "cache_results", True
+        ):
+            response = await self.async_client.get(reverse("async-report"), headers=AJAX_HEADERS)
+        self.assertEqual(len(json.loads(response.content)["data"]), 3)
+
+    async def test_page(self):
+        response = await self.async_client.get(reverse("async-report"))
+        self.assertEqual(response.status_code, 200)
+
+    async def test_permission(self):
+        from .views import AsyncMonthlyProductSales
+
+        with patch.object(AsyncMonthlyProductSales, "test_func", return_value=False):
+            response = await self.async_client.get(reverse("async-report"), headers=AJAX_HEADERS)
+        self.assertEqual(response.status_code, 403)
+
+
 class TestReportFieldRegistry(TestCase):
     def test_unregister(self):
         # unregister a field that we know exists
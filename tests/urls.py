@@ -3,6 +3,15 @@ from . import views
 
 urlpatterns = [
     path("report1/", views.MonthlyProductSales.as_view(), name="report1"),
+    path("cached-report/", views.CachedMonthlyProductSales.as_view(), name="cached-report"),
+    path("autocomplete-report/", views.AutocompleteMonthlyProductSales.as_view(), name="autocomplete-report"),
+    path("conditional-report/", views.ConditionalMonthlyProductSales.as_view(), name="conditional-report"),
+    path("async-report/", views.AsyncMonthlyProductSales.as_view(), name="async-report"),
+    path(
+        "server-side-paginated-report/",
+        views.ServerSidePaginatedMonthlyProductSales.as_view(),
+        name="server-side-paginated-report",
+    ),
     path(
         "product_crosstab_client/",
         views.ProductClientSalesMatrix.as_view(),
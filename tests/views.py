@@ -1,4 +1,4 @@
-from slick_reporting.views import ReportView
+from slick_reporting.views import AsyncReportView, ReportView
 from slick_reporting.fields import ComputationField, TotalReportField
 from django.db.models import Sum, Count
 from .models import SimpleSales, ComplexSales, SimpleSales2
@@ -14,6 +14,35 @@ class MonthlyProductSales(ReportView):
     time_series_columns = ["__total__", "__balance__"]
 
 
+class CachedMonthlyProductSales(MonthlyProductSales):
+    cache_results = True
+
+
+class AutocompleteMonthlyProductSales(MonthlyProductSales):
+    autocomplete_fields = ["client_id"]
+    autocomplete_search_fields = {"client_id": ["name"]}
+    autocomplete_page_size = 2
+
+
+class ConditionalMonthlyProductSales(MonthlyProductSales):
+    conditional_response = True
+    last_modified_field = "created_at"
+
+
+class AsyncMonthlyProductSales(AsyncReportView):
+    report_model = SimpleSales
+    date_field = "doc_date"
+    group_by = "client"
+    columns = ["slug", "name"]
+    time_series_pattern = "monthly"
+    time_series_columns = ["__total__", "__balance__"]
+
+
+class ServerSidePaginatedMonthlyProductSales(MonthlyProductSales):
+    server_side_pagination = True
+    server_side_page_length = 2
+
+
 class MonthlyProductSalesToFIeldSet(ReportView):
     report_model = SimpleSales2
     date_field = "doc_date"